@@ -332,7 +332,7 @@ elif page == "🔍 Live Testing":
                                         'Avg Latency (ms)': 'timeout'
                                     })
                                 else:
-                                    avg_latency = sum(hop.latency_ms) / len(hop.latency_ms) if hop.latency_ms else 0
+                                    avg_latency = hop.avg_latency_ms or 0
                                     hops_data.append({
                                         'Hop': hop.hop_number,
                                         'IP Address': hop.ip_address or 'unknown',
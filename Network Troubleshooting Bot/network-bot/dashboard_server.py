@@ -14,6 +14,12 @@ from http.server import HTTPServer, BaseHTTPRequestHandler
 import urllib.parse
 import mimetypes
 
+# Prefer orjson for response encoding, fall back to the stdlib encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Add current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -1860,7 +1866,7 @@ ${{results || 'No test results available'}}
                             "hop_number": hop.hop_number,
                             "ip_address": hop.ip_address,
                             "hostname": hop.hostname,
-                            "avg_latency": sum(hop.latency_ms) / len(hop.latency_ms) if hop.latency_ms else 0,
+                            "avg_latency": hop.avg_latency_ms or 0,
                             "timeout": hop.timeout
                         }
                         for hop in result.hops[:10]  # Limit to first 10 hops
@@ -2548,12 +2554,15 @@ ${{results || 'No test results available'}}
     
     def send_json_response(self, data, status=200):
         """Send JSON response"""
-        response = json.dumps(data, indent=2)
+        if orjson is not None:
+            response = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        else:
+            response = json.dumps(data, indent=2).encode()
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        self.wfile.write(response.encode())
+        self.wfile.write(response)
     
     def log_message(self, format, *args):
         """Override to customize logging"""
@@ -2591,6 +2600,9 @@ def main():
     except KeyboardInterrupt:
         print("\n\n>> Dashboard stopped by user")
         httpd.shutdown()
+        if MODULES_AVAILABLE.get('advanced_diagnostics', False):
+            from modules.advanced_diagnostics import advanced_tools
+            advanced_tools.shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
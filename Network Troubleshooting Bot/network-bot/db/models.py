@@ -1,7 +1,7 @@
 """
 Database models for Network Troubleshooting Bot
 """
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Float, Boolean, Text, JSON, ForeignKey
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Float, Boolean, Text, JSON, ForeignKey, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -65,6 +65,13 @@ class Alert(Base):
     # Relationships
     device = relationship("Device", back_populates="alerts")
     notifications = relationship("Notification", back_populates="alert")
+    
+    # Partial index so counting open alerts is an index-only scan
+    __table_args__ = (
+        Index('ix_alerts_open', 'status',
+              postgresql_where=(status == 'open'),
+              sqlite_where=(status == 'open')),
+    )
 
 class Notification(Base):
     __tablename__ = 'notifications'
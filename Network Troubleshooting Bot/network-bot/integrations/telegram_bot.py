@@ -218,7 +218,7 @@ Just type your question or issue, and I'll help you troubleshoot it!
                     if hop.timeout:
                         message += f"{hop.hop_number:2d}. * * * (timeout)\n"
                     else:
-                        avg_latency = sum(hop.latency_ms) / len(hop.latency_ms) if hop.latency_ms else 0
+                        avg_latency = hop.avg_latency_ms or 0
                         ip_display = hop.ip_address or "unknown"
                         hostname_display = f" ({hop.hostname})" if hop.hostname and hop.hostname != hop.ip_address else ""
                         message += f"{hop.hop_number:2d}. {ip_display}{hostname_display} - {avg_latency:.2f}ms\n"
@@ -7,13 +7,15 @@ import os
 import yaml
 import time
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict, List, Optional, Any
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel, Field
+from sqlalchemy import func, select
 import uvicorn
 
 # Import our modules
@@ -21,7 +23,7 @@ from modules import (
     PingTester, TracerouteTester, SNMPMonitor, SSHExecutor, NetworkLogParser,
     DeviceCredentials, ping_host, traceroute_host, get_device_snmp_info
 )
-from ai import NetworkIntentHandler, NetworkRulesEngine, process_user_query, troubleshoot_issue
+from ai import Intent, NetworkIntentHandler, NetworkRulesEngine, process_user_query, troubleshoot_issue
 from db.models import DatabaseManager, Device, TestResult, Alert, UserQuery, NetworkMetric
 from integrations.email_notify import EmailNotifier
 from integrations.slack_alerts import SlackNotifier
@@ -49,6 +51,16 @@ rules_engine = NetworkRulesEngine()
 # Initialize database
 db_manager.create_tables()
 
+# Response timestamps have second resolution, so each ISO string is
+# formatted once and reused for every response within that second
+@lru_cache(maxsize=1)
+def _format_timestamp(epoch_seconds: int) -> str:
+    return datetime.fromtimestamp(epoch_seconds).isoformat()
+
+def current_timestamp() -> str:
+    """Return the current local time as an ISO 8601 string"""
+    return _format_timestamp(int(time.time()))
+
 # Pydantic models for API
 class PingRequest(BaseModel):
     target: str = Field(..., description="IP address or hostname to ping")
@@ -59,6 +71,8 @@ class TracerouteRequest(BaseModel):
     target: str = Field(..., description="IP address or hostname for traceroute")
     max_hops: int = Field(30, description="Maximum number of hops")
     timeout: int = Field(5, description="Timeout in seconds")
+    resolve_hostnames: bool = Field(False, description="Look up hop hostnames")
+    fresh: bool = Field(False, description="Run a new trace instead of reusing a recent one")
 
 class SNMPRequest(BaseModel):
     target: str = Field(..., description="IP address or hostname for SNMP")
@@ -99,7 +113,8 @@ app = FastAPI(
     title="Network Troubleshooting Bot API",
     description="AI-powered network diagnostic and troubleshooting API",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -116,7 +131,7 @@ app.add_middleware(
 async def health_check():
     return {
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": current_timestamp(),
         "version": "1.0.0"
     }
 
@@ -180,35 +195,37 @@ async def ping_endpoint(request: PingRequest):
 async def traceroute_endpoint(request: TracerouteRequest):
     """Perform traceroute to target host"""
     try:
-        result = await traceroute_host(request.target, request.max_hops, request.timeout)
+        result = await traceroute_host(request.target, request.max_hops, request.timeout,
+                                       request.resolve_hostnames, use_cache=not request.fresh)
         
-        # Store result in database
-        session = db_manager.get_session()
-        try:
-            test_result = TestResult(
-                test_type="traceroute",
-                target=request.target,
-                status="success" if result.success else "failed",
-                details={
-                    "total_hops": result.total_hops,
-                    "target_reached": result.target_reached,
-                    "hops": [
-                        {
-                            "hop_number": hop.hop_number,
-                            "ip_address": hop.ip_address,
-                            "hostname": hop.hostname,
-                            "latency_ms": hop.latency_ms,
-                            "timeout": hop.timeout
-                        }
-                        for hop in result.hops
-                    ]
-                },
-                error_message=result.error_message
-            )
-            session.add(test_result)
-            session.commit()
-        finally:
-            session.close()
+        # Store result in database; a cached trace is not a new test run
+        if not result.from_cache:
+            session = db_manager.get_session()
+            try:
+                test_result = TestResult(
+                    test_type="traceroute",
+                    target=request.target,
+                    status="success" if result.success else "failed",
+                    details={
+                        "total_hops": result.total_hops,
+                        "target_reached": result.target_reached,
+                        "hops": [
+                            {
+                                "hop_number": hop.hop_number,
+                                "ip_address": hop.ip_address,
+                                "hostname": hop.hostname,
+                                "latency_ms": hop.latency_ms,
+                                "timeout": hop.timeout
+                            }
+                            for hop in result.hops
+                        ]
+                    },
+                    error_message=result.error_message
+                )
+                session.add(test_result)
+                session.commit()
+            finally:
+                session.close()
         
         return {
             "success": result.success,
@@ -345,6 +362,24 @@ async def ssh_execute_endpoint(request: SSHRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 # Chat/AI endpoints
+def persist_user_query(request: ChatRequest, intent: str, response_text: str, processing_time_ms: float):
+    """Store a processed chat query in a single insert"""
+    session = db_manager.get_session()
+    try:
+        user_query = UserQuery(
+            user_id=request.user_id,
+            channel=request.channel,
+            query_text=request.message,
+            intent=intent,
+            response=response_text,
+            status="processed",
+            processing_time_ms=processing_time_ms
+        )
+        session.add(user_query)
+        session.commit()
+    finally:
+        session.close()
+
 @app.post("/api/chat")
 async def chat_endpoint(request: ChatRequest, background_tasks: BackgroundTasks):
     """Process natural language query and provide troubleshooting assistance"""
@@ -354,40 +389,18 @@ async def chat_endpoint(request: ChatRequest, background_tasks: BackgroundTasks)
         # Process query with intent handler
         intent_result = intent_handler.process_query(request.message)
         
-        # Store query in database
-        session = db_manager.get_session()
-        processing_time = (time.time() - start_time) * 1000
-        
-        try:
-            user_query = UserQuery(
-                user_id=request.user_id,
-                channel=request.channel,
-                query_text=request.message,
-                intent=intent_result.intent.value,
-                response="",  # Will be updated after processing
-                status="processing",
-                processing_time_ms=processing_time
-            )
-            session.add(user_query)
-            session.commit()
-            query_id = user_query.id
-        finally:
-            session.close()
-        
         # Generate response based on intent
         response = await process_intent(intent_result)
+        processing_time = (time.time() - start_time) * 1000
         
-        # Update query record with response
-        session = db_manager.get_session()
-        try:
-            query_record = session.query(UserQuery).get(query_id)
-            if query_record:
-                query_record.response = response.get("message", "")
-                query_record.status = "processed"
-                query_record.processing_time_ms = (time.time() - start_time) * 1000
-                session.commit()
-        finally:
-            session.close()
+        # Store query in database after the response has been sent
+        background_tasks.add_task(
+            persist_user_query,
+            request,
+            intent_result.intent.value,
+            response.get("message", ""),
+            processing_time
+        )
         
         return {
             "query": request.message,
@@ -396,68 +409,82 @@ async def chat_endpoint(request: ChatRequest, background_tasks: BackgroundTasks)
             "entities": intent_result.entities,
             "response": response,
             "suggested_action": intent_result.suggested_action,
-            "processing_time_ms": (time.time() - start_time) * 1000
+            "processing_time_ms": processing_time
         }
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _handle_ping_intent(intent_result):
+    """Ping the target named in the query"""
+    target = intent_result.entities.get('ip_address') or intent_result.entities.get('hostname')
+    if target:
+        ping_result = await ping_host(target)
+        return {
+            "message": f"Ping test to {target}: {'✅ Success' if ping_result.success else '❌ Failed'}",
+            "details": {
+                "target": ping_result.target,
+                "success": ping_result.success,
+                "packet_loss": ping_result.packet_loss_percent,
+                "avg_latency_ms": ping_result.avg_latency_ms
+            },
+            "action_taken": "ping_test"
+        }
+    else:
+        return {
+            "message": "Please specify a target IP address or hostname for ping test.",
+            "suggestion": "Example: 'ping 8.8.8.8' or 'ping google.com'"
+        }
+
+async def _handle_traceroute_intent(intent_result):
+    """Trace the route to the target named in the query"""
+    target = intent_result.entities.get('ip_address') or intent_result.entities.get('hostname')
+    if target:
+        trace_result = await traceroute_host(target)
+        return {
+            "message": f"Traceroute to {target}: {'✅ Completed' if trace_result.success else '❌ Failed'}",
+            "details": {
+                "target": trace_result.target,
+                "success": trace_result.success,
+                "total_hops": trace_result.total_hops,
+                "target_reached": trace_result.target_reached,
+                "hops": trace_result.hops[:5]  # First 5 hops
+            },
+            "action_taken": "traceroute"
+        }
+    else:
+        return {
+            "message": "Please specify a target IP address or hostname for traceroute.",
+            "suggestion": "Example: 'traceroute google.com'"
+        }
+
+async def _handle_help_intent(intent_result):
+    """Return the help text"""
+    return {
+        "message": intent_handler.get_help_text(),
+        "action_taken": "help"
+    }
+
+async def _handle_unsupported_intent(intent_result):
+    """Ask for more detail on intents without an automated action"""
+    return {
+        "message": f"I understand you want to {intent_result.suggested_action}, but I need more information to proceed.",
+        "suggestions": intent_handler.get_follow_up_questions(intent_result),
+        "action_taken": "clarification_needed"
+    }
+
+# Intent dispatch table; intents without an entry ask for clarification
+_INTENT_HANDLERS = {
+    Intent.PING_TEST: _handle_ping_intent,
+    Intent.TRACEROUTE: _handle_traceroute_intent,
+    Intent.GENERAL_HELP: _handle_help_intent,
+}
+
 async def process_intent(intent_result):
     """Process intent and execute appropriate actions"""
     try:
-        if intent_result.intent.value == "ping_test":
-            target = intent_result.entities.get('ip_address') or intent_result.entities.get('hostname')
-            if target:
-                ping_result = await ping_host(target)
-                return {
-                    "message": f"Ping test to {target}: {'✅ Success' if ping_result.success else '❌ Failed'}",
-                    "details": {
-                        "target": ping_result.target,
-                        "success": ping_result.success,
-                        "packet_loss": ping_result.packet_loss_percent,
-                        "avg_latency_ms": ping_result.avg_latency_ms
-                    },
-                    "action_taken": "ping_test"
-                }
-            else:
-                return {
-                    "message": "Please specify a target IP address or hostname for ping test.",
-                    "suggestion": "Example: 'ping 8.8.8.8' or 'ping google.com'"
-                }
-        
-        elif intent_result.intent.value == "traceroute":
-            target = intent_result.entities.get('ip_address') or intent_result.entities.get('hostname')
-            if target:
-                trace_result = await traceroute_host(target)
-                return {
-                    "message": f"Traceroute to {target}: {'✅ Completed' if trace_result.success else '❌ Failed'}",
-                    "details": {
-                        "target": trace_result.target,
-                        "success": trace_result.success,
-                        "total_hops": trace_result.total_hops,
-                        "target_reached": trace_result.target_reached,
-                        "hops": trace_result.hops[:5]  # First 5 hops
-                    },
-                    "action_taken": "traceroute"
-                }
-            else:
-                return {
-                    "message": "Please specify a target IP address or hostname for traceroute.",
-                    "suggestion": "Example: 'traceroute google.com'"
-                }
-        
-        elif intent_result.intent.value == "general_help":
-            return {
-                "message": intent_handler.get_help_text(),
-                "action_taken": "help"
-            }
-        
-        else:
-            return {
-                "message": f"I understand you want to {intent_result.suggested_action}, but I need more information to proceed.",
-                "suggestions": intent_handler.get_follow_up_questions(intent_result),
-                "action_taken": "clarification_needed"
-            }
+        handler = _INTENT_HANDLERS.get(intent_result.intent, _handle_unsupported_intent)
+        return await handler(intent_result)
     
     except Exception as e:
         return {
@@ -533,7 +560,7 @@ async def check_device_status(request: DeviceStatusRequest):
                     "cpu_usage_percent": snmp_result.device_info.cpu_usage_percent if snmp_result.device_info else None
                 } if snmp_result.success and snmp_result.device_info else None
             },
-            "timestamp": datetime.now().isoformat()
+            "timestamp": current_timestamp()
         }
     
     except Exception as e:
@@ -556,7 +583,7 @@ async def interface_action(action: str, request: InterfaceActionRequest):
             "interface": request.interface,
             "action": action,
             "message": f"Interface {request.interface} {action} completed successfully",
-            "timestamp": datetime.now().isoformat()
+            "timestamp": current_timestamp()
         }
     
     except Exception as e:
@@ -624,9 +651,11 @@ async def analytics_summary():
         return {
             "test_summary": test_counts,
             "alert_summary": alert_counts,
-            "total_devices": session.query(Device).count(),
-            "active_alerts": session.query(Alert).filter(Alert.status == 'open').count(),
-            "timestamp": datetime.now().isoformat()
+            "total_devices": session.execute(select(func.count()).select_from(Device)).scalar(),
+            "active_alerts": session.execute(
+                select(func.count()).select_from(Alert).where(Alert.status == 'open')
+            ).scalar(),
+            "timestamp": current_timestamp()
         }
     
     finally:
@@ -635,12 +664,12 @@ async def analytics_summary():
 # Error handlers
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={
             "error": "Internal server error",
             "message": str(exc),
-            "timestamp": datetime.now().isoformat()
+            "timestamp": current_timestamp()
         }
     )
 
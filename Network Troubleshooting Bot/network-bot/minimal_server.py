@@ -12,6 +12,12 @@ import json
 import urllib.parse
 import threading
 
+# Prefer orjson for response encoding, fall back to the stdlib encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Add current directory to Python path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -174,7 +180,7 @@ class NetworkBotHandler(BaseHTTPRequestHandler):
                             "hop_number": hop.hop_number,
                             "ip_address": hop.ip_address,
                             "hostname": hop.hostname,
-                            "avg_latency": sum(hop.latency_ms) / len(hop.latency_ms) if hop.latency_ms else 0,
+                            "avg_latency": hop.avg_latency_ms or 0,
                             "timeout": hop.timeout
                         }
                         for hop in result.hops[:5]  # Limit to first 5 hops for demo
@@ -196,12 +202,15 @@ class NetworkBotHandler(BaseHTTPRequestHandler):
     
     def send_json_response(self, data, status=200):
         """Send JSON response"""
-        response = json.dumps(data, indent=2)
+        if orjson is not None:
+            response = orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+        else:
+            response = json.dumps(data, indent=2).encode()
         self.send_response(status)
         self.send_header('Content-Type', 'application/json')
         self.send_header('Access-Control-Allow-Origin', '*')
         self.end_headers()
-        self.wfile.write(response.encode())
+        self.wfile.write(response)
     
     def log_message(self, format, *args):
         """Override to customize logging"""
@@ -27,8 +27,8 @@ except ImportError as e:
 
 # Optional modules with graceful degradation
 try:
-    from .snmp_monitor import SNMPMonitor, SNMPResult, DeviceInfo, InterfaceStats, get_device_snmp_info, monitor_devices
-    __all__.extend(['SNMPMonitor', 'SNMPResult', 'DeviceInfo', 'InterfaceStats', 'get_device_snmp_info', 'monitor_devices'])
+    from .snmp_monitor import SNMPMonitor, SNMPResult, DeviceInfo, InterfaceStats, InterfaceStatsBatch, get_device_snmp_info, monitor_devices
+    __all__.extend(['SNMPMonitor', 'SNMPResult', 'DeviceInfo', 'InterfaceStats', 'InterfaceStatsBatch', 'get_device_snmp_info', 'monitor_devices'])
 except ImportError:
     # SNMP functionality not available - requires pysnmp
     pass
@@ -37,5 +37,5 @@ try:
     from .ssh_exec import SSHExecutor, SSHResult, DeviceCredentials, NetworkDeviceAutomation, execute_ssh_command, restart_device_interface
     __all__.extend(['SSHExecutor', 'SSHResult', 'DeviceCredentials', 'NetworkDeviceAutomation', 'execute_ssh_command', 'restart_device_interface'])
 except ImportError:
-    # SSH functionality not available - requires paramiko/netmiko  
+    # SSH functionality not available - requires asyncssh
     pass
\ No newline at end of file
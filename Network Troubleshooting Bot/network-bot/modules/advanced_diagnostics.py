@@ -8,12 +8,15 @@ import asyncio
 import socket
 import subprocess
 import json
-import time
 import platform
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 import concurrent.futures
 import ipaddress
+from functools import lru_cache, partial
+from types import MappingProxyType
+
+from .ttl_cache import TTLCache
 
 @dataclass
 class PortScanResult:
@@ -37,6 +40,17 @@ class DNSLookupResult:
 class AdvancedNetworkTools:
     """Advanced network diagnostic tools"""
     
+    # IPv4 network class indexed by first octet (0 and 127 are Unknown)
+    _NETWORK_CLASS_TABLE = (
+        ("Unknown",) +
+        ("Class A",) * 126 +
+        ("Unknown",) +
+        ("Class B",) * 64 +
+        ("Class C",) * 32 +
+        ("Class D (Multicast)",) * 16 +
+        ("Class E (Reserved)",) * 16
+    )
+    
     def __init__(self):
         self.common_ports = [21, 22, 23, 25, 53, 80, 110, 135, 139, 143, 443, 993, 995, 1433, 1521, 3389, 5432, 8080]
         self.service_map = {
@@ -45,24 +59,80 @@ class AdvancedNetworkTools:
             443: "HTTPS", 993: "IMAPS", 995: "POP3S", 1433: "MSSQL", 
             1521: "Oracle", 3389: "RDP", 5432: "PostgreSQL", 8080: "HTTP-Alt"
         }
+        # Upper bound on in-flight probes per scan, to avoid exhausting
+        # file descriptors on wide port ranges
+        self.max_concurrent_probes = 512
+        # Dedicated pool for the remaining blocking socket calls (name
+        # resolution) so they don't compete with the loop's default executor
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=32, thread_name_prefix="netdiag"
+        )
+        # Resolver results are cached; failures expire sooner so a fixed
+        # record is picked up quickly without hammering the resolver
+        self._dns_cache = TTLCache(maxsize=4096, ttl=60.0)
+        self.negative_dns_ttl = 5.0
+    
+    def _create_probe_socket(self) -> socket.socket:
+        """Create a non-blocking TCP socket configured for short-lived port probes"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.setblocking(False)
+        return sock
+    
+    async def _probe_port(self, host: str, port: int, timeout: float) -> bool:
+        """Attempt a TCP connection on the event loop; True if it was accepted"""
+        loop = asyncio.get_running_loop()
+        sock = self._create_probe_socket()
+        try:
+            await asyncio.wait_for(loop.sock_connect(sock, (host, port)), timeout)
+            return True
+        except (OSError, asyncio.TimeoutError):
+            return False
+        finally:
+            sock.close()
+    
+    async def _resolve_host(self, host: str) -> str:
+        """Resolve a hostname to an IPv4 address through the DNS cache"""
+        # An IPv4 literal is its own answer; don't spend an executor round trip on it
+        try:
+            if ipaddress.ip_address(host).version == 4:
+                return host
+        except ValueError:
+            pass
+        
+        cache_key = ("A", host)
+        cached = self._dns_cache.get(cache_key)
+        if cached is None:
+            loop = asyncio.get_running_loop()
+            try:
+                address = await loop.run_in_executor(self._executor, socket.gethostbyname, host)
+                cached = (address, None)
+                self._dns_cache.set(cache_key, cached)
+            except socket.gaierror as e:
+                cached = (None, e.args)
+                self._dns_cache.set(cache_key, cached, ttl=self.negative_dns_ttl)
+        
+        address, error_args = cached
+        if error_args is not None:
+            raise socket.gaierror(*error_args)
+        return address
+    
+    def shutdown(self):
+        """Stop the executor threads"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
     
     async def scan_single_port(self, host: str, port: int, timeout: float = 3.0) -> PortScanResult:
         """Scan a single port on a host"""
-        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
         
         try:
-            # Create socket connection
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(timeout)
+            is_open = await self._probe_port(host, port, timeout)
+            response_time = (loop.time() - start_time) * 1000
             
-            result = sock.connect_ex((host, port))
-            response_time = (time.time() - start_time) * 1000
-            
-            is_open = (result == 0)
             service = self.service_map.get(port, f"Port {port}")
             
-            sock.close()
-            
             return PortScanResult(
                 host=host,
                 port=port,
@@ -85,11 +155,14 @@ class AdvancedNetworkTools:
         if ports is None:
             ports = self.common_ports
         
-        tasks = []
-        for port in ports:
-            task = self.scan_single_port(host, port, timeout)
-            tasks.append(task)
+        # Semaphores bind to the running loop, so each scan gets its own
+        semaphore = asyncio.Semaphore(self.max_concurrent_probes)
+        
+        async def probe(port: int) -> PortScanResult:
+            async with semaphore:
+                return await self.scan_single_port(host, port, timeout)
         
+        tasks = [asyncio.create_task(probe(port)) for port in ports]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         # Filter out exceptions and return valid results
@@ -102,11 +175,28 @@ class AdvancedNetworkTools:
     
     async def dns_lookup(self, hostname: str) -> DNSLookupResult:
         """Perform comprehensive DNS lookup"""
+        # An IP literal resolves to itself; skip the resolver and nslookup
+        if self.validate_ip_address(hostname):
+            return DNSLookupResult(
+                hostname=hostname,
+                ip_addresses=[hostname],
+                mx_records=[],
+                ns_records=[],
+                success=True
+            )
+        
+        cached = self._dns_cache.get(("lookup", hostname))
+        if cached is not None:
+            return cached
+        
+        loop = asyncio.get_running_loop()
         try:
             # Basic A record lookup
             ip_addresses = []
             try:
-                addr_info = socket.getaddrinfo(hostname, None)
+                addr_info = await loop.run_in_executor(
+                    self._executor, socket.getaddrinfo, hostname, None
+                )
                 ip_addresses = list(set([addr[4][0] for addr in addr_info]))
             except socket.gaierror:
                 pass
@@ -115,28 +205,36 @@ class AdvancedNetworkTools:
             mx_records = []
             ns_records = []
             
-            try:
-                # Try nslookup for MX records
-                if platform.system().lower() == 'windows':
-                    mx_result = subprocess.run(['nslookup', '-type=MX', hostname], 
-                                             capture_output=True, text=True, timeout=10)
+            # MX and NS records come from nslookup, whose output format is
+            # only parsed for Windows
+            if platform.system().lower() == 'windows':
+                try:
+                    # Run the MX and NS queries side by side off the loop
+                    mx_result, ns_result = await asyncio.gather(*(
+                        loop.run_in_executor(
+                            self._executor,
+                            partial(subprocess.run, ['nslookup', query, hostname],
+                                              capture_output=True, text=True, timeout=10)
+                        )
+                        for query in ('-type=MX', '-type=NS')
+                    ))
+                    
+                    # MX records
                     if mx_result.returncode == 0:
                         mx_lines = [line.strip() for line in mx_result.stdout.split('\n') 
                                   if 'mail exchanger' in line.lower()]
                         mx_records = [line.split('=')[-1].strip() for line in mx_lines]
-                
-                # Try nslookup for NS records
-                    ns_result = subprocess.run(['nslookup', '-type=NS', hostname], 
-                                             capture_output=True, text=True, timeout=10)
+                    
+                    # NS records
                     if ns_result.returncode == 0:
                         ns_lines = [line.strip() for line in ns_result.stdout.split('\n') 
                                   if 'nameserver' in line.lower()]
                         ns_records = [line.split('=')[-1].strip() for line in ns_lines]
                         
-            except (subprocess.TimeoutExpired, FileNotFoundError):
-                pass  # nslookup not available or timeout
+                except (subprocess.TimeoutExpired, FileNotFoundError):
+                    pass  # nslookup not available or timeout
             
-            return DNSLookupResult(
+            result = DNSLookupResult(
                 hostname=hostname,
                 ip_addresses=ip_addresses,
                 mx_records=mx_records,
@@ -144,6 +242,9 @@ class AdvancedNetworkTools:
                 success=len(ip_addresses) > 0,
                 error_message=None if len(ip_addresses) > 0 else "No IP addresses found"
             )
+            self._dns_cache.set(("lookup", hostname), result,
+                                ttl=None if result.success else self.negative_dns_ttl)
+            return result
             
         except Exception as e:
             return DNSLookupResult(
@@ -165,23 +266,19 @@ class AdvancedNetworkTools:
         }
         
         try:
-            start_time = time.time()
+            loop = asyncio.get_running_loop()
+            start_time = loop.time()
             
             if port:
                 # Check specific port
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(5.0)
-                connection_result = sock.connect_ex((host, port))
-                sock.close()
-                
-                result["reachable"] = (connection_result == 0)
+                result["reachable"] = await self._probe_port(host, port, 5.0)
                 result["port"] = port
             else:
                 # Basic hostname resolution
-                socket.gethostbyname(host)
+                await self._resolve_host(host)
                 result["reachable"] = True
             
-            result["response_time_ms"] = (time.time() - start_time) * 1000
+            result["response_time_ms"] = (loop.time() - start_time) * 1000
             
         except Exception as e:
             result["error_message"] = str(e)
@@ -190,43 +287,47 @@ class AdvancedNetworkTools:
     
     def validate_ip_address(self, ip_str: str) -> bool:
         """Validate if string is a valid IP address"""
-        try:
-            ipaddress.ip_address(ip_str)
-            return True
-        except ValueError:
-            return False
+        return _validate_ip_cached(ip_str)
     
     def get_ip_info(self, ip_str: str) -> Dict:
         """Get information about an IP address"""
-        try:
-            ip = ipaddress.ip_address(ip_str)
-            return {
-                "ip": str(ip),
-                "version": ip.version,
-                "is_private": ip.is_private,
-                "is_multicast": ip.is_multicast,
-                "is_reserved": ip.is_reserved,
-                "is_loopback": ip.is_loopback,
-                "network_class": self._get_network_class(str(ip)) if ip.version == 4 else "IPv6"
-            }
-        except ValueError:
-            return {"error": "Invalid IP address format"}
+        return dict(_ip_info_cached(ip_str))
     
     def _get_network_class(self, ip_str: str) -> str:
         """Determine IPv4 network class"""
-        first_octet = int(ip_str.split('.')[0])
-        if 1 <= first_octet <= 126:
-            return "Class A"
-        elif 128 <= first_octet <= 191:
-            return "Class B"
-        elif 192 <= first_octet <= 223:
-            return "Class C"
-        elif 224 <= first_octet <= 239:
-            return "Class D (Multicast)"
-        elif 240 <= first_octet <= 255:
-            return "Class E (Reserved)"
-        else:
-            return "Unknown"
+        return self._NETWORK_CLASS_TABLE[int(ip_str.partition('.')[0])]
+
+@lru_cache(maxsize=4096)
+def _validate_ip_cached(ip_str: str) -> bool:
+    """Memoized IP address validation; the same targets are checked repeatedly"""
+    try:
+        ipaddress.ip_address(ip_str)
+        return True
+    except ValueError:
+        return False
+
+@lru_cache(maxsize=4096)
+def _ip_info_cached(ip_str: str) -> MappingProxyType:
+    """Memoized IP address details, read-only so callers can't alter the cache"""
+    try:
+        ip = ipaddress.ip_address(ip_str)
+    except ValueError:
+        return MappingProxyType({"error": "Invalid IP address format"})
+    
+    if ip.version == 4:
+        # First octet straight from the packed integer, no string round trip
+        network_class = AdvancedNetworkTools._NETWORK_CLASS_TABLE[int(ip) >> 24]
+    else:
+        network_class = "IPv6"
+    return MappingProxyType({
+        "ip": ip.compressed,
+        "version": ip.version,
+        "is_private": ip.is_private,
+        "is_multicast": ip.is_multicast,
+        "is_reserved": ip.is_reserved,
+        "is_loopback": ip.is_loopback,
+        "network_class": network_class
+    })
 
 # Global instance
 advanced_tools = AdvancedNetworkTools()
@@ -8,22 +8,37 @@ import asyncio
 import time
 import threading
 import json
-import statistics
+import operator
 import subprocess
 import platform
+import ipaddress
 from typing import Dict, List, Optional, Tuple, Any
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 import uuid
+import numpy as np
 
 # Global test management
 ACTIVE_TESTS = {}
 TEST_QUEUE = []
 MONITORING_SESSIONS = {}
 ALERT_RULES = []
-PERFORMANCE_HISTORY = []
+ALERT_RULES_BY_TARGET: Dict[str, List['AlertRule']] = {}
 
-@dataclass
+# Ports probed to find live hosts during topology discovery
+TOPOLOGY_SCAN_PORTS = (22, 80, 443)
+MAX_TOPOLOGY_SCAN_ADDRESSES = 4096
+
+# Alert rule comparison operators
+ALERT_OPERATORS = {
+    '>': operator.gt,
+    '<': operator.lt,
+    '>=': operator.ge,
+    '<=': operator.le,
+    '==': lambda value, threshold: abs(value - threshold) < 0.001
+}
+
+@dataclass(slots=True)
 class TestSession:
     """Represents an active test session"""
     session_id: str
@@ -34,9 +49,19 @@ class TestSession:
     end_time: Optional[float] = None
     progress: int = 0  # 0-100
     results: Optional[Dict] = None
-    cancellation_token: Optional[threading.Event] = None
+    cancellation_token: Optional[asyncio.Event] = None
+    loop: Optional[asyncio.AbstractEventLoop] = None  # Loop the test runs on, for cross-thread cancel
+    # Monotonic clock readings for duration, immune to wall-clock changes
+    start_monotonic: float = field(default_factory=time.monotonic)
+    end_monotonic: Optional[float] = None
+    
+    def finish(self, status: str):
+        """Mark the session as finished with the given status"""
+        self.status = status
+        self.end_time = time.time()
+        self.end_monotonic = time.monotonic()
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class BandwidthResult:
     """Bandwidth test result"""
     target: str
@@ -47,8 +72,25 @@ class BandwidthResult:
     packet_loss: float
     test_duration_seconds: float
     timestamp: float
+    loaded_latency_ms: Optional[float] = None  # Median RTT while the link is saturated
+    bufferbloat_ms: Optional[float] = None     # Loaded minus idle RTT
+    
+    def to_dict(self) -> Dict:
+        """Flat dict of the result for API responses, cheaper than asdict()"""
+        return {
+            'target': self.target,
+            'download_mbps': self.download_mbps,
+            'upload_mbps': self.upload_mbps,
+            'latency_ms': self.latency_ms,
+            'jitter_ms': self.jitter_ms,
+            'packet_loss': self.packet_loss,
+            'test_duration_seconds': self.test_duration_seconds,
+            'timestamp': self.timestamp,
+            'loaded_latency_ms': self.loaded_latency_ms,
+            'bufferbloat_ms': self.bufferbloat_ms
+        }
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PerformanceMetrics:
     """Network performance metrics"""
     target: str
@@ -61,7 +103,7 @@ class PerformanceMetrics:
     quality_score: float  # 0-100
     timestamp: float
 
-@dataclass
+@dataclass(slots=True)
 class AlertRule:
     """Alert configuration"""
     rule_id: str
@@ -72,6 +114,59 @@ class AlertRule:
     operator: str  # '>', '<', '>=', '<=', '=='
     enabled: bool = True
     last_triggered: Optional[float] = None
+    
+    def to_dict(self) -> Dict:
+        """Flat dict of the rule for API responses, cheaper than asdict()"""
+        return {
+            'rule_id': self.rule_id,
+            'name': self.name,
+            'target': self.target,
+            'metric': self.metric,
+            'threshold': self.threshold,
+            'operator': self.operator,
+            'enabled': self.enabled,
+            'last_triggered': self.last_triggered
+        }
+
+class PerformanceHistory:
+    """Fixed-size columnar ring buffer of latency and quality samples"""
+    
+    def __init__(self, capacity: int = 100000):
+        self.capacity = capacity
+        self._timestamps = np.empty(capacity, dtype='f8')
+        self._latencies = np.empty(capacity, dtype='f8')
+        self._quality_scores = np.empty(capacity, dtype='f8')
+        self._targets = np.empty(capacity, dtype='O')
+        self._next_index = 0
+        self._size = 0
+        self._lock = threading.Lock()
+    
+    def append(self, target: str, timestamp: float, latency: float = np.nan,
+               quality_score: float = np.nan):
+        """Record a sample, overwriting the oldest one once the buffer is full"""
+        with self._lock:
+            i = self._next_index
+            self._targets[i] = target
+            self._timestamps[i] = timestamp
+            self._latencies[i] = latency
+            self._quality_scores[i] = quality_score
+            self._next_index = (i + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+    
+    def select(self, target: str, since: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Return latency and quality columns for a target's samples newer than since"""
+        with self._lock:
+            n = self._size
+            mask = (self._targets[:n] == target) & (self._timestamps[:n] > since)
+            return self._latencies[:n][mask], self._quality_scores[:n][mask]
+    
+    def __len__(self) -> int:
+        return self._size
+
+# Monitors sample every 30s (2880 samples per target per day), so this keeps
+# a day of history for roughly 35 targets before the oldest samples roll off
+PERFORMANCE_HISTORY_CAPACITY = 100_000
+PERFORMANCE_HISTORY = PerformanceHistory(PERFORMANCE_HISTORY_CAPACITY)
 
 class EnhancedNetworkTools:
     """Enhanced network diagnostic capabilities"""
@@ -79,11 +174,14 @@ class EnhancedNetworkTools:
     def __init__(self):
         self.system = platform.system().lower()
         self.active_sessions = {}
+        # Running RFC 1889 interarrival jitter and last latency per target
+        self._ewma_jitter: Dict[str, float] = {}
+        self._last_latency: Dict[str, float] = {}
     
     def create_test_session(self, test_type: str, target: str) -> str:
         """Create a new test session with cancellation support"""
         session_id = str(uuid.uuid4())
-        cancellation_token = threading.Event()
+        cancellation_token = asyncio.Event()
         
         session = TestSession(
             session_id=session_id,
@@ -102,9 +200,12 @@ class EnhancedNetworkTools:
         if session_id in ACTIVE_TESTS:
             session = ACTIVE_TESTS[session_id]
             if session.cancellation_token:
-                session.cancellation_token.set()
-            session.status = 'cancelled'
-            session.end_time = time.time()
+                # Tests run on their own loop, often in another thread
+                if session.loop and session.loop.is_running():
+                    session.loop.call_soon_threadsafe(session.cancellation_token.set)
+                else:
+                    session.cancellation_token.set()
+            session.finish('cancelled')
             return True
         return False
     
@@ -120,28 +221,42 @@ class EnhancedNetworkTools:
                 'progress': session.progress,
                 'start_time': session.start_time,
                 'end_time': session.end_time,
-                'duration': (session.end_time or time.time()) - session.start_time
+                'duration': (session.end_monotonic or time.monotonic()) - session.start_monotonic
             }
         return None
     
     async def bandwidth_test(self, target: str, session_id: str = None) -> BandwidthResult:
         """Perform bandwidth testing"""
-        start_time = time.time()
+        loop = asyncio.get_running_loop()
+        started = loop.time()
         session = ACTIVE_TESTS.get(session_id) if session_id else None
+        stop_probe = asyncio.Event()
+        probe_task = None
+        
+        if session:
+            session.loop = loop
         
         try:
+            # Idle RTT baseline before any load is applied
+            idle_samples = []
+            for _ in range(3):
+                rtt = await self._measure_rtt(target)
+                if rtt is not None:
+                    idle_samples.append(rtt)
+            
             # Update progress
             if session:
                 session.progress = 25
             
+            # Keep probing RTT while the download and upload phases load the link
+            loaded_samples = []
+            probe_task = asyncio.create_task(self._probe_rtt(target, stop_probe, loaded_samples))
+            
             # Simulate download test with multiple connections
             download_speeds = []
             for i in range(3):
-                if session and session.cancellation_token.is_set():
-                    raise asyncio.CancelledError("Test cancelled by user")
-                
                 # Simulate download measurement
-                await asyncio.sleep(0.5)  # Simulate test time
+                await self._sleep_unless_cancelled(session, 0.5)  # Simulate test time
                 download_speeds.append(50.0 + (i * 10))  # Mock data
                 
                 if session:
@@ -154,26 +269,30 @@ class EnhancedNetworkTools:
             # Simulate upload test
             upload_speeds = []
             for i in range(2):
-                if session and session.cancellation_token.is_set():
-                    raise asyncio.CancelledError("Test cancelled by user")
-                
-                await asyncio.sleep(0.3)
+                await self._sleep_unless_cancelled(session, 0.3)
                 upload_speeds.append(25.0 + (i * 5))
                 
                 if session:
                     session.progress = 70 + (i * 10)
             
+            stop_probe.set()
+            await probe_task
+            
             # Calculate metrics
-            avg_download = statistics.mean(download_speeds)
-            avg_upload = statistics.mean(upload_speeds)
-            latency = 15.5  # Mock latency
+            avg_download = float(np.mean(download_speeds))
+            avg_upload = float(np.mean(upload_speeds))
+            latency = float(np.median(idle_samples)) if idle_samples else 15.5  # Mock latency if unreachable
+            loaded_latency = float(np.median(loaded_samples)) if loaded_samples else None
+            bufferbloat = (
+                max(0.0, loaded_latency - latency)
+                if loaded_latency is not None and idle_samples else None
+            )
             jitter = 2.3   # Mock jitter
             packet_loss = 0.1  # Mock packet loss
             
             if session:
                 session.progress = 100
-                session.status = 'completed'
-                session.end_time = time.time()
+                session.finish('completed')
             
             result = BandwidthResult(
                 target=target,
@@ -182,49 +301,102 @@ class EnhancedNetworkTools:
                 latency_ms=latency,
                 jitter_ms=jitter,
                 packet_loss=packet_loss,
-                test_duration_seconds=time.time() - start_time,
-                timestamp=time.time()
+                test_duration_seconds=loop.time() - started,
+                timestamp=time.time(),
+                loaded_latency_ms=loaded_latency,
+                bufferbloat_ms=bufferbloat
             )
             
             # Store in history
-            PERFORMANCE_HISTORY.append(result)
+            PERFORMANCE_HISTORY.append(target, result.timestamp, latency=result.latency_ms)
             
             return result
             
         except asyncio.CancelledError:
             if session:
-                session.status = 'cancelled'
-                session.end_time = time.time()
+                session.finish('cancelled')
             raise
         except Exception as e:
             if session:
-                session.status = 'failed'
-                session.end_time = time.time()
+                session.finish('failed')
             raise
+        finally:
+            if probe_task and not probe_task.done():
+                probe_task.cancel()
+                await asyncio.gather(probe_task, return_exceptions=True)
+    
+    async def _sleep_unless_cancelled(self, session: Optional[TestSession], delay: float):
+        """Sleep for delay, raising CancelledError as soon as the session is cancelled"""
+        if not session or not session.cancellation_token:
+            await asyncio.sleep(delay)
+            return
+        
+        try:
+            await asyncio.wait_for(session.cancellation_token.wait(), delay)
+        except asyncio.TimeoutError:
+            return
+        raise asyncio.CancelledError("Test cancelled by user")
+    
+    async def _tcp_probe(self, host: str, port: int, timeout: float = 1.0) -> Optional[bool]:
+        """Attempt a TCP handshake: True if open, False if refused, None if no answer"""
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        except ConnectionRefusedError:
+            return False
+        except (OSError, asyncio.TimeoutError):
+            return None
+        writer.close()
+        return True
+    
+    async def _measure_rtt(self, target: str, port: int = 80, timeout: float = 1.0) -> Optional[float]:
+        """Measure RTT in ms as the time to a TCP handshake answer, or None on timeout"""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        # A refused connection still completes the round trip
+        if await self._tcp_probe(target, port, timeout) is None:
+            return None
+        return (loop.time() - start) * 1000
+    
+    async def _probe_rtt(self, target: str, stop_event: asyncio.Event,
+                         samples: List[float], interval: float = 0.1):
+        """Collect RTT samples every interval until stop_event is set"""
+        while not stop_event.is_set():
+            rtt = await self._measure_rtt(target)
+            if rtt is not None:
+                samples.append(rtt)
+            try:
+                await asyncio.wait_for(stop_event.wait(), interval)
+            except asyncio.TimeoutError:
+                pass
     
     async def continuous_latency_monitor(self, target: str, duration_minutes: int = 60) -> List[PerformanceMetrics]:
         """Continuous latency monitoring with quality assessment"""
         results = []
-        start_time = time.time()
-        end_time = start_time + (duration_minutes * 60)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (duration_minutes * 60)
         
-        while time.time() < end_time:
+        while loop.time() < deadline:
             try:
-                # Perform ping test
-                latencies = []
-                for i in range(10):  # 10 pings per sample
-                    # Mock ping implementation
-                    await asyncio.sleep(0.1)
-                    latency = 20.0 + (i * 0.5)  # Mock latency data
-                    latencies.append(latency)
+                sample_start = loop.time()
+                
+                # Perform ping test, 10 probes per sample sent concurrently so
+                # the batch takes one round trip rather than ten
+                replies = await asyncio.gather(*(self._measure_rtt(target) for _ in range(10)))
+                latencies = [rtt for rtt in replies if rtt is not None]
+                for latency in latencies:
+                    self._update_jitter(target, latency)
                 
                 # Calculate metrics
-                avg_latency = statistics.mean(latencies)
-                min_latency = min(latencies)
-                max_latency = max(latencies)
-                jitter = statistics.stdev(latencies) if len(latencies) > 1 else 0
-                packet_loss = 0.0  # Mock packet loss
-                availability = 100.0  # Mock availability
+                if latencies:
+                    samples = np.fromiter(latencies, dtype='f8', count=len(latencies))
+                    avg_latency = float(samples.mean())
+                    min_latency = float(samples.min())
+                    max_latency = float(samples.max())
+                else:
+                    avg_latency = min_latency = max_latency = 0.0
+                jitter = self._ewma_jitter.get(target, 0.0)
+                packet_loss = 100.0 * (len(replies) - len(latencies)) / len(replies)
+                availability = 100.0 if latencies else 0.0
                 
                 # Calculate quality score (0-100)
                 quality_score = self._calculate_quality_score(
@@ -244,12 +416,17 @@ class EnhancedNetworkTools:
                 )
                 
                 results.append(metrics)
+                PERFORMANCE_HISTORY.append(
+                    target, metrics.timestamp,
+                    latency=metrics.avg_latency if latencies else np.nan,
+                    quality_score=metrics.quality_score
+                )
                 
                 # Check alert rules
                 self._check_alert_rules(target, metrics)
                 
-                # Wait for next sample (30 seconds)
-                await asyncio.sleep(30)
+                # Wait for next sample (every 30 seconds)
+                await asyncio.sleep(max(0.0, 30 - (loop.time() - sample_start)))
                 
             except Exception as e:
                 print(f"Monitoring error: {e}")
@@ -257,6 +434,15 @@ class EnhancedNetworkTools:
         
         return results
     
+    def _update_jitter(self, target: str, latency: float):
+        """Fold a latency sample into the target's RFC 1889 jitter estimate"""
+        previous = self._last_latency.get(target)
+        if previous is not None:
+            jitter = self._ewma_jitter.get(target, 0.0)
+            jitter += (abs(latency - previous) - jitter) / 16.0
+            self._ewma_jitter[target] = jitter
+        self._last_latency[target] = latency
+    
     def _calculate_quality_score(self, latency: float, jitter: float, 
                                 packet_loss: float, availability: float) -> float:
         """Calculate network quality score (0-100)"""
@@ -280,8 +466,8 @@ class EnhancedNetworkTools:
         """Check if any alert rules are triggered"""
         current_time = time.time()
         
-        for rule in ALERT_RULES:
-            if not rule.enabled or rule.target != target:
+        for rule in ALERT_RULES_BY_TARGET.get(target, ()):
+            if not rule.enabled:
                 continue
             
             # Avoid spamming alerts (minimum 5 minutes between same rule triggers)
@@ -292,19 +478,8 @@ class EnhancedNetworkTools:
             if metric_value is None:
                 continue
             
-            triggered = False
-            if rule.operator == '>':
-                triggered = metric_value > rule.threshold
-            elif rule.operator == '<':
-                triggered = metric_value < rule.threshold
-            elif rule.operator == '>=':
-                triggered = metric_value >= rule.threshold
-            elif rule.operator == '<=':
-                triggered = metric_value <= rule.threshold
-            elif rule.operator == '==':
-                triggered = abs(metric_value - rule.threshold) < 0.001
-            
-            if triggered:
+            compare = ALERT_OPERATORS.get(rule.operator)
+            if compare and compare(metric_value, rule.threshold):
                 rule.last_triggered = current_time
                 self._send_alert(rule, target, metric_value)
     
@@ -323,9 +498,16 @@ class EnhancedNetworkTools:
         # In a real implementation, this would send email/SMS/webhook
         print(f"ALERT: {rule.name} - {target} {rule.metric}={value} (threshold: {rule.threshold})")
     
-    async def network_topology_scan(self, network_range: str = "192.168.1.0/24") -> Dict:
+    async def network_topology_scan(self, network_range: str = "192.168.1.0/24",
+                                    max_concurrency: int = 64) -> Dict:
         """Advanced network topology discovery"""
-        devices = []
+        network = ipaddress.ip_network(network_range, strict=False)
+        if network.num_addresses > MAX_TOPOLOGY_SCAN_ADDRESSES:
+            raise ValueError(
+                f"Network range {network_range} is too large to scan "
+                f"(max {MAX_TOPOLOGY_SCAN_ADDRESSES} addresses)"
+            )
+        
         network_info = {
             'range': network_range,
             'scan_time': time.time(),
@@ -333,29 +515,34 @@ class EnhancedNetworkTools:
             'topology': {}
         }
         
-        # Simulate network scanning
-        base_ip = "192.168.1."
-        for i in range(1, 255, 10):  # Sample every 10th IP for demo
-            ip = base_ip + str(i)
+        hosts = [str(ip) for ip in network.hosts()]
+        gateway = hosts[0] if hosts else None
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def probe(ip: str) -> Optional[Dict]:
+            async with semaphore:
+                states = await asyncio.gather(
+                    *(self._tcp_probe(ip, port) for port in TOPOLOGY_SCAN_PORTS)
+                )
+            
+            # Any answer, even a refusal, means the host is up
+            if all(state is None for state in states):
+                return None
             
-            # Mock device discovery
-            device_info = {
+            return {
                 'ip': ip,
-                'mac': f"00:1A:2B:3C:4D:{i:02X}",
-                'hostname': f"device-{i}",
+                'mac': 'Unknown',
+                'hostname': 'Unknown',
                 'os': 'Unknown',
-                'open_ports': [22, 80, 443] if i % 3 == 0 else [80],
-                'device_type': 'router' if i == 1 else 'computer',
+                'open_ports': [port for port, state in zip(TOPOLOGY_SCAN_PORTS, states) if state],
+                'device_type': 'router' if ip == gateway else 'computer',
                 'vendor': 'Unknown',
                 'last_seen': time.time()
             }
-            
-            devices.append(device_info)
-            
-            # Simulate scan delay
-            await asyncio.sleep(0.1)
         
-        network_info['devices'] = devices
+        # Probe every host concurrently, bounded by the semaphore
+        results = await asyncio.gather(*(probe(ip) for ip in hosts))
+        network_info['devices'] = [device for device in results if device]
         return network_info
     
     def create_alert_rule(self, name: str, target: str, metric: str, 
@@ -371,6 +558,7 @@ class EnhancedNetworkTools:
             operator=operator
         )
         ALERT_RULES.append(rule)
+        ALERT_RULES_BY_TARGET.setdefault(target, []).append(rule)
         return rule_id
     
     def get_performance_summary(self, target: str, hours: int = 24) -> Dict:
@@ -378,27 +566,24 @@ class EnhancedNetworkTools:
         cutoff_time = time.time() - (hours * 3600)
         
         # Filter recent performance data
-        recent_data = [
-            metric for metric in PERFORMANCE_HISTORY 
-            if hasattr(metric, 'target') and metric.target == target and 
-               hasattr(metric, 'timestamp') and metric.timestamp > cutoff_time
-        ]
+        latencies, quality_scores = PERFORMANCE_HISTORY.select(target, cutoff_time)
         
-        if not recent_data:
+        if not len(latencies):
             return {'error': 'No recent performance data available'}
         
-        # Calculate summary statistics
-        latencies = [m.avg_latency for m in recent_data if hasattr(m, 'avg_latency')]
-        quality_scores = [m.quality_score for m in recent_data if hasattr(m, 'quality_score')]
+        # Calculate summary statistics, skipping samples without a value
+        sample_count = len(latencies)
+        latencies = latencies[~np.isnan(latencies)]
+        quality_scores = quality_scores[~np.isnan(quality_scores)]
         
         summary = {
             'target': target,
             'period_hours': hours,
-            'sample_count': len(recent_data),
-            'avg_latency': statistics.mean(latencies) if latencies else 0,
-            'min_latency': min(latencies) if latencies else 0,
-            'max_latency': max(latencies) if latencies else 0,
-            'avg_quality_score': statistics.mean(quality_scores) if quality_scores else 0,
+            'sample_count': sample_count,
+            'avg_latency': float(latencies.mean()) if latencies.size else 0,
+            'min_latency': float(latencies.min()) if latencies.size else 0,
+            'max_latency': float(latencies.max()) if latencies.size else 0,
+            'avg_quality_score': float(quality_scores.mean()) if quality_scores.size else 0,
             'uptime_percentage': 99.5,  # Mock uptime
             'incidents_count': 2,       # Mock incidents
             'last_updated': time.time()
@@ -413,7 +598,7 @@ enhanced_tools = EnhancedNetworkTools()
 async def run_bandwidth_test(target: str, session_id: str = None) -> Dict:
     """Run bandwidth test with session management"""
     result = await enhanced_tools.bandwidth_test(target, session_id)
-    return asdict(result)
+    return result.to_dict()
 
 async def start_continuous_monitoring(target: str, duration_minutes: int = 60) -> str:
     """Start continuous monitoring session"""
@@ -460,7 +645,7 @@ def get_active_tests() -> List[Dict]:
 
 def get_alert_rules() -> List[Dict]:
     """Get all alert rules"""
-    return [asdict(rule) for rule in ALERT_RULES]
+    return [rule.to_dict() for rule in ALERT_RULES]
 
 def get_recent_alerts(hours: int = 24) -> List[Dict]:
     """Get recent alerts"""
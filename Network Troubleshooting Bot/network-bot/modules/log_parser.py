@@ -2,16 +2,31 @@
 Log Parser Module for Network Troubleshooting Bot
 Analyzes network device logs to identify issues and patterns
 """
+import heapq
 import re
 import time
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any, Tuple
-from dataclasses import dataclass
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Any, Tuple, Union
+from dataclasses import dataclass, field
 from enum import Enum
 import logging
 
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
+_MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+# '.*literal' followed by another '.*'
+_WILDCARD_LITERAL = re.compile(r'\.\*([\w ]+)(?=\.\*)')
+
 class LogSeverity(Enum):
     EMERGENCY = 0    # System is unusable
     ALERT = 1        # Action must be taken immediately
@@ -22,7 +37,7 @@ class LogSeverity(Enum):
     INFO = 6         # Informational messages
     DEBUG = 7        # Debug-level messages
 
-@dataclass
+@dataclass(slots=True)
 class LogEntry:
     timestamp: datetime
     severity: LogSeverity
@@ -32,8 +47,16 @@ class LogEntry:
     message: str
     raw_line: str
     parsed_data: Dict[str, Any]
+    _folded_message: Optional[str] = field(default=None, init=False, repr=False, compare=False)
+    
+    @property
+    def folded_message(self) -> str:
+        """Casefolded message, computed once and shared by every analyzer"""
+        if self._folded_message is None:
+            self._folded_message = self.message.casefold()
+        return self._folded_message
 
-@dataclass
+@dataclass(slots=True)
 class LogAnalysis:
     total_entries: int
     time_range: Tuple[datetime, datetime]
@@ -47,11 +70,35 @@ class LogAnalysis:
 
 class NetworkLogParser:
     def __init__(self):
+        # Syslog timestamps carry no year; assume the current one, refreshed per parse
+        self._year_cache = datetime.now().year
+        
+        # Anchored per line and kept from crossing newlines so it can scan a
+        # whole buffer with finditer as well as match a single line. Each run
+        # is followed by a token it can never match (word then space, digits
+        # then ':'), so a line that doesn't fit fails without the engine
+        # finding other splits to retry.
         self.syslog_pattern = re.compile(
+            r'^(?P<timestamp>\w+[^\S\n]+\d+[^\S\n]+\d+:\d+:\d+)[^\S\n]+'
+            r'(?P<hostname>\S+)[^\S\n]+'
+            r'(?P<process>\S+?):[^\S\n]*'
+            r'(?:%(?P<facility>\w+)-(?P<severity>\d+)-(?P<mnemonic>\w+):[^\S\n]*)?'
+            r'(?P<message>.*)$',
+            re.MULTILINE
+        )
+        
+        # Cisco format: timestamp: %FACILITY-SEVERITY-MNEMONIC: message
+        self.cisco_pattern = re.compile(
+            r'(?P<timestamp>\*?\w+\s+\d+\s+\d+:\d+:\d+(?:\.\d+)?)\s*:\s*'
+            r'%(?P<facility>\w+)-(?P<severity>\d+)-(?P<mnemonic>\w+):\s*'
+            r'(?P<message>.*)'
+        )
+        
+        # Juniper format: timestamp hostname process[pid]: message
+        self.juniper_pattern = re.compile(
             r'(?P<timestamp>\w+\s+\d+\s+\d+:\d+:\d+)\s+'
             r'(?P<hostname>\S+)\s+'
-            r'(?P<process>\S+?):\s*'
-            r'(?:%(?P<facility>\w+)-(?P<severity>\d+)-(?P<mnemonic>\w+):\s*)?'
+            r'(?P<process>\w+)(?:\[(?P<pid>\d+)\])?\s*:\s*'
             r'(?P<message>.*)'
         )
         
@@ -113,25 +160,169 @@ class NetworkLogParser:
         # Performance indicators
         self.performance_patterns = {
             'high_latency': [
-                r'Latency.*(\d+)ms',
-                r'RTT.*(\d+)ms'
+                r'Latency.*?(\d+)ms',
+                r'RTT.*?(\d+)ms'
             ],
             'packet_loss': [
-                r'Packet loss.*(\d+)%',
+                r'Packet loss.*?(\d+)%',
                 r'(\d+)%.*packet.*loss'
             ],
             'bandwidth_utilization': [
-                r'Bandwidth.*(\d+)%',
-                r'Utilization.*(\d+)%'
+                r'Bandwidth.*?(\d+)%',
+                r'Utilization.*?(\d+)%'
             ]
         }
+        
+        # Compile every pattern once rather than going through re's cache per call.
+        # The pattern strings stay Hyperscan-compatible; only the re copies are
+        # rewritten to avoid backtracking
+        self._compiled_error_patterns = {
+            category: [re.compile(_harden_pattern(pattern), re.IGNORECASE) for pattern in patterns]
+            for category, patterns in self.error_patterns.items()
+        }
+        self._compiled_performance_patterns = {
+            issue_type: [re.compile(_harden_pattern(pattern), re.IGNORECASE) for pattern in patterns]
+            for issue_type, patterns in self.performance_patterns.items()
+        }
+        
+        # Flatten the error patterns so every message is matched against the
+        # whole set in one scan instead of one regex call per pattern
+        self._error_pattern_bank = [
+            (category, pattern)
+            for category, patterns in self.error_patterns.items()
+            for pattern in patterns
+        ]
+        self._compiled_error_bank = [
+            compiled
+            for compiled_patterns in self._compiled_error_patterns.values()
+            for compiled in compiled_patterns
+        ]
+        # Interface up/down patterns as one alternation; each alternative is
+        # wrapped in a named group so lastgroup says which one hit
+        interface_alternatives = []
+        self._interface_alternatives = {}
+        for state in ('down', 'up'):
+            for i, pattern in enumerate(self.error_patterns[f'interface_{state}']):
+                name = f'{state}{i}'
+                interface_alternatives.append(f'(?P<{name}>{_harden_pattern(pattern)})')
+                self._interface_alternatives[name] = (state, re.compile(pattern).groups > 0)
+        self._interface_matcher = re.compile('|'.join(interface_alternatives), re.IGNORECASE)
+        
+        # Literal each pattern requires, used to skip regexes that cannot match
+        self._error_bank_literals = [
+            _required_literal(pattern) for _, pattern in self._error_pattern_bank
+        ]
+        self._error_pattern_db = self._compile_pattern_db(
+            [pattern for _, pattern in self._error_pattern_bank]
+        )
+        
+        # Same for the performance patterns: Hyperscan says which ones occur and
+        # only those are re-run with findall to pull out the values
+        self._performance_pattern_bank = [
+            (issue_type, compiled)
+            for issue_type, compiled_patterns in self._compiled_performance_patterns.items()
+            for compiled in compiled_patterns
+        ]
+        self._performance_pattern_db = self._compile_pattern_db(
+            [pattern for patterns in self.performance_patterns.values() for pattern in patterns]
+        )
+        
+        # One compiled alternation per category for analyzers that only need
+        # to know whether a category matched
+        self._error_category_matchers = {
+            category: re.compile(
+                '|'.join(f'(?:{_harden_pattern(pattern)})' for pattern in patterns), re.IGNORECASE
+            )
+            for category, patterns in self.error_patterns.items()
+        }
+        # Literals one of which a category match needs, or None if any pattern lacks one
+        self._error_category_literals = {}
+        for category, patterns in self.error_patterns.items():
+            literals = tuple(_required_literal(pattern) for pattern in patterns)
+            self._error_category_literals[category] = None if None in literals else literals
+    
+    def _compile_pattern_db(self, patterns: List[str]):
+        """Compile patterns into a Hyperscan database, or None to use re"""
+        if not HYPERSCAN_AVAILABLE:
+            return None
+        
+        try:
+            db = hyperscan.Database()
+            db.compile(
+                expressions=[pattern.encode() for pattern in patterns],
+                ids=list(range(len(patterns))),
+                # UTF8/UCP keep \d, \s and \w in line with re's Unicode str matching
+                flags=[hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH |
+                       hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP] * len(patterns)
+            )
+            return db
+        except hyperscan.error as e:
+            logger.warning(f"Hyperscan compile failed, falling back to re: {e}")
+            return None
+    
+    @staticmethod
+    def _collect_match(pattern_id, start, end, flags, context):
+        """Hyperscan match callback that records the matching pattern id"""
+        context.append(pattern_id)
+    
+    def _scan_pattern_db(self, db, message: str) -> List[int]:
+        """Return the sorted ids of every pattern in a Hyperscan database found in a message"""
+        hits = []
+        db.scan(
+            message.encode(errors='replace'),
+            match_event_handler=self._collect_match,
+            context=hits
+        )
+        hits.sort()
+        return hits
+    
+    def _match_error_patterns(self, entry: LogEntry) -> List[int]:
+        """Return the bank indices of all error patterns found in an entry's message"""
+        message = entry.message
+        if self._error_pattern_db is not None:
+            return self._scan_pattern_db(self._error_pattern_db, message)
+        
+        # Most messages lack the pattern's literal, so check that before the regex
+        folded = entry.folded_message
+        return [
+            index
+            for index, (literal, compiled) in enumerate(zip(self._error_bank_literals, self._compiled_error_bank))
+            if (literal is None or literal in folded) and compiled.search(message)
+        ]
     
-    def parse_log_file(self, log_content: str, log_format: str = 'syslog') -> List[LogEntry]:
+    def _category_may_match(self, category: str, entry: LogEntry) -> bool:
+        """Cheap literal check that rules out most entries before a category regex"""
+        literals = self._error_category_literals[category]
+        if literals is None:
+            return True
+        folded = entry.folded_message
+        return any(literal in folded for literal in literals)
+    
+    def parse_log_file(self, log_content: Union[str, bytes, IO], log_format: str = 'syslog') -> List[LogEntry]:
         """
         Parse log file content and return structured log entries
         """
-        entries = []
-        lines = log_content.split('\n')
+        return list(self.iter_log_entries(log_content, log_format))
+    
+    def iter_log_entries(self, log_content: Union[str, bytes, IO], log_format: str = 'syslog') -> Iterator[LogEntry]:
+        """
+        Lazily parse log content, a string, bytes or an open file, into entries
+        """
+        self._year_cache = datetime.now().year
+        
+        if isinstance(log_content, (bytes, bytearray)):
+            log_content = log_content.decode('utf-8', errors='replace')
+        
+        if isinstance(log_content, str) and log_format == 'syslog':
+            # Scan the whole buffer in one pass instead of splitting it into lines
+            for match in self.syslog_pattern.finditer(log_content):
+                try:
+                    yield self._syslog_entry_from_match(match)
+                except Exception as e:
+                    logger.warning(f"Failed to parse entry at offset {match.start()}: {str(e)}")
+            return
+        
+        lines = _iter_lines(log_content) if isinstance(log_content, str) else _iter_file_lines(log_content)
         
         for line_num, line in enumerate(lines, 1):
             if not line.strip():
@@ -148,12 +339,29 @@ class NetworkLogParser:
                     entry = self._parse_generic_log_line(line)
                 
                 if entry:
-                    entries.append(entry)
+                    yield entry
                     
             except Exception as e:
                 logger.warning(f"Failed to parse line {line_num}: {str(e)}")
-        
-        return entries
+    
+    def _parse_timestamp(self, timestamp_str: str) -> datetime:
+        """Parse a 'Mon DD HH:MM:SS[.ffffff]' timestamp without strptime"""
+        month_name, day, clock = timestamp_str.split()
+        hour, minute, second = clock.split(':')
+        
+        microsecond = 0
+        if '.' in second:
+            second, fraction = second.split('.', 1)
+            if len(fraction) > 6:
+                raise ValueError(f"Invalid fractional seconds: {timestamp_str}")
+            microsecond = int(fraction.ljust(6, '0'))
+        
+        month = _MONTHS.get(month_name.lower())
+        if month is None or max(len(day), len(hour), len(minute), len(second)) > 2:
+            raise ValueError(f"Invalid timestamp: {timestamp_str}")
+        
+        return datetime(self._year_cache, month, int(day), int(hour), int(minute),
+                        int(second), microsecond)
     
     def _parse_syslog_line(self, line: str) -> Optional[LogEntry]:
         """Parse standard syslog format"""
@@ -161,14 +369,16 @@ class NetworkLogParser:
         if not match:
             return None
         
+        return self._syslog_entry_from_match(match)
+    
+    def _syslog_entry_from_match(self, match: re.Match) -> LogEntry:
+        """Build a log entry from a syslog pattern match"""
         groups = match.groupdict()
         
         # Parse timestamp
         timestamp_str = groups['timestamp']
         try:
-            # Assume current year if not specified
-            current_year = datetime.now().year
-            timestamp = datetime.strptime(f"{current_year} {timestamp_str}", "%Y %b %d %H:%M:%S")
+            timestamp = self._parse_timestamp(timestamp_str)
         except ValueError:
             timestamp = datetime.now()
         
@@ -196,20 +406,13 @@ class NetworkLogParser:
             hostname=groups['hostname'],
             process=groups['process'],
             message=groups['message'],
-            raw_line=line,
+            raw_line=match.group(0),
             parsed_data=parsed_data
         )
     
     def _parse_cisco_log_line(self, line: str) -> Optional[LogEntry]:
         """Parse Cisco-specific log format"""
-        # Cisco format: timestamp: %FACILITY-SEVERITY-MNEMONIC: message
-        cisco_pattern = re.compile(
-            r'(?P<timestamp>\*?\w+\s+\d+\s+\d+:\d+:\d+(?:\.\d+)?)\s*:\s*'
-            r'%(?P<facility>\w+)-(?P<severity>\d+)-(?P<mnemonic>\w+):\s*'
-            r'(?P<message>.*)'
-        )
-        
-        match = cisco_pattern.match(line)
+        match = self.cisco_pattern.match(line)
         if not match:
             return self._parse_generic_log_line(line)
         
@@ -218,13 +421,9 @@ class NetworkLogParser:
         # Parse timestamp
         timestamp_str = groups['timestamp'].lstrip('*')
         try:
-            current_year = datetime.now().year
-            timestamp = datetime.strptime(f"{current_year} {timestamp_str}", "%Y %b %d %H:%M:%S")
+            timestamp = self._parse_timestamp(timestamp_str)
         except ValueError:
-            try:
-                timestamp = datetime.strptime(f"{current_year} {timestamp_str}", "%Y %b %d %H:%M:%S.%f")
-            except ValueError:
-                timestamp = datetime.now()
+            timestamp = datetime.now()
         
         # Parse severity
         try:
@@ -248,15 +447,7 @@ class NetworkLogParser:
     
     def _parse_juniper_log_line(self, line: str) -> Optional[LogEntry]:
         """Parse Juniper-specific log format"""
-        # Juniper format: timestamp hostname process[pid]: message
-        juniper_pattern = re.compile(
-            r'(?P<timestamp>\w+\s+\d+\s+\d+:\d+:\d+)\s+'
-            r'(?P<hostname>\S+)\s+'
-            r'(?P<process>\w+)(?:\[(?P<pid>\d+)\])?\s*:\s*'
-            r'(?P<message>.*)'
-        )
-        
-        match = juniper_pattern.match(line)
+        match = self.juniper_pattern.match(line)
         if not match:
             return self._parse_generic_log_line(line)
         
@@ -265,16 +456,16 @@ class NetworkLogParser:
         # Parse timestamp
         timestamp_str = groups['timestamp']
         try:
-            current_year = datetime.now().year
-            timestamp = datetime.strptime(f"{current_year} {timestamp_str}", "%Y %b %d %H:%M:%S")
+            timestamp = self._parse_timestamp(timestamp_str)
         except ValueError:
             timestamp = datetime.now()
         
         # Determine severity from message content
+        # Error keywords win over 'warn' wherever they appear ('warning' contains 'warn')
         message = groups['message'].lower()
-        if any(keyword in message for keyword in ['error', 'fail', 'critical']):
+        if 'error' in message or 'fail' in message or 'critical' in message:
             severity = LogSeverity.ERROR
-        elif any(keyword in message for keyword in ['warn', 'warning']):
+        elif 'warn' in message:
             severity = LogSeverity.WARNING
         else:
             severity = LogSeverity.INFO
@@ -319,15 +510,47 @@ class NetworkLogParser:
             if start_time <= entry.timestamp <= end_time
         ]
         
+        return self._analyze_window(filtered_entries, start_time, end_time)
+    
+    def analyze_log_stream(self, log_content: Union[str, bytes, IO, Iterable[str]],
+                           log_format: str = 'syslog', time_window_hours: int = 24) -> LogAnalysis:
+        """
+        Parse and analyze log content in one pass without keeping every entry.
+        Gives the same result as analyze_logs(parse_log_file(...)).
+        """
+        window = timedelta(hours=time_window_hours)
+        end_time = None
+        # Entries still inside the window of the newest timestamp seen so far,
+        # as a min-heap on (timestamp, arrival order)
+        window_heap = []
+        
+        for order, entry in enumerate(self.iter_log_entries(log_content, log_format)):
+            if end_time is None or entry.timestamp > end_time:
+                end_time = entry.timestamp
+                cutoff = end_time - window
+                while window_heap and window_heap[0][0] < cutoff:
+                    heapq.heappop(window_heap)
+            if entry.timestamp >= end_time - window:
+                heapq.heappush(window_heap, (entry.timestamp, order, entry))
+        
+        if end_time is None:
+            return self._empty_analysis()
+        
+        # Restore log order so results match the list-based analysis
+        window_heap.sort(key=lambda item: item[1])
+        filtered_entries = [entry for _, _, entry in window_heap]
+        return self._analyze_window(filtered_entries, end_time - window, end_time)
+    
+    def _analyze_window(self, filtered_entries: List[LogEntry], start_time: datetime,
+                        end_time: datetime) -> LogAnalysis:
+        """Run every analyzer over the entries inside the time window"""
         if not filtered_entries:
             return self._empty_analysis()
         
-        # Count severities
-        severity_counts = {}
-        for severity in LogSeverity:
-            severity_counts[severity] = sum(
-                1 for entry in filtered_entries if entry.severity == severity
-            )
+        # Count severities in one pass; every level is reported, even at zero
+        severity_counts = dict.fromkeys(LogSeverity, 0)
+        for entry in filtered_entries:
+            severity_counts[entry.severity] += 1
         
         # Find error patterns
         error_patterns = self._find_error_patterns(filtered_entries)
@@ -358,33 +581,33 @@ class NetworkLogParser:
     
     def _find_error_patterns(self, log_entries: List[LogEntry]) -> List[Dict[str, Any]]:
         """Find common error patterns in logs"""
+        # Keyed by bank index; each index is one category:pattern pair
         pattern_counts = {}
+        error_severities = (LogSeverity.ERROR, LogSeverity.CRITICAL, LogSeverity.ALERT)
         
         for entry in log_entries:
-            if entry.severity in [LogSeverity.ERROR, LogSeverity.CRITICAL, LogSeverity.ALERT]:
-                # Check against known patterns
-                for category, patterns in self.error_patterns.items():
-                    for pattern in patterns:
-                        matches = re.findall(pattern, entry.message, re.IGNORECASE)
-                        if matches:
-                            key = f"{category}:{pattern}"
-                            if key not in pattern_counts:
-                                pattern_counts[key] = {
-                                    'category': category,
-                                    'pattern': pattern,
-                                    'count': 0,
-                                    'examples': [],
-                                    'affected_devices': set()
-                                }
-                            pattern_counts[key]['count'] += 1
-                            pattern_counts[key]['examples'].append(entry.message)
-                            pattern_counts[key]['affected_devices'].add(entry.hostname)
+            if entry.severity in error_severities:
+                # Check against known patterns in a single scan
+                for index in self._match_error_patterns(entry):
+                    pattern_data = pattern_counts.get(index)
+                    if pattern_data is None:
+                        category, pattern = self._error_pattern_bank[index]
+                        pattern_data = pattern_counts[index] = {
+                            'category': category,
+                            'pattern': pattern,
+                            'count': 0,
+                            'examples': [],
+                            'affected_devices': set()
+                        }
+                    pattern_data['count'] += 1
+                    if len(pattern_data['examples']) < 5:  # Limit examples
+                        pattern_data['examples'].append(entry.message)
+                    pattern_data['affected_devices'].add(entry.hostname)
         
         # Convert to list and sort by count
         error_patterns = []
         for pattern_data in pattern_counts.values():
             pattern_data['affected_devices'] = list(pattern_data['affected_devices'])
-            pattern_data['examples'] = pattern_data['examples'][:5]  # Limit examples
             error_patterns.append(pattern_data)
         
         return sorted(error_patterns, key=lambda x: x['count'], reverse=True)[:10]
@@ -394,26 +617,25 @@ class NetworkLogParser:
         interface_events = {}
         
         for entry in log_entries:
-            # Check for interface up/down events
-            for pattern in self.error_patterns['interface_down'] + self.error_patterns['interface_up']:
-                matches = re.findall(pattern, entry.message, re.IGNORECASE)
-                for match in matches:
-                    interface = match if isinstance(match, str) else match[0]
-                    if interface not in interface_events:
-                        interface_events[interface] = {
-                            'interface': interface,
-                            'down_events': 0,
-                            'up_events': 0,
-                            'last_event': None,
-                            'flapping': False
-                        }
-                    
-                    if 'down' in entry.message.lower():
-                        interface_events[interface]['down_events'] += 1
-                    elif 'up' in entry.message.lower():
-                        interface_events[interface]['up_events'] += 1
-                    
-                    interface_events[interface]['last_event'] = entry.timestamp
+            # Check for interface up/down events in a single search
+            match = self._interface_matcher.search(entry.message)
+            if not match:
+                continue
+            
+            state, has_group = self._interface_alternatives[match.lastgroup]
+            # The pattern's own capture group follows its named wrapper
+            interface = match.group(match.lastindex + 1) if has_group else match.group(0)
+            if interface not in interface_events:
+                interface_events[interface] = {
+                    'interface': interface,
+                    'down_events': 0,
+                    'up_events': 0,
+                    'last_event': None,
+                    'flapping': False
+                }
+            
+            interface_events[interface][f'{state}_events'] += 1
+            interface_events[interface]['last_event'] = entry.timestamp
         
         # Detect interface flapping
         for interface_data in interface_events.values():
@@ -426,16 +648,16 @@ class NetworkLogParser:
     def _analyze_routing_issues(self, log_entries: List[LogEntry]) -> List[Dict[str, Any]]:
         """Analyze routing-related issues"""
         routing_issues = []
+        routing_matcher = self._error_category_matchers['routing_issues']
         
         for entry in log_entries:
-            for pattern in self.error_patterns['routing_issues']:
-                if re.search(pattern, entry.message, re.IGNORECASE):
-                    routing_issues.append({
-                        'timestamp': entry.timestamp,
-                        'hostname': entry.hostname,
-                        'message': entry.message,
-                        'severity': entry.severity.name
-                    })
+            if self._category_may_match('routing_issues', entry) and routing_matcher.search(entry.message):
+                routing_issues.append({
+                    'timestamp': entry.timestamp,
+                    'hostname': entry.hostname,
+                    'message': entry.message,
+                    'severity': entry.severity.name
+                })
         
         return routing_issues
     
@@ -443,21 +665,24 @@ class NetworkLogParser:
         """Analyze security-related events"""
         security_events = []
         
-        security_patterns = (
-            self.error_patterns['authentication_failure'] + 
-            self.error_patterns['port_security']
+        security_matchers = (
+            ('authentication', 'authentication_failure'),
+            ('port_security', 'port_security')
         )
         
         for entry in log_entries:
-            for pattern in security_patterns:
-                if re.search(pattern, entry.message, re.IGNORECASE):
+            for event_type, category in security_matchers:
+                if (self._category_may_match(category, entry) and
+                        self._error_category_matchers[category].search(entry.message)):
                     security_events.append({
                         'timestamp': entry.timestamp,
                         'hostname': entry.hostname,
                         'message': entry.message,
                         'severity': entry.severity.name,
-                        'type': 'authentication' if 'auth' in pattern.lower() else 'port_security'
+                        'type': event_type
                     })
+                    # One event per entry; authentication takes precedence
+                    break
         
         return security_events
     
@@ -465,23 +690,32 @@ class NetworkLogParser:
         """Analyze performance-related issues"""
         performance_issues = []
         
+        bank = self._performance_pattern_bank
+        all_indices = range(len(bank))
+        
         for entry in log_entries:
-            for issue_type, patterns in self.performance_patterns.items():
-                for pattern in patterns:
-                    matches = re.findall(pattern, entry.message, re.IGNORECASE)
-                    for match in matches:
-                        value = match if isinstance(match, str) else match[0]
-                        try:
-                            numeric_value = float(value)
-                            performance_issues.append({
-                                'timestamp': entry.timestamp,
-                                'hostname': entry.hostname,
-                                'type': issue_type,
-                                'value': numeric_value,
-                                'message': entry.message
-                            })
-                        except ValueError:
-                            continue
+            # Without Hyperscan every pattern has to be tried
+            if self._performance_pattern_db is not None:
+                indices = self._scan_pattern_db(self._performance_pattern_db, entry.message)
+            else:
+                indices = all_indices
+            
+            for index in indices:
+                issue_type, compiled = bank[index]
+                matches = compiled.findall(entry.message)
+                for match in matches:
+                    value = match if isinstance(match, str) else match[0]
+                    try:
+                        numeric_value = float(value)
+                        performance_issues.append({
+                            'timestamp': entry.timestamp,
+                            'hostname': entry.hostname,
+                            'type': issue_type,
+                            'value': numeric_value,
+                            'message': entry.message
+                        })
+                    except ValueError:
+                        continue
         
         return performance_issues
     
@@ -517,8 +751,7 @@ class NetworkLogParser:
                 recommendations.append(f"Multiple authentication failures detected. Possible security threat.")
         
         # Performance issues
-        high_cpu_issues = [issue for issue in performance_issues if issue.get('type') == 'high_cpu' and issue.get('value', 0) > 90]
-        if high_cpu_issues:
+        if any(issue.get('type') == 'high_cpu' and issue.get('value', 0) > 90 for issue in performance_issues):
             recommendations.append("High CPU utilization detected. Review running processes and optimize configuration.")
         
         # Top error patterns
@@ -545,18 +778,80 @@ class NetworkLogParser:
             recommendations=["No log entries found to analyze."]
         )
 
+def _harden_pattern(pattern: str) -> str:
+    """Rewrite a pattern so re does not backtrack quadratically on long lines"""
+    # A leading word or number capture can only start at a word or number boundary;
+    # retrying it from every character inside a long token is wasted work
+    if pattern.startswith(r'(\S+)'):
+        pattern = r'(?<!\S)' + pattern
+    elif pattern.startswith(r'(\d+)'):
+        pattern = r'(?<!\d)' + pattern
+    
+    # When another .* follows, the first occurrence of a literal is as good as
+    # any later one, so scan forward to it instead of backtracking from the line end
+    return _WILDCARD_LITERAL.sub(r'(?:.*?\1)', pattern)
+
+def _required_literal(pattern: str) -> Optional[str]:
+    """Longest literal run that every match of a simple pattern must contain"""
+    # Alternation, optional parts and classes make literals unsafe to require
+    if any(token in pattern for token in ('|', '?', '[', '{', ')*')):
+        return None
+    
+    runs, current, i = [], '', 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\':
+            escaped = pattern[i + 1:i + 2]
+            if escaped.isalnum():  # Class escape such as \s or \d
+                runs.append(current)
+                current = ''
+            else:
+                current += escaped
+            i += 2
+            continue
+        if ch == '*':
+            runs.append(current[:-1])  # The starred character is optional
+            current = ''
+        elif ch in '.^$()+':
+            runs.append(current)
+            current = ''
+        else:
+            current += ch
+        i += 1
+    runs.append(current)
+    
+    literal = max(runs, key=len).casefold()
+    return literal or None
+
+def _iter_lines(text: str) -> Iterator[str]:
+    """Yield the lines of a string without building a list of them"""
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+def _iter_file_lines(log_file: IO) -> Iterator[str]:
+    """Yield the lines of an open text or binary file one at a time"""
+    for line in log_file:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8', errors='replace')
+        yield line.rstrip('\n')
+
 # Convenience functions
-def parse_log_content(log_content: str, log_format: str = 'syslog') -> List[LogEntry]:
+def parse_log_content(log_content: Union[str, bytes, IO], log_format: str = 'syslog') -> List[LogEntry]:
     """Parse log content and return entries"""
     parser = NetworkLogParser()
     return parser.parse_log_file(log_content, log_format)
 
-def analyze_log_content(log_content: str, log_format: str = 'syslog', 
+def analyze_log_content(log_content: Union[str, bytes, IO], log_format: str = 'syslog', 
                        time_window_hours: int = 24) -> LogAnalysis:
     """Parse and analyze log content in one step"""
     parser = NetworkLogParser()
-    entries = parser.parse_log_file(log_content, log_format)
-    return parser.analyze_logs(entries, time_window_hours)
+    return parser.analyze_log_stream(log_content, log_format, time_window_hours)
 
 def get_critical_events(log_entries: List[LogEntry]) -> List[LogEntry]:
     """Get only critical and error events"""
@@ -5,8 +5,10 @@ Advanced network discovery and device cataloging system
 """
 
 import asyncio
+import ctypes
+import errno
+import selectors
 import socket
-import subprocess
 import platform
 import ipaddress
 import json
@@ -17,7 +19,20 @@ from dataclasses import dataclass, asdict
 import concurrent.futures
 import re
 
-@dataclass
+from .ping_test import icmp_echo, icmp_socket_available
+from .ttl_cache import TTLCache
+
+try:
+    from icmplib import async_multiping, ICMPLibError
+    ICMPLIB_AVAILABLE = True
+except ImportError:
+    ICMPLIB_AVAILABLE = False
+
+# Resolved once at import; the platform cannot change under a running process
+_SYSTEM = platform.system().lower()
+_IS_WINDOWS = _SYSTEM == "windows"
+
+@dataclass(slots=True)
 class NetworkDevice:
     """Represents a discovered network device"""
     ip_address: str
@@ -33,7 +48,7 @@ class NetworkDevice:
     is_gateway: bool = False
     dhcp_info: Optional[Dict] = None
 
-@dataclass
+@dataclass(slots=True)
 class NetworkScanResult:
     """Network scan results"""
     network_range: str
@@ -50,10 +65,36 @@ class RealNetworkDirectory:
     """Real network discovery and directory system"""
     
     def __init__(self):
-        self.system = platform.system().lower()
         self.known_vendors = self._load_vendor_database()
+        # Same table keyed by the raw 3-byte OUI, independent of MAC notation
+        self._oui_map = {bytes.fromhex(oui.replace(':', '')): vendor for oui, vendor in self.known_vendors.items()}
         self.common_ports = [21, 22, 23, 25, 53, 80, 135, 139, 443, 445, 993, 995, 1433, 3389, 5432, 8080]
         self.service_signatures = self._load_service_signatures()
+        self.icmp_privileged = self._detect_icmp_mode()
+        # Without icmplib, unprivileged ICMP sockets still avoid a ping fork per host
+        self.icmp_socket_available = icmp_socket_available()
+        # Reverse lookups are cached across scans; misses expire sooner so a
+        # newly added PTR record shows up on the next scan
+        self._ptr_cache = TTLCache(maxsize=4096, ttl=300.0)
+        self.negative_ptr_ttl = 30.0
+        self.hostname_timeout = 1.0
+        # The default route rarely changes between scans
+        self._route_cache = TTLCache(maxsize=1, ttl=300.0)
+    
+    def _detect_icmp_mode(self) -> Optional[bool]:
+        """Return icmplib's privileged flag for this process, or None if it cannot send ICMP"""
+        if not ICMPLIB_AVAILABLE:
+            return None
+        
+        # Raw sockets need root/CAP_NET_RAW; Linux also allows unprivileged
+        # ICMP datagram sockets when ping_group_range permits it
+        for privileged, sock_type in ((True, socket.SOCK_RAW), (False, socket.SOCK_DGRAM)):
+            try:
+                socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP).close()
+                return privileged
+            except OSError:
+                continue
+        return None
     
     def _load_vendor_database(self) -> Dict[str, str]:
         """Load MAC address vendor database"""
@@ -101,30 +142,27 @@ class RealNetworkDirectory:
         active_ips = await self._ping_sweep(network)
         print(f"Found {len(active_ips)} active hosts")
         
-        # Detailed scan of active hosts
-        devices = []
-        tasks = []
+        # The sweep has just filled the ARP cache; read it once for every device
+        arp_table = await self._load_arp_table()
         
+        # Detailed scan of active hosts
         # Limit concurrent scans to avoid overwhelming network
         semaphore = asyncio.Semaphore(10)
+        completed = 0
         
         async def scan_device_limited(ip):
+            nonlocal completed
             async with semaphore:
-                return await self._scan_device_details(ip, gateway_ip)
-        
-        for ip in active_ips:
-            task = scan_device_limited(ip)
-            tasks.append(task)
-        
-        # Execute scans with progress tracking
-        completed = 0
-        for coro in asyncio.as_completed(tasks):
-            device = await coro
-            if device:
-                devices.append(device)
+                device = await self._scan_device_details(ip, gateway_ip, arp_table)
+            
+            # Progress is tracked here so gather needs no completion queue
             completed += 1
             if completed % 5 == 0:  # Progress update every 5 devices
                 print(f"Scanned {completed}/{len(active_ips)} devices...")
+            return device
+        
+        results = await asyncio.gather(*(scan_device_limited(ip) for ip in active_ips))
+        devices = [device for device in results if device]
         
         end_time = time.time()
         
@@ -132,7 +170,7 @@ class RealNetworkDirectory:
             network_range=str(network),
             scan_start_time=start_time,
             scan_end_time=end_time,
-            total_hosts_scanned=len(list(network.hosts())),
+            total_hosts_scanned=_count_hosts(network),
             active_hosts_found=len(devices),
             devices=devices,
             gateway_ip=gateway_ip,
@@ -168,11 +206,23 @@ class RealNetworkDirectory:
     
     async def _ping_sweep(self, network: ipaddress.IPv4Network) -> List[str]:
         """Perform ping sweep to find active hosts"""
-        active_ips = []
-        tasks = []
+        # One process multiplexing every echo request beats a ping fork per host
+        if self.icmp_privileged is not None:
+            try:
+                hosts = await async_multiping(
+                    [str(ip) for ip in network.hosts()],
+                    count=1,
+                    timeout=2,
+                    concurrent_tasks=256,
+                    privileged=self.icmp_privileged
+                )
+                return [host.address for host in hosts if host.is_alive]
+            except (ICMPLibError, OSError):
+                pass  # Fall back to the ping command
         
-        # Limit concurrent pings
-        semaphore = asyncio.Semaphore(50)
+        # Limit concurrent pings; echoes on the shared ICMP socket cost one
+        # sendto each, so far more of them can be in flight than ping processes
+        semaphore = asyncio.Semaphore(256 if self.icmp_socket_available else 50)
         
         async def ping_host(ip_str):
             async with semaphore:
@@ -180,24 +230,24 @@ class RealNetworkDirectory:
                     return ip_str
                 return None
         
-        # Create ping tasks for all IPs in network
-        for ip in network.hosts():
-            ip_str = str(ip)
-            tasks.append(ping_host(ip_str))
-        
-        # Execute pings and collect results
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        for result in results:
-            if result and isinstance(result, str):
-                active_ips.append(result)
+        # Execute pings for all IPs in network and collect results
+        results = await asyncio.gather(
+            *(ping_host(str(ip)) for ip in network.hosts()),
+            return_exceptions=True
+        )
         
-        return active_ips
+        return [result for result in results if result and isinstance(result, str)]
     
     async def _ping_single_host(self, ip: str, timeout: float = 2.0) -> bool:
         """Ping a single host to check if it's alive"""
+        if self.icmp_socket_available:
+            try:
+                return await icmp_echo(ip, timeout) is not None
+            except OSError:
+                return False
+        
         try:
-            if self.system == "windows":
+            if _IS_WINDOWS:
                 cmd = ["ping", "-n", "1", "-w", str(int(timeout * 1000)), ip]
             else:
                 cmd = ["ping", "-c", "1", "-W", str(int(timeout)), ip]
@@ -214,9 +264,10 @@ class RealNetworkDirectory:
         except (asyncio.TimeoutError, Exception):
             return False
     
-    async def _scan_device_details(self, ip: str, gateway_ip: str = None) -> Optional[NetworkDevice]:
+    async def _scan_device_details(self, ip: str, gateway_ip: str = None,
+                                   arp_table: Optional[Dict[str, str]] = None) -> Optional[NetworkDevice]:
         """Scan detailed information about a device"""
-        start_time = time.time()
+        start_ns = time.monotonic_ns()
         
         device = NetworkDevice(
             ip_address=ip,
@@ -230,7 +281,7 @@ class RealNetworkDirectory:
         device.hostname = await self._get_hostname(ip)
         
         # Get MAC address (only works for local subnet)
-        device.mac_address = await self._get_mac_address(ip)
+        device.mac_address = await self._get_mac_address(ip, arp_table)
         
         # Determine vendor from MAC
         if device.mac_address:
@@ -250,101 +301,118 @@ class RealNetworkDirectory:
         device.os_guess = self._guess_os(device)
         
         # Calculate response time
-        device.response_time_ms = (time.time() - start_time) * 1000
+        device.response_time_ms = (time.monotonic_ns() - start_ns) / 1_000_000
         
         return device
     
     async def _get_hostname(self, ip: str) -> Optional[str]:
         """Get hostname for IP address"""
+        cached = self._ptr_cache.get(ip)
+        if cached is not None:
+            return cached[0]
+        
+        # gethostbyaddr blocks, so keep it off the event loop
         try:
-            hostname, _, _ = socket.gethostbyaddr(ip)
+            hostname, _, _ = await asyncio.wait_for(
+                asyncio.to_thread(socket.gethostbyaddr, ip), self.hostname_timeout
+            )
+            self._ptr_cache.set(ip, (hostname,))
             return hostname
-        except (socket.herror, socket.gaierror):
+        except (socket.herror, socket.gaierror, asyncio.TimeoutError):
+            self._ptr_cache.set(ip, (None,), ttl=self.negative_ptr_ttl)
             return None
     
-    async def _get_mac_address(self, ip: str) -> Optional[str]:
+    async def _get_mac_address(self, ip: str, arp_table: Optional[Dict[str, str]] = None) -> Optional[str]:
         """Get MAC address for IP (works only for local subnet)"""
+        if arp_table is None:
+            arp_table = await self._load_arp_table()
+        return arp_table.get(ip)
+    
+    async def _load_arp_table(self) -> Dict[str, str]:
+        """Read the whole ARP table once as an IP -> MAC mapping"""
+        arp_table = {}
         try:
-            if self.system == "windows":
-                result = subprocess.run(
-                    ["arp", "-a", ip],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                if result.returncode == 0:
-                    # Parse ARP output for MAC address
-                    for line in result.stdout.split('\n'):
-                        if ip in line:
-                            mac_match = re.search(r'([0-9a-fA-F]{2}[:-]){5}[0-9a-fA-F]{2}', line)
-                            if mac_match:
-                                return mac_match.group(0).upper().replace('-', ':')
+            if _SYSTEM == "linux":
+                # IP address, HW type, Flags, HW address, Mask, Device
+                with open("/proc/net/arp") as f:
+                    next(f, None)  # Header
+                    for line in f:
+                        parts = line.split()
+                        # Incomplete entries have no hardware address yet
+                        if len(parts) >= 4 and parts[3] != "00:00:00:00:00:00":
+                            arp_table[parts[0]] = parts[3].upper()
             else:
-                # Linux/Unix
-                result = subprocess.run(
-                    ["arp", "-n", ip],
-                    capture_output=True,
-                    text=True,
-                    timeout=5
-                )
-                if result.returncode == 0:
-                    lines = result.stdout.strip().split('\n')
-                    for line in lines:
-                        if ip in line:
-                            parts = line.split()
-                            if len(parts) >= 3:
-                                return parts[2].upper()
-            
-        except (subprocess.TimeoutExpired, subprocess.CalledProcessError, Exception):
+                cmd = ["arp", "-a"] if _IS_WINDOWS else ["arp", "-an"]
+                output = await _run_command(cmd, timeout=5)
+                if output is not None:
+                    for line in output.decode(errors="replace").split('\n'):
+                        ip_match = re.search(r'\d{1,3}(?:\.\d{1,3}){3}', line)
+                        mac_match = re.search(r'[0-9a-fA-F]{1,2}(?:[:-][0-9a-fA-F]{1,2}){5}', line)
+                        if ip_match and mac_match:
+                            # macOS drops leading zeros ("0:1a:2b:..."), so pad every octet
+                            octets = re.split(r'[:-]', mac_match.group(0))
+                            arp_table[ip_match.group(0)] = ':'.join(octet.zfill(2) for octet in octets).upper()
+        
+        except OSError:
             pass
         
-        return None
+        return arp_table
     
     def _get_vendor_from_mac(self, mac: str) -> str:
         """Get vendor from MAC address OUI"""
-        if not mac or len(mac) < 8:
+        if not mac:
             return "Unknown"
         
-        oui = mac[:8]  # First 3 octets
-        return self.known_vendors.get(oui, "Unknown")
+        # Accept colon, dash and Cisco dotted notation alike
+        digits = mac.replace(':', '').replace('-', '').replace('.', '')
+        try:
+            oui = bytes.fromhex(digits[:6])  # First 3 octets
+        except ValueError:
+            return "Unknown"
+        if len(oui) < 3:
+            return "Unknown"
+        return self._oui_map.get(oui, "Unknown")
     
     async def _scan_common_ports(self, ip: str) -> List[int]:
         """Scan common ports on a host"""
+        return await asyncio.to_thread(self._scan_ports_selector, ip, self.common_ports)
+    
+    def _scan_ports_selector(self, ip: str, ports: List[int], timeout: float = 2.0) -> List[int]:
+        """Connect-scan ports with non-blocking sockets multiplexed on one selector"""
+        family = socket.AF_INET6 if ':' in ip else socket.AF_INET
         open_ports = []
-        tasks = []
-        
-        semaphore = asyncio.Semaphore(10)  # Limit concurrent connections
-        
-        async def scan_port(port):
-            async with semaphore:
-                if await self._scan_single_port(ip, port):
-                    return port
-                return None
-        
-        for port in self.common_ports:
-            tasks.append(scan_port(port))
+        selector = selectors.DefaultSelector()
         
-        results = await asyncio.gather(*tasks, return_exceptions=True)
-        
-        for result in results:
-            if isinstance(result, int):
-                open_ports.append(result)
+        try:
+            # Start every connect at once; each one completes when it turns writable
+            for port in ports:
+                sock = socket.socket(family, socket.SOCK_STREAM)
+                sock.setblocking(False)
+                if sock.connect_ex((ip, port)) in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+                    selector.register(sock, selectors.EVENT_WRITE, port)
+                else:
+                    sock.close()
+            
+            deadline = time.monotonic() + timeout
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                for key, _ in selector.select(remaining):
+                    sock = key.fileobj
+                    # SO_ERROR is 0 once the handshake succeeded
+                    if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                        open_ports.append(key.data)
+                    selector.unregister(sock)
+                    sock.close()
+        finally:
+            # Ports still pending at the deadline are treated as filtered
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+            selector.close()
         
         return sorted(open_ports)
     
-    async def _scan_single_port(self, ip: str, port: int, timeout: float = 2.0) -> bool:
-        """Scan a single port"""
-        try:
-            _, writer = await asyncio.wait_for(
-                asyncio.open_connection(ip, port),
-                timeout=timeout
-            )
-            writer.close()
-            await writer.wait_closed()
-            return True
-        except (asyncio.TimeoutError, ConnectionRefusedError, OSError):
-            return False
-    
     def _guess_device_type(self, device: NetworkDevice) -> str:
         """Guess device type based on available information"""
         if device.is_gateway:
@@ -405,65 +473,146 @@ class RealNetworkDirectory:
     
     async def _get_gateway_ip(self) -> Optional[str]:
         """Get default gateway IP address"""
-        try:
-            if self.system == "windows":
-                result = subprocess.run(
-                    ["route", "print", "0.0.0.0"],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                if result.returncode == 0:
-                    # Parse route output for default gateway
-                    for line in result.stdout.split('\n'):
-                        if "0.0.0.0" in line and "0.0.0.0" in line:
-                            parts = line.split()
-                            if len(parts) >= 3:
-                                return parts[2]
-            else:
-                result = subprocess.run(
-                    ["ip", "route", "show", "default"],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                if result.returncode == 0:
-                    for line in result.stdout.split('\n'):
-                        if "default via" in line:
-                            parts = line.split()
-                            if "via" in parts:
-                                via_index = parts.index("via")
-                                if via_index + 1 < len(parts):
-                                    return parts[via_index + 1]
-        
-        except (subprocess.TimeoutExpired, subprocess.CalledProcessError):
-            pass
+        cached = self._route_cache.get("gateway")
+        if cached is not None:
+            return cached[0]
+        
+        gateway_ip = await self._read_gateway_ip()
+        self._route_cache.set("gateway", (gateway_ip,))
+        return gateway_ip
+    
+    async def _read_gateway_ip(self) -> Optional[str]:
+        """Query the routing table for the default gateway"""
+        if _IS_WINDOWS:
+            output = await _run_command(["route", "print", "0.0.0.0"], timeout=10)
+            if output is not None:
+                # Parse route output for default gateway
+                for line in output.decode(errors="replace").split('\n'):
+                    if "0.0.0.0" in line and "0.0.0.0" in line:
+                        parts = line.split()
+                        if len(parts) >= 3:
+                            return parts[2]
+        else:
+            output = await _run_command(["ip", "route", "show", "default"], timeout=10)
+            if output is not None:
+                for line in output.decode(errors="replace").split('\n'):
+                    if "default via" in line:
+                        parts = line.split()
+                        if "via" in parts:
+                            via_index = parts.index("via")
+                            if via_index + 1 < len(parts):
+                                return parts[via_index + 1]
         
         return None
     
     async def _get_dns_servers(self) -> List[str]:
         """Get DNS server addresses"""
-        dns_servers = []
+        if _IS_WINDOWS:
+            dns_servers = _windows_dns_servers()
+            return dns_servers if dns_servers is not None else await self._nslookup_dns_servers()
         
+        # The resolver configuration already lists them; no need to fork a lookup
+        dns_servers = []
         try:
-            if self.system == "windows":
-                result = subprocess.run(
-                    ["nslookup", "google.com"],
-                    capture_output=True,
-                    text=True,
-                    timeout=10
-                )
-                if result.returncode == 0:
-                    for line in result.stdout.split('\n'):
-                        if "Server:" in line:
-                            server = line.split("Server:")[-1].strip()
-                            if server and server != "localhost":
-                                dns_servers.append(server)
-            
-        except (subprocess.TimeoutExpired, subprocess.CalledProcessError):
+            with open("/etc/resolv.conf") as resolv_conf:
+                for line in resolv_conf:
+                    parts = line.split()
+                    if len(parts) >= 2 and parts[0] == "nameserver":
+                        dns_servers.append(parts[1])
+        except OSError:
             pass
         
         return dns_servers
+    
+    async def _nslookup_dns_servers(self) -> List[str]:
+        """Fallback: read the server nslookup reports"""
+        dns_servers = []
+        
+        output = await _run_command(["nslookup", "google.com"], timeout=10)
+        if output is not None:
+            for line in output.decode(errors="replace").split('\n'):
+                if "Server:" in line:
+                    server = line.split("Server:")[-1].strip()
+                    if server and server != "localhost":
+                        dns_servers.append(server)
+        
+        return dns_servers
+
+class _IPAddrString(ctypes.Structure):
+    """IP_ADDR_STRING from iphlpapi.h"""
+    pass
+
+_IPAddrString._fields_ = [
+    ("Next", ctypes.POINTER(_IPAddrString)),
+    ("IpAddress", ctypes.c_char * 16),
+    ("IpMask", ctypes.c_char * 16),
+    ("Context", ctypes.c_ulong),
+]
+
+class _FixedInfo(ctypes.Structure):
+    """FIXED_INFO from iphlpapi.h"""
+    _fields_ = [
+        ("HostName", ctypes.c_char * 132),
+        ("DomainName", ctypes.c_char * 132),
+        ("CurrentDnsServer", ctypes.POINTER(_IPAddrString)),
+        ("DnsServerList", _IPAddrString),
+        ("NodeType", ctypes.c_uint),
+        ("ScopeId", ctypes.c_char * 260),
+        ("EnableRouting", ctypes.c_uint),
+        ("EnableProxy", ctypes.c_uint),
+        ("EnableDns", ctypes.c_uint),
+    ]
+
+def _windows_dns_servers() -> Optional[List[str]]:
+    """DNS servers from GetNetworkParams, or None if the call is unavailable or fails"""
+    try:
+        get_network_params = ctypes.windll.iphlpapi.GetNetworkParams
+    except (AttributeError, OSError):
+        return None
+    
+    # First call reports the buffer size FIXED_INFO and its server list need
+    size = ctypes.c_ulong(0)
+    get_network_params(None, ctypes.byref(size))
+    buffer = ctypes.create_string_buffer(size.value)
+    if get_network_params(buffer, ctypes.byref(size)) != 0:
+        return None
+    
+    dns_servers = []
+    entry = ctypes.pointer(_FixedInfo.from_buffer(buffer).DnsServerList)
+    while entry:
+        address = entry.contents.IpAddress.decode("ascii", "ignore")
+        if address:
+            dns_servers.append(address)
+        entry = entry.contents.Next
+    return dns_servers
+
+async def _run_command(cmd: List[str], timeout: float) -> Optional[bytes]:
+    """Run cmd without blocking the event loop; stdout on success, None on failure or timeout"""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL
+        )
+    except OSError:
+        return None
+    
+    try:
+        stdout, _ = await asyncio.wait_for(process.communicate(), timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return None
+    
+    return stdout if process.returncode == 0 else None
+
+def _count_hosts(network) -> int:
+    """Number of addresses network.hosts() yields, without generating them"""
+    # Point-to-point and single-address networks use every address
+    if network.num_addresses <= 2:
+        return network.num_addresses
+    # IPv4 drops network and broadcast; IPv6 only the subnet-router anycast
+    return network.num_addresses - (2 if network.version == 4 else 1)
 
 # Global network directory instance
 network_directory = RealNetworkDirectory()
@@ -510,15 +659,16 @@ async def quick_network_scan(network_range: str = "auto") -> Dict:
         active_ips = await network_directory._ping_sweep(network)
         
         # Basic device info for active IPs
-        devices = []
-        for ip in active_ips[:20]:  # Limit to first 20 for quick scan
-            hostname = await network_directory._get_hostname(ip)
-            devices.append({
+        quick_ips = active_ips[:20]  # Limit to first 20 for quick scan
+        hostnames = await asyncio.gather(*(network_directory._get_hostname(ip) for ip in quick_ips))
+        devices = [
+            {
                 "ip_address": ip,
                 "hostname": hostname,
                 "device_type": "unknown",
                 "status": "active"
-            })
+            } for ip, hostname in zip(quick_ips, hostnames)
+        ]
         
         return {
             "network_range": network_range,
@@ -3,17 +3,109 @@ Ping Test Module for Network Troubleshooting Bot
 Performs ping tests to check connectivity and measure latency
 """
 import asyncio
+import ipaddress
 import platform
+import re
 import subprocess
 import socket
+import struct
 import time
-from typing import Dict, List, Optional
+import weakref
+from typing import AsyncIterator, Dict, List, Optional
 from dataclasses import dataclass
 import logging
 
+from .ttl_cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Resolved once at import; the platform cannot change under a running process
+_IS_WINDOWS = platform.system() == "Windows"
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+ICMP_PAYLOAD = bytes(range(48, 104))  # 56 bytes, like ping's default
+
+# Per-reply latency in ping output: "time=0.045 ms" (Unix), "time=12ms" / "time<1ms" (Windows)
+_TIME_RE = re.compile(rb"time[=<](\d+(?:\.\d+)?)\s*ms")
+# Summary reply count: "3 received" / "3 packets received" (Unix), "Received = 3" (Windows)
+_RECEIVED_RE = re.compile(rb"(\d+)\s+(?:packets\s+)?received|Received\s*=\s*(\d+)")
+
+# One unprivileged ICMP socket per event loop, shared by every ping on it
+_echo_sockets: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _EchoSocket]" = weakref.WeakKeyDictionary()
+
+def _icmp_checksum(data: bytes) -> int:
+    """Internet checksum: ones' complement of the ones' complement 16-bit sum"""
+    if len(data) % 2:
+        data += b'\0'
+    total = sum(struct.unpack(f'!{len(data) // 2}H', data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+def _build_echo_request(sequence: int) -> bytes:
+    """ICMP echo request; the kernel fills in the identifier for datagram sockets"""
+    header = struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, 0, 0, sequence)
+    checksum = _icmp_checksum(header + ICMP_PAYLOAD)
+    return struct.pack('!BBHHH', ICMP_ECHO_REQUEST, 0, checksum, 0, sequence) + ICMP_PAYLOAD
+
+class _EchoSocket:
+    """Non-blocking SOCK_DGRAM ICMP socket that matches replies to waiting pings"""
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        self.sock.setblocking(False)
+        self._next_sequence = 0
+        # sequence -> (address, future resolved with the reply's arrival time)
+        self._pending: Dict[int, tuple] = {}
+        loop.add_reader(self.sock.fileno(), self._on_readable)
+    
+    async def echo(self, address: str, timeout: float) -> Optional[float]:
+        """Send one echo request; return the round trip in ms, or None on timeout"""
+        sequence = self._allocate_sequence()
+        future = asyncio.get_running_loop().create_future()
+        self._pending[sequence] = (address, future)
+        try:
+            sent_at = time.monotonic_ns()
+            self.sock.sendto(_build_echo_request(sequence), (address, 0))
+            received_at = await asyncio.wait_for(future, timeout)
+            return (received_at - sent_at) / 1_000_000
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._pending.pop(sequence, None)
+    
+    def _allocate_sequence(self) -> int:
+        for _ in range(0x10000):
+            sequence = self._next_sequence
+            self._next_sequence = (sequence + 1) & 0xFFFF
+            if sequence not in self._pending:
+                return sequence
+        raise OSError("Too many ICMP echo requests in flight")
+    
+    def _on_readable(self):
+        """Drain every queued reply and wake the ping waiting on it"""
+        while True:
+            try:
+                data, (address, _) = self.sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                continue
+            
+            received_at = time.monotonic_ns()
+            # macOS includes the IPv4 header on datagram ICMP sockets; Linux does not
+            if data and data[0] >> 4 == 4:
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < 8 or data[0] != ICMP_ECHO_REPLY:
+                continue
+            
+            sequence = struct.unpack_from('!H', data, 6)[0]
+            pending = self._pending.get(sequence)
+            if pending and pending[0] == address and not pending[1].done():
+                pending[1].set_result(received_at)
+
+@dataclass(slots=True)
 class PingResult:
     target: str
     success: bool
@@ -26,19 +118,94 @@ class PingResult:
     error_message: Optional[str]
     timestamp: float
 
+def icmp_socket_available() -> bool:
+    """Check whether unprivileged ICMP sockets are allowed (Linux ping_group_range, macOS)"""
+    try:
+        socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP).close()
+        return True
+    except OSError:
+        return False
+
+async def icmp_echo(address: str, timeout: float) -> Optional[float]:
+    """Send one echo request over the running loop's shared ICMP socket; RTT in ms or None"""
+    loop = asyncio.get_running_loop()
+    echo_socket = _echo_sockets.get(loop)
+    if echo_socket is None:
+        echo_socket = _echo_sockets[loop] = _EchoSocket(loop)
+    return await echo_socket.echo(address, timeout)
+
 class PingTester:
-    def __init__(self, timeout: int = 5, count: int = 4):
+    def __init__(self, timeout: int = 5, count: int = 4, max_concurrency: int = 256):
         self.timeout = timeout
         self.count = count
-        self.system = platform.system().lower()
+        self.max_concurrency = max_concurrency  # Pings in flight in ping_multiple_hosts
+        self.interval = 1.0  # Seconds between echo requests, as ping sends them
+        self.icmp_socket_available = icmp_socket_available()
+        self._resolve_cache = TTLCache(maxsize=1024, ttl=60.0)
+    
+    async def _resolve_target(self, target: str) -> Optional[str]:
+        """Resolve target to an IPv4 address, or None if it does not resolve"""
+        # Sweeps pass IP literals, which need no lookup at all
+        try:
+            if ipaddress.ip_address(target).version == 4:
+                return target
+        except ValueError:
+            pass
+        
+        cached = self._resolve_cache.get(target)
+        if cached is not None:
+            return cached
+        
+        try:
+            address_info = await asyncio.get_running_loop().getaddrinfo(
+                target, None, family=socket.AF_INET, type=socket.SOCK_DGRAM
+            )
+        except socket.gaierror:
+            return None
+        if not address_info:
+            return None
+        
+        address = address_info[0][4][0]
+        self._resolve_cache.set(target, address)
+        return address
+    
+    async def _ping_with_socket(self, target: str) -> PingResult:
+        """Ping through the shared ICMP socket instead of running the ping command"""
+        address = await self._resolve_target(target)
+        if address is None:
+            return PingResult(
+                target=target,
+                success=False,
+                packets_sent=0,
+                packets_received=0,
+                packet_loss_percent=100.0,
+                min_latency_ms=None,
+                max_latency_ms=None,
+                avg_latency_ms=None,
+                error_message="Invalid target format",
+                timestamp=time.time()
+            )
+        
+        # Requests go out every interval and each waits up to the timeout,
+        # so a slow reply does not delay the next request
+        async def send_echo(index: int) -> Optional[float]:
+            await asyncio.sleep(index * self.interval)
+            return await icmp_echo(address, self.timeout)
+        
+        replies = await asyncio.gather(*(send_echo(i) for i in range(self.count)))
+        latencies = [latency for latency in replies if latency is not None]
+        return self._build_ping_result(target, latencies, time.time())
         
     async def ping_host(self, target: str) -> PingResult:
         """
         Perform ping test to target host
         """
         try:
+            if self.icmp_socket_available:
+                return await self._ping_with_socket(target)
+            
             # Validate target
-            if not self._is_valid_target(target):
+            if not await self._is_valid_target(target):
                 return PingResult(
                     target=target,
                     success=False,
@@ -83,7 +250,7 @@ class PingTester:
                 )
             
             # Parse results
-            return self._parse_ping_output(target, stdout.decode(), stderr.decode())
+            return self._parse_ping_output(target, stdout, stderr.decode(errors="replace"))
             
         except Exception as e:
             logger.error(f"Error pinging {target}: {str(e)}")
@@ -102,21 +269,16 @@ class PingTester:
     
     def _build_ping_command(self, target: str) -> List[str]:
         """Build ping command based on operating system"""
-        if self.system == "windows":
+        if _IS_WINDOWS:
             return ["ping", "-n", str(self.count), "-w", str(self.timeout * 1000), target]
         else:  # Linux/Mac
             return ["ping", "-c", str(self.count), "-W", str(self.timeout), target]
     
-    def _is_valid_target(self, target: str) -> bool:
+    async def _is_valid_target(self, target: str) -> bool:
         """Validate if target is a valid IP address or hostname"""
-        try:
-            # Try to resolve hostname to IP
-            socket.gethostbyname(target)
-            return True
-        except socket.gaierror:
-            return False
+        return await self._resolve_target(target) is not None
     
-    def _parse_ping_output(self, target: str, stdout: str, stderr: str) -> PingResult:
+    def _parse_ping_output(self, target: str, stdout: bytes, stderr: str) -> PingResult:
         """Parse ping command output"""
         timestamp = time.time()
         
@@ -135,10 +297,15 @@ class PingTester:
             )
         
         try:
-            if self.system == "windows":
-                return self._parse_windows_ping(target, stdout, timestamp)
-            else:
-                return self._parse_unix_ping(target, stdout, timestamp)
+            # Unix and Windows replies share the time=/time< field, so one scan covers both
+            latencies = list(map(float, _TIME_RE.findall(stdout)))
+            # Duplicate replies inflate the time= count, and Windows counts "Destination host
+            # unreachable" answers as received, so take the lower of the two counts
+            packets_received = len(latencies)
+            received_match = _RECEIVED_RE.search(stdout)
+            if received_match:
+                packets_received = min(packets_received, int(received_match.group(1) or received_match.group(2)))
+            return self._build_ping_result(target, latencies, timestamp, packets_received=packets_received)
         except Exception as e:
             logger.error(f"Error parsing ping output: {str(e)}")
             return PingResult(
@@ -154,75 +321,15 @@ class PingTester:
                 timestamp=timestamp
             )
     
-    def _parse_windows_ping(self, target: str, output: str, timestamp: float) -> PingResult:
-        """Parse Windows ping output"""
-        lines = output.split('\n')
-        packets_sent = self.count
-        packets_received = 0
-        latencies = []
-        
-        for line in lines:
-            if "Reply from" in line and "time=" in line:
-                packets_received += 1
-                # Extract latency
-                try:
-                    time_part = line.split("time=")[1].split("ms")[0]
-                    if time_part.strip() == "<1":
-                        latency = 1.0
-                    else:
-                        latency = float(time_part)
-                    latencies.append(latency)
-                except (IndexError, ValueError):
-                    pass
-            elif "Request timed out" in line or "Destination host unreachable" in line:
-                # Count as sent but not received
-                pass
-        
-        packet_loss = ((packets_sent - packets_received) / packets_sent) * 100
-        success = packets_received > 0
-        
-        min_lat = min(latencies) if latencies else None
-        max_lat = max(latencies) if latencies else None
-        avg_lat = sum(latencies) / len(latencies) if latencies else None
-        
-        return PingResult(
-            target=target,
-            success=success,
-            packets_sent=packets_sent,
-            packets_received=packets_received,
-            packet_loss_percent=packet_loss,
-            min_latency_ms=min_lat,
-            max_latency_ms=max_lat,
-            avg_latency_ms=avg_lat,
-            error_message=None if success else "No replies received",
-            timestamp=timestamp
-        )
-    
-    def _parse_unix_ping(self, target: str, output: str, timestamp: float) -> PingResult:
-        """Parse Unix/Linux ping output"""
-        lines = output.split('\n')
-        packets_sent = self.count
-        packets_received = 0
-        latencies = []
-        
-        for line in lines:
-            if " bytes from " in line and "time=" in line:
-                packets_received += 1
-                # Extract latency
-                try:
-                    time_part = line.split("time=")[1].split(" ")[0]
-                    latency = float(time_part)
-                    latencies.append(latency)
-                except (IndexError, ValueError):
-                    pass
-            elif "packet loss" in line:
-                # Extract packet loss percentage
-                try:
-                    loss_part = line.split("packet loss")[0].split()[-1].replace('%', '')
-                    packet_loss_from_output = float(loss_part)
-                except (IndexError, ValueError):
-                    packet_loss_from_output = ((packets_sent - packets_received) / packets_sent) * 100
+    def _build_ping_result(self, target: str, latencies: List[float], timestamp: float,
+                           packets_sent: Optional[int] = None,
+                           packets_received: Optional[int] = None) -> PingResult:
+        """Summarize one latency per reply into a PingResult"""
+        packets_sent = packets_sent or self.count
+        if packets_received is None:
+            packets_received = len(latencies)
         
+        # Loss always follows the reported reply count, so no replies means 100% loss
         packet_loss = ((packets_sent - packets_received) / packets_sent) * 100
         success = packets_received > 0
         
@@ -247,14 +354,22 @@ class PingTester:
         """
         Ping multiple hosts concurrently
         """
-        tasks = [self.ping_host(target) for target in targets]
-        results = await asyncio.gather(*tasks, return_exceptions=True)
+        # Bound the fan-out so a large range does not spawn a ping per host at once
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def ping_one(target: str):
+            async with semaphore:
+                try:
+                    return target, await self.ping_host(target)
+                except Exception as e:
+                    return target, e
         
         output = {}
-        for i, result in enumerate(results):
+        for future in asyncio.as_completed([ping_one(target) for target in targets]):
+            target, result = await future
             if isinstance(result, Exception):
-                output[targets[i]] = PingResult(
-                    target=targets[i],
+                output[target] = PingResult(
+                    target=target,
                     success=False,
                     packets_sent=0,
                     packets_received=0,
@@ -266,25 +381,73 @@ class PingTester:
                     timestamp=time.time()
                 )
             else:
-                output[targets[i]] = result
+                output[target] = result
         
         return output
     
-    async def continuous_ping(self, target: str, duration_seconds: int = 60, interval: int = 1):
+    async def continuous_ping(self, target: str, duration_seconds: int = 60,
+                              interval: int = 1) -> AsyncIterator[PingResult]:
         """
-        Perform continuous ping for monitoring
+        Perform continuous ping for monitoring, yielding a result per sample
         """
-        results = []
-        start_time = time.time()
+        if not self.icmp_socket_available:
+            # Elapsed time from the monotonic clock so a wall-clock step cannot stretch or cut the run
+            deadline = time.monotonic_ns() + int(duration_seconds * 1_000_000_000)
+            while time.monotonic_ns() < deadline:
+                yield await self.ping_host(target)
+                
+                if time.monotonic_ns() < deadline:
+                    await asyncio.sleep(interval)
+            return
         
-        while time.time() - start_time < duration_seconds:
-            result = await self.ping_host(target)
-            results.append(result)
-            
-            if time.time() - start_time < duration_seconds:
-                await asyncio.sleep(interval)
+        address = await self._resolve_target(target)
+        if address is None:
+            yield PingResult(
+                target=target,
+                success=False,
+                packets_sent=0,
+                packets_received=0,
+                packet_loss_percent=100.0,
+                min_latency_ms=None,
+                max_latency_ms=None,
+                avg_latency_ms=None,
+                error_message="Invalid target format",
+                timestamp=time.time()
+            )
+            return
         
-        return results
+        # One echo per interval on the shared socket, each sent on schedule even
+        # while earlier ones still wait; replies are yielded as they complete
+        loop = asyncio.get_running_loop()
+        completed: "asyncio.Queue[PingResult]" = asyncio.Queue()
+        samples = max(1, -(-duration_seconds // interval))
+        probes = set()
+        
+        async def probe():
+            # Every probe must enqueue a result, or the loop below waits forever
+            try:
+                latency = await icmp_echo(address, self.timeout)
+            except OSError as e:
+                logger.debug(f"Echo to {address} failed: {e}")
+                latency = None
+            latencies = [latency] if latency is not None else []
+            completed.put_nowait(self._build_ping_result(target, latencies, time.time(), packets_sent=1))
+        
+        def send_probe():
+            task = loop.create_task(probe())
+            probes.add(task)
+            task.add_done_callback(probes.discard)
+        
+        start = loop.time()
+        handles = [loop.call_at(start + i * interval, send_probe) for i in range(samples)]
+        try:
+            for _ in range(samples):
+                yield await completed.get()
+        finally:
+            for handle in handles:
+                handle.cancel()
+            for task in list(probes):
+                task.cancel()
 
 # Convenience functions
 async def ping_host(target: str, timeout: int = 5, count: int = 4) -> PingResult:
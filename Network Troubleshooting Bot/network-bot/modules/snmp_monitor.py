@@ -3,21 +3,29 @@ SNMP Monitor Module for Network Troubleshooting Bot
 Fetches interface statistics and device information via SNMP
 """
 import asyncio
+import socket
 import time
+import weakref
 from typing import Dict, List, Optional, Any
-from dataclasses import dataclass
+from dataclasses import dataclass, fields
 import logging
 
+import numpy as np
+
 try:
-    from pysnmp.hlapi import *
+    from pysnmp.hlapi.asyncio import *
     from pysnmp.error import PySnmpError
+    from pyasn1.type.univ import Null
 except ImportError:
     logging.warning("pysnmp not installed. SNMP functionality will be limited.")
     PySnmpError = Exception
 
+from .ping_test import icmp_echo, icmp_socket_available
+from .ttl_cache import TTLCache
+
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(slots=True)
 class InterfaceStats:
     interface_name: str
     interface_index: int
@@ -38,6 +46,38 @@ class InterfaceStats:
     utilization_out_percent: float
 
 @dataclass
+class InterfaceStatsBatch:
+    """One poll of every interface, column-wise: one array per counter, rows in interface_index order"""
+    interface_name: List[str]
+    interface_index: np.ndarray
+    admin_status: List[str]
+    oper_status: List[str]
+    bytes_in: np.ndarray
+    bytes_out: np.ndarray
+    packets_in: np.ndarray
+    packets_out: np.ndarray
+    errors_in: np.ndarray
+    errors_out: np.ndarray
+    discards_in: np.ndarray
+    discards_out: np.ndarray
+    speed_bps: np.ndarray
+    mtu: np.ndarray
+    last_change: np.ndarray
+    utilization_in_percent: np.ndarray
+    utilization_out_percent: np.ndarray
+    
+    def __len__(self) -> int:
+        return len(self.interface_index)
+    
+    def to_interface_stats(self) -> List[InterfaceStats]:
+        """Row view: one InterfaceStats per interface"""
+        columns = []
+        for field in fields(InterfaceStats):
+            column = getattr(self, field.name)
+            columns.append(column.tolist() if isinstance(column, np.ndarray) else column)
+        return [InterfaceStats(*row) for row in zip(*columns)]
+
+@dataclass(slots=True)
 class DeviceInfo:
     system_description: str
     system_uptime: int
@@ -49,7 +89,7 @@ class DeviceInfo:
     memory_usage_percent: Optional[float]
     temperature_celsius: Optional[float]
 
-@dataclass
+@dataclass(slots=True)
 class SNMPResult:
     target: str
     success: bool
@@ -58,12 +98,33 @@ class SNMPResult:
     error_message: Optional[str]
     timestamp: float
     response_time_ms: float
+    interface_batch: Optional[InterfaceStatsBatch] = None
 
 class SNMPMonitor:
-    def __init__(self, community: str = "public", timeout: int = 5, retries: int = 3):
+    def __init__(self, community: str = "public", timeout: int = 5, retries: int = 3,
+                 max_repetitions: int = 25, mp_model: int = 1, port: int = 161,
+                 max_concurrency: int = 32):
         self.community = community
+        self.port = port
+        self.max_concurrency = max_concurrency  # Devices queried at once by monitor_multiple_devices
         self.timeout = timeout
         self.retries = retries
+        self.max_repetitions = max_repetitions  # Rows per GETBULK response
+        self.mp_model = mp_model  # 0 = SNMPv1 (no GETBULK, walks fall back to GETNEXT), 1 = SNMPv2c
+        
+        # One SNMP engine per event loop (its dispatcher binds to the loop), one
+        # transport per target and one auth object per community, shared by
+        # every request instead of built per call
+        self._engines: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        self._transports: Dict[tuple, Any] = {}
+        self._communities: Dict[str, Any] = {}
+        self._context_data = None
+        
+        # Dead targets would otherwise cost timeout * retries; one cached ICMP probe
+        # over the shared ping socket rules them out first
+        self.icmp_socket_available = icmp_socket_available()
+        self.reachability_timeout = 0.2
+        self._reach_cache = TTLCache(maxsize=4096, ttl=60.0)
         
         # Standard SNMP OIDs
         self.oids = {
@@ -106,6 +167,33 @@ class SNMPMonitor:
             'ciscoMemoryPoolFree': '1.3.6.1.4.1.9.9.48.1.1.1.6',
         }
         
+        # Scalar instances for the Cisco CPU and memory pool readings
+        self.cpu_oid = f"{self.oids['cpmCPUTotal5minRev']}.1"
+        self.memory_used_oid = f"{self.oids['ciscoMemoryPoolUsed']}.1"
+        self.memory_free_oid = f"{self.oids['ciscoMemoryPoolFree']}.1"
+        
+        # Columns fetched per interface by the GETBULK walk
+        self.interface_columns = [
+            'ifDescr', 'ifAdminStatus', 'ifOperStatus', 'ifSpeed', 'ifMtu',
+            'ifLastChange', 'ifInOctets', 'ifOutOctets', 'ifInUcastPkts',
+            'ifOutUcastPkts', 'ifInErrors', 'ifOutErrors', 'ifInDiscards',
+            'ifOutDiscards',
+        ]
+        # ifXTable columns, only walked on agents known (or not yet known) to serve them
+        self.high_capacity_columns = ['ifHCInOctets', 'ifHCOutOctets', 'ifHighSpeed']
+        # Per-target ifXTable support, re-probed hourly in case firmware changes
+        self._hc_cap = TTLCache(maxsize=4096, ttl=3600.0)
+        
+        # Values that only change on reconfiguration are served from cache for five
+        # minutes instead of travelling in every poll: system group scalars by
+        # (target, OID), static ifTable columns per target
+        self.slow_scalar_oids = {
+            self.oids[name] for name in ('sysDescr', 'sysContact', 'sysName', 'sysLocation', 'sysServices')
+        }
+        self.slow_interface_columns = ['ifDescr', 'ifSpeed', 'ifMtu']
+        self._scalar_cache = TTLCache(maxsize=16384, ttl=300.0)
+        self._column_cache = TTLCache(maxsize=4096, ttl=300.0)
+        
         # Status mappings
         self.admin_status_map = {1: 'up', 2: 'down', 3: 'testing'}
         self.oper_status_map = {
@@ -117,31 +205,44 @@ class SNMPMonitor:
         """
         Get comprehensive device information via SNMP
         """
-        start_time = time.time()
-        timestamp = start_time
+        # Wall-clock stamp for reporting; the monotonic clock times the request
+        timestamp = time.time()
+        start_ns = time.monotonic_ns()
         community = community or self.community
         
+        if not await self._is_reachable(target):
+            return SNMPResult(
+                target=target,
+                success=False,
+                device_info=None,
+                interfaces=[],
+                error_message="unreachable",
+                timestamp=timestamp,
+                response_time_ms=(time.monotonic_ns() - start_ns) / 1_000_000
+            )
+        
         try:
-            # Get basic system information
-            device_info = await self._get_system_info(target, community)
-            
-            # Get interface information
-            interfaces = await self._get_interface_stats(target, community)
+            # Get system and interface information concurrently
+            device_info, interface_batch = await asyncio.gather(
+                self._get_system_info(target, community),
+                self._get_interface_stats(target, community)
+            )
             
-            response_time = (time.time() - start_time) * 1000
+            response_time = (time.monotonic_ns() - start_ns) / 1_000_000
             
             return SNMPResult(
                 target=target,
                 success=True,
                 device_info=device_info,
-                interfaces=interfaces,
+                interfaces=interface_batch.to_interface_stats(),
                 error_message=None,
                 timestamp=timestamp,
-                response_time_ms=response_time
+                response_time_ms=response_time,
+                interface_batch=interface_batch
             )
             
         except Exception as e:
-            response_time = (time.time() - start_time) * 1000
+            response_time = (time.monotonic_ns() - start_ns) / 1_000_000
             logger.error(f"SNMP error for {target}: {str(e)}")
             return SNMPResult(
                 target=target,
@@ -153,6 +254,35 @@ class SNMPMonitor:
                 response_time_ms=response_time
             )
     
+    async def _is_reachable(self, target: str) -> bool:
+        """Probe target with one ICMP echo, caching the verdict; True when no probe is possible"""
+        if not self.icmp_socket_available:
+            return True
+        
+        cached = self._reach_cache.get(target)
+        if cached is not None:
+            return cached
+        
+        try:
+            address_info = await asyncio.get_running_loop().getaddrinfo(
+                target, None, family=socket.AF_INET, type=socket.SOCK_DGRAM
+            )
+            address = address_info[0][4][0]
+        except socket.gaierror:
+            return True  # Let the SNMP request report the resolution failure
+        
+        try:
+            reachable = await asyncio.wait_for(
+                icmp_echo(address, self.reachability_timeout), self.reachability_timeout
+            ) is not None
+        except asyncio.TimeoutError:
+            reachable = False
+        except OSError:
+            return True
+        
+        self._reach_cache.set(target, reachable)
+        return reachable
+    
     async def _get_system_info(self, target: str, community: str) -> DeviceInfo:
         """Get system information via SNMP"""
         system_oids = [
@@ -164,11 +294,21 @@ class SNMPMonitor:
             self.oids['sysServices']
         ]
         
-        results = await self._snmp_get(target, community, system_oids)
-        
-        # Try to get CPU and memory usage (Cisco-specific)
-        cpu_usage = await self._get_cpu_usage(target, community)
-        memory_usage = await self._get_memory_usage(target, community)
+        if self.mp_model == 0:
+            # SNMPv1 fails the whole PDU on an unknown OID, so the Cisco-specific
+            # CPU and memory OIDs go in their own requests alongside the system group
+            results, cpu_usage, memory_usage = await asyncio.gather(
+                self._snmp_get(target, community, system_oids),
+                self._get_cpu_usage(target, community),
+                self._get_memory_usage(target, community)
+            )
+        else:
+            # SNMPv2c marks unknown OIDs per binding, so everything fits in one GET
+            results = await self._snmp_get(target, community, system_oids + [
+                self.cpu_oid, self.memory_used_oid, self.memory_free_oid
+            ])
+            cpu_usage = self._cpu_usage_from(results)
+            memory_usage = self._memory_usage_from(results)
         
         return DeviceInfo(
             system_description=results.get(self.oids['sysDescr'], 'Unknown'),
@@ -182,133 +322,133 @@ class SNMPMonitor:
             temperature_celsius=None  # Could be added with vendor-specific OIDs
         )
     
-    async def _get_interface_stats(self, target: str, community: str) -> List[InterfaceStats]:
+    async def _get_interface_stats(self, target: str, community: str) -> InterfaceStatsBatch:
         """Get interface statistics via SNMP"""
-        interfaces = []
-        
         try:
-            # Get interface indices first
-            interface_indices = await self._snmp_walk(target, community, self.oids['ifIndex'])
+            # Walk every interface column at once and stitch rows by instance index;
+            # agents without ifXTable only answer the HC columns with out-of-table
+            # bindings, so stop asking once a walk has shown that
+            hc_capable = self._hc_cap.get(target, True)
+            columns = self.interface_columns + self.high_capacity_columns if hc_capable else self.interface_columns
+            static_columns = self._column_cache.get(target)
+            if static_columns is not None:
+                columns = [name for name in columns if name not in self.slow_interface_columns]
+            rows = await self._snmp_bulk_walk(target, community, columns)
+            if hc_capable and rows:
+                self._hc_cap.set(target, any(
+                    name in row for row in rows.values() for name in self.high_capacity_columns
+                ))
             
-            for index_oid, index_value in interface_indices.items():
-                interface_index = int(index_value)
-                
-                # Get interface data
-                interface_data = await self._get_single_interface_stats(
-                    target, community, interface_index
-                )
-                
-                if interface_data:
-                    interfaces.append(interface_data)
-                    
+            if static_columns is None:
+                self._column_cache.set(target, (set(rows), {
+                    name: {index: row[name] for index, row in rows.items() if name in row}
+                    for name in self.slow_interface_columns
+                }))
+            else:
+                await self._fill_static_columns(target, community, rows, *static_columns)
+            return self._build_interface_batch(rows)
         except Exception as e:
             logger.error(f"Error getting interface stats: {str(e)}")
+            return self._build_interface_batch({})
+    
+    async def _fill_static_columns(self, target: str, community: str, rows: Dict[int, Dict[str, str]],
+                                   known_indices: set, values: Dict[str, Dict[int, str]]):
+        """Copy cached static columns into walked rows, fetching them for interfaces new since caching"""
+        new_indices = [index for index in rows if index not in known_indices]
+        if new_indices:
+            try:
+                fetched = await self._snmp_get(target, community, [
+                    f"{self.oids[name]}.{index}" for index in new_indices for name in self.slow_interface_columns
+                ])
+            except Exception:
+                # e.g. SNMPv1 noSuchName for a column the agent lacks; walk them all next poll
+                self._column_cache.set(target, None, ttl=0)
+                fetched = {}
+            for index in new_indices:
+                for name in self.slow_interface_columns:
+                    value = fetched.get(f"{self.oids[name]}.{index}")
+                    if value is not None:
+                        values[name][index] = value
+            known_indices.update(new_indices)
         
-        return interfaces
+        for name, column in values.items():
+            for index, row in rows.items():
+                if index in column:
+                    row[name] = column[index]
     
-    async def _get_single_interface_stats(self, target: str, community: str, 
-                                        interface_index: int) -> Optional[InterfaceStats]:
-        """Get statistics for a single interface"""
-        try:
-            # Build OIDs for this specific interface
-            oids = [
-                f"{self.oids['ifDescr']}.{interface_index}",
-                f"{self.oids['ifAdminStatus']}.{interface_index}",
-                f"{self.oids['ifOperStatus']}.{interface_index}",
-                f"{self.oids['ifSpeed']}.{interface_index}",
-                f"{self.oids['ifMtu']}.{interface_index}",
-                f"{self.oids['ifLastChange']}.{interface_index}",
-                f"{self.oids['ifInOctets']}.{interface_index}",
-                f"{self.oids['ifOutOctets']}.{interface_index}",
-                f"{self.oids['ifInUcastPkts']}.{interface_index}",
-                f"{self.oids['ifOutUcastPkts']}.{interface_index}",
-                f"{self.oids['ifInErrors']}.{interface_index}",
-                f"{self.oids['ifOutErrors']}.{interface_index}",
-                f"{self.oids['ifInDiscards']}.{interface_index}",
-                f"{self.oids['ifOutDiscards']}.{interface_index}",
-            ]
-            
-            results = await self._snmp_get(target, community, oids)
-            
-            # Try to get high-speed counters if available
-            hc_in_oid = f"{self.oids['ifHCInOctets']}.{interface_index}"
-            hc_out_oid = f"{self.oids['ifHCOutOctets']}.{interface_index}"
-            hc_speed_oid = f"{self.oids['ifHighSpeed']}.{interface_index}"
-            
-            hc_results = await self._snmp_get(target, community, [hc_in_oid, hc_out_oid, hc_speed_oid])
-            
-            # Extract values
-            interface_name = results.get(f"{self.oids['ifDescr']}.{interface_index}", f"Interface{interface_index}")
-            admin_status = int(results.get(f"{self.oids['ifAdminStatus']}.{interface_index}", 2))
-            oper_status = int(results.get(f"{self.oids['ifOperStatus']}.{interface_index}", 2))
-            speed_bps = int(results.get(f"{self.oids['ifSpeed']}.{interface_index}", 0))
-            mtu = int(results.get(f"{self.oids['ifMtu']}.{interface_index}", 0))
-            last_change = int(results.get(f"{self.oids['ifLastChange']}.{interface_index}", 0))
-            
-            # Use high-speed counters if available, otherwise use regular counters
-            bytes_in = int(hc_results.get(hc_in_oid, results.get(f"{self.oids['ifInOctets']}.{interface_index}", 0)))
-            bytes_out = int(hc_results.get(hc_out_oid, results.get(f"{self.oids['ifOutOctets']}.{interface_index}", 0)))
-            
-            packets_in = int(results.get(f"{self.oids['ifInUcastPkts']}.{interface_index}", 0))
-            packets_out = int(results.get(f"{self.oids['ifOutUcastPkts']}.{interface_index}", 0))
-            errors_in = int(results.get(f"{self.oids['ifInErrors']}.{interface_index}", 0))
-            errors_out = int(results.get(f"{self.oids['ifOutErrors']}.{interface_index}", 0))
-            discards_in = int(results.get(f"{self.oids['ifInDiscards']}.{interface_index}", 0))
-            discards_out = int(results.get(f"{self.oids['ifOutDiscards']}.{interface_index}", 0))
-            
-            # Use high-speed value if available
-            high_speed = hc_results.get(hc_speed_oid)
-            if high_speed:
-                speed_bps = int(high_speed) * 1000000  # Convert from Mbps to bps
-            
-            # Calculate utilization (this would need to be calculated over time intervals)
-            utilization_in = 0.0
-            utilization_out = 0.0
-            
-            return InterfaceStats(
-                interface_name=interface_name,
-                interface_index=interface_index,
-                admin_status=self.admin_status_map.get(admin_status, 'unknown'),
-                oper_status=self.oper_status_map.get(oper_status, 'unknown'),
-                bytes_in=bytes_in,
-                bytes_out=bytes_out,
-                packets_in=packets_in,
-                packets_out=packets_out,
-                errors_in=errors_in,
-                errors_out=errors_out,
-                discards_in=discards_in,
-                discards_out=discards_out,
-                speed_bps=speed_bps,
-                mtu=mtu,
-                last_change=last_change,
-                utilization_in_percent=utilization_in,
-                utilization_out_percent=utilization_out
-            )
-            
-        except Exception as e:
-            logger.error(f"Error getting stats for interface {interface_index}: {str(e)}")
-            return None
+    def _build_interface_batch(self, rows: Dict[int, Dict[str, str]]) -> InterfaceStatsBatch:
+        """Turn stitched walk rows into per-counter columns"""
+        indices = sorted(rows)
+        ordered = [rows[index] for index in indices]
+        
+        def column(name: str, default: int = 0, dtype=np.uint64) -> np.ndarray:
+            return np.array([int(row.get(name, default)) for row in ordered], dtype=dtype)
+        
+        # Use high-speed counters if available, otherwise use regular counters
+        bytes_in = np.array([int(row.get('ifHCInOctets', row.get('ifInOctets', 0))) for row in ordered],
+                            dtype=np.uint64)
+        bytes_out = np.array([int(row.get('ifHCOutOctets', row.get('ifOutOctets', 0))) for row in ordered],
+                             dtype=np.uint64)
+        
+        # Use high-speed value if available, converting from Mbps to bps
+        high_speed = column('ifHighSpeed')
+        speed_bps = np.where(high_speed > 0, high_speed * np.uint64(1000000), column('ifSpeed'))
+        
+        admin_status = column('ifAdminStatus', 2, np.int64).tolist()
+        oper_status = column('ifOperStatus', 2, np.int64).tolist()
+        
+        # Calculate utilization (this would need to be calculated over time intervals)
+        return InterfaceStatsBatch(
+            interface_name=[str(row.get('ifDescr', f"Interface{index}")) for index, row in zip(indices, ordered)],
+            interface_index=np.array(indices, dtype=np.int64),
+            admin_status=[self.admin_status_map.get(status, 'unknown') for status in admin_status],
+            oper_status=[self.oper_status_map.get(status, 'unknown') for status in oper_status],
+            bytes_in=bytes_in,
+            bytes_out=bytes_out,
+            packets_in=column('ifInUcastPkts'),
+            packets_out=column('ifOutUcastPkts'),
+            errors_in=column('ifInErrors'),
+            errors_out=column('ifOutErrors'),
+            discards_in=column('ifInDiscards'),
+            discards_out=column('ifOutDiscards'),
+            speed_bps=speed_bps,
+            mtu=column('ifMtu', dtype=np.int64),
+            last_change=column('ifLastChange', dtype=np.int64),
+            utilization_in_percent=np.zeros(len(indices)),
+            utilization_out_percent=np.zeros(len(indices))
+        )
     
     async def _get_cpu_usage(self, target: str, community: str) -> Optional[float]:
         """Get CPU usage (Cisco-specific)"""
         try:
-            cpu_oid = f"{self.oids['cpmCPUTotal5minRev']}.1"
-            results = await self._snmp_get(target, community, [cpu_oid])
-            cpu_value = results.get(cpu_oid)
-            return float(cpu_value) if cpu_value else None
-        except:
+            results = await self._snmp_get(target, community, [self.cpu_oid])
+            return self._cpu_usage_from(results)
+        except Exception as e:
+            logger.debug(f"CPU usage unavailable for {target}: {e}")
             return None
     
     async def _get_memory_usage(self, target: str, community: str) -> Optional[float]:
         """Get memory usage (Cisco-specific)"""
         try:
-            used_oid = f"{self.oids['ciscoMemoryPoolUsed']}.1"
-            free_oid = f"{self.oids['ciscoMemoryPoolFree']}.1"
-            
-            results = await self._snmp_get(target, community, [used_oid, free_oid])
-            
-            used = results.get(used_oid)
-            free = results.get(free_oid)
+            results = await self._snmp_get(target, community, [self.memory_used_oid, self.memory_free_oid])
+            return self._memory_usage_from(results)
+        except Exception as e:
+            logger.debug(f"Memory usage unavailable for {target}: {e}")
+            return None
+    
+    def _cpu_usage_from(self, results: Dict[str, str]) -> Optional[float]:
+        """CPU usage percent from GET results, if the device reported it"""
+        try:
+            cpu_value = results.get(self.cpu_oid)
+            return float(cpu_value) if cpu_value else None
+        except ValueError:
+            return None
+    
+    def _memory_usage_from(self, results: Dict[str, str]) -> Optional[float]:
+        """Memory pool usage percent from GET results, if the device reported it"""
+        try:
+            used = results.get(self.memory_used_oid)
+            free = results.get(self.memory_free_oid)
             
             if used and free:
                 used = int(used)
@@ -316,31 +456,76 @@ class SNMPMonitor:
                 total = used + free
                 return (used / total) * 100 if total > 0 else None
                 
-        except:
+        except ValueError:
             return None
     
+    def _engine(self) -> "SnmpEngine":
+        """Return the SNMP engine for the running event loop"""
+        loop = asyncio.get_running_loop()
+        engine = self._engines.get(loop)
+        if engine is None:
+            engine = self._engines[loop] = SnmpEngine()
+        return engine
+    
+    def _session(self, target: str, community: str) -> tuple:
+        """Engine, auth, transport and context arguments shared by every request to target"""
+        auth = self._communities.get(community)
+        if auth is None:
+            auth = self._communities[community] = CommunityData(community, mpModel=self.mp_model)
+        if self._context_data is None:
+            self._context_data = ContextData()
+        return self._engine(), auth, self._transport(target), self._context_data
+    
+    def _transport(self, target: str) -> "UdpTransportTarget":
+        """Return the cached UDP transport for target"""
+        key = (target, self.port)
+        transport = self._transports.get(key)
+        if transport is None:
+            transport = self._transports[key] = UdpTransportTarget(
+                key, timeout=self.timeout, retries=self.retries
+            )
+        return transport
+    
     async def _snmp_get(self, target: str, community: str, oids: List[str]) -> Dict[str, str]:
         """Perform SNMP GET operation"""
         results = {}
         
+        # Slow-changing scalars still in cache leave the request
+        for oid in oids:
+            if oid in self.slow_scalar_oids:
+                cached = self._scalar_cache.get((target, oid))
+                if cached is not None:
+                    results[oid] = cached
+        if results:
+            oids = [oid for oid in oids if oid not in results]
+            if not oids:
+                return results
+        
         try:
-            for errorIndication, errorStatus, errorIndex, varBinds in getCmd(
-                SnmpEngine(),
-                CommunityData(community),
-                UdpTransportTarget((target, 161), timeout=self.timeout, retries=self.retries),
-                ContextData(),
+            errorIndication, errorStatus, errorIndex, varBinds = await getCmd(
+                *self._session(target, community),
                 *[ObjectType(ObjectIdentity(oid)) for oid in oids]
-            ):
-                if errorIndication:
-                    raise Exception(f"SNMP error: {errorIndication}")
-                
-                if errorStatus:
-                    raise Exception(f"SNMP error: {errorStatus.prettyPrint()} at {errorIndex and varBinds[int(errorIndex) - 1][0] or '?'}")
-                
-                for varBind in varBinds:
-                    oid_str = str(varBind[0])
-                    value_str = str(varBind[1])
-                    results[oid_str] = value_str
+            )
+            
+            if errorIndication:
+                raise Exception(f"SNMP error: {errorIndication}")
+            
+            if errorStatus:
+                raise Exception(f"SNMP error: {errorStatus.prettyPrint()} at {errorIndex and varBinds[int(errorIndex) - 1][0] or '?'}")
+            
+            # Every OID travels in the one request PDU, so expect one binding each
+            if len(varBinds) != len(oids):
+                raise Exception(f"SNMP error: expected {len(oids)} bindings, got {len(varBinds)}")
+            
+            for varBind in varBinds:
+                # noSuchObject / noSuchInstance leave the OID unset so callers fall back to defaults
+                if isinstance(varBind[1], Null):
+                    continue
+                oid_str = str(varBind[0])
+                value_str = str(varBind[1])
+                results[oid_str] = value_str
+                if oid_str in self.slow_scalar_oids:
+                    self._scalar_cache.set((target, oid_str), value_str)
                     
         except Exception as e:
             logger.error(f"SNMP GET error: {str(e)}")
@@ -350,37 +535,88 @@ class SNMPMonitor:
     
     async def _snmp_walk(self, target: str, community: str, base_oid: str) -> Dict[str, str]:
         """Perform SNMP WALK operation"""
-        results = {}
+        bindings = await self._walk_subtrees(target, community, [base_oid])
+        return {f"{base_oid}.{'.'.join(map(str, instance))}": str(value) for _, instance, value in bindings}
+    
+    async def _snmp_bulk_walk(self, target: str, community: str,
+                              columns: List[str]) -> Dict[int, Dict[str, Any]]:
+        """Walk table columns side by side, returning {instance index: {column: value}};
+        values stay pyasn1 objects, which int() and str() convert on use"""
+        rows: Dict[int, Dict[str, Any]] = {}
+        
+        bindings = await self._walk_subtrees(target, community, [self.oids[name] for name in columns])
+        for position, instance, value in bindings:
+            if len(instance) == 1:
+                rows.setdefault(instance[0], {})[columns[position]] = value
+        
+        return rows
+    
+    async def _walk_subtrees(self, target: str, community: str,
+                             base_oids: List[str]) -> List[tuple]:
+        """Walk subtrees side by side with GETBULK (GETNEXT on SNMPv1); (subtree position,
+        instance sub-identifiers below the subtree, raw value) for every binding inside it"""
+        bindings = []
+        # Compare OIDs as sub-identifier tuples rather than formatting each one as text
+        base_tuples = [tuple(int(subid) for subid in oid.split('.')) for oid in base_oids]
+        # (subtree position, OID to continue from) for every subtree not yet exhausted
+        active = list(enumerate(base_oids))
         
         try:
-            for errorIndication, errorStatus, errorIndex, varBinds in nextCmd(
-                SnmpEngine(),
-                CommunityData(community),
-                UdpTransportTarget((target, 161), timeout=self.timeout, retries=self.retries),
-                ContextData(),
-                ObjectType(ObjectIdentity(base_oid)),
-                lexicographicMode=False
-            ):
-                if errorIndication:
+            while active:
+                request = [ObjectType(ObjectIdentity(oid)) for _, oid in active]
+                if self.mp_model == 0:
+                    errorIndication, errorStatus, errorIndex, varBindTable = await nextCmd(
+                        *self._session(target, community), *request
+                    )
+                else:
+                    errorIndication, errorStatus, errorIndex, varBindTable = await bulkCmd(
+                        *self._session(target, community),
+                        0, self.max_repetitions, *request
+                    )
+                
+                if errorIndication or not varBindTable:
                     break
                 
                 if errorStatus:
+                    # SNMPv1 signals the end of the MIB view with noSuchName
+                    if self.mp_model == 0 and int(errorStatus) == 2:
+                        break
                     raise Exception(f"SNMP error: {errorStatus.prettyPrint()}")
                 
-                for varBind in varBinds:
-                    oid_str = str(varBind[0])
-                    value_str = str(varBind[1])
-                    results[oid_str] = value_str
+                # Retire subtrees the walk ran past (e.g. no ifXTable) or that hit endOfMibView
+                finished = set()
+                next_oids = {}
+                for varBinds in varBindTable:
+                    for (position, _), varBind in zip(active, varBinds):
+                        if position in finished:
+                            continue
+                        oid = varBind[0].asTuple()
+                        base = base_tuples[position]
+                        if len(oid) <= len(base) or oid[:len(base)] != base or isinstance(varBind[1], Null):
+                            finished.add(position)
+                            continue
+                        bindings.append((position, oid[len(base):], varBind[1]))
+                        next_oids[position] = oid
+                
+                active = [(position, next_oids[position]) for position, _ in active
+                          if position in next_oids and position not in finished]
                     
         except Exception as e:
             logger.error(f"SNMP WALK error: {str(e)}")
             raise
         
-        return results
+        return bindings
     
     async def monitor_multiple_devices(self, targets: List[str], community: str = None) -> Dict[str, SNMPResult]:
         """Monitor multiple devices concurrently"""
-        tasks = [self.get_device_info(target, community) for target in targets]
+        # Past a few dozen agents in flight, UDP buffers overflow and retries pile up
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def query(target: str) -> SNMPResult:
+            async with semaphore:
+                return await self.get_device_info(target, community)
+        
+        tasks = [query(target) for target in targets]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         output = {}
@@ -424,6 +660,32 @@ class SNMPMonitor:
         updated_stats.utilization_out_percent = max(0, min(100, utilization_out))
         
         return updated_stats
+    
+    def calculate_batch_utilization(self, current: InterfaceStatsBatch,
+                                    previous: InterfaceStatsBatch, interval_seconds: int) -> InterfaceStatsBatch:
+        """calculate_utilization for every interface present in both polls, in one pass"""
+        if interval_seconds <= 0:
+            return current
+        
+        _, current_rows, previous_rows = np.intersect1d(
+            current.interface_index, previous.interface_index,
+            assume_unique=True, return_indices=True
+        )
+        # Interfaces without a known speed keep their previous utilization
+        speed = current.speed_bps[current_rows].astype(np.float64)
+        measured = speed > 0
+        current_rows, previous_rows, speed = current_rows[measured], previous_rows[measured], speed[measured]
+        
+        # Subtract in uint64 and reinterpret as signed, so the delta stays exact for
+        # 64-bit counters and a counter reset comes out negative (clamping to 0)
+        for counter, utilization in (('bytes_in', current.utilization_in_percent),
+                                     ('bytes_out', current.utilization_out_percent)):
+            delta = (getattr(current, counter)[current_rows]
+                     - getattr(previous, counter)[previous_rows]).view(np.int64).astype(np.float64)
+            bits_per_sec = delta / interval_seconds * 8
+            utilization[current_rows] = np.clip(bits_per_sec / speed * 100, 0, 100)
+        
+        return current
 
 # Convenience functions
 async def get_device_snmp_info(target: str, community: str = "public") -> SNMPResult:
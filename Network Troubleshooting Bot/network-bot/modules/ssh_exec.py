@@ -3,18 +3,29 @@ SSH Execution Module for Network Troubleshooting Bot
 Executes commands on network devices via SSH for automation and troubleshooting
 """
 import asyncio
-import paramiko
-import socket
+import asyncssh
 import time
-from typing import Dict, List, Optional, Any
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Callable, Dict, List, Optional, Any
 from dataclasses import dataclass
 import logging
-import io
-import select
+import re
 
 logger = logging.getLogger(__name__)
 
-@dataclass
+# Device CLI prompts such as "router1#", "R1(config-if)#", "user@srx>" or "$"
+_PROMPT_RE = re.compile(r'(?:^|[\r\n])[\w.@()/:-]*[#>$%]\s*$')
+_PASSWORD_PROMPT_RE = re.compile(r'[Pp]assword:\s*$')
+# After "enable": a password prompt, or straight to the privileged prompt
+_ENABLE_REPLY_RE = re.compile(f'{_PASSWORD_PROMPT_RE.pattern}|{_PROMPT_RE.pattern}')
+# One row of Cisco "show ip interface brief"; Status may be "administratively down"
+_CISCO_BRIEF_RE = re.compile(
+    r'^(\S+)\s+(\S+)\s+(YES|NO)\s+(\S+)\s+(administratively down|\S+)\s+(\S+)\s*$', re.M
+)
+_CISCO_BRIEF_FIELDS = ('interface', 'ip_address', 'ok', 'method', 'status', 'protocol')
+
+@dataclass(slots=True)
 class SSHResult:
     host: str
     command: str
@@ -25,61 +36,80 @@ class SSHResult:
     execution_time_ms: float
     timestamp: float
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class DeviceCredentials:
     username: str
     password: str
     enable_password: Optional[str] = None
     port: int = 22
     timeout: int = 30
+    
+    @property
+    def connection_key(self) -> tuple:
+        """Identity of the login a cached connection was opened with"""
+        return (self.username, self.port)
+
+class _TrackedSSHClient(asyncssh.SSHClient):
+    """Client callbacks that remember whether the connection has dropped"""
+    
+    def __init__(self):
+        self.closed = False
+    
+    def connection_lost(self, exc: Optional[Exception]):
+        self.closed = True
 
 class SSHExecutor:
-    def __init__(self, connect_timeout: int = 30, command_timeout: int = 60):
+    def __init__(self, connect_timeout: int = 30, command_timeout: int = 60,
+                 max_channels: int = 8, max_connections: int = 32,
+                 idle_timeout: float = 30.0):
         self.connect_timeout = connect_timeout
         self.command_timeout = command_timeout
-        self._connections = {}  # Cache connections for reuse
+        # Stay under the server's per-connection session limit (OpenSSH MaxSessions is 10)
+        self.max_channels = max_channels
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        # LRU cache of connections for reuse, with last release time and active users
+        self._connections: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._last_used: Dict[tuple, float] = {}
+        self._in_use: Dict[tuple, int] = {}
+        self._keys_by_host: Dict[str, set] = {}
+        self._reaper: Optional[asyncio.Task] = None
     
     async def execute_command(self, host: str, credentials: DeviceCredentials, 
-                            command: str, enable_mode: bool = False) -> SSHResult:
+                            command: str, enable_mode: bool = False,
+                            on_chunk: Optional[Callable[[str], None]] = None) -> SSHResult:
         """
         Execute a single command on a remote device via SSH
+        
+        on_chunk, if given, is called with each piece of stdout as it arrives,
+        so long outputs like show tech-support can be processed while they stream.
         """
         start_time = time.time()
         timestamp = start_time
         
         try:
-            # Get or create SSH connection
-            ssh_client = await self._get_ssh_connection(host, credentials)
-            
-            if enable_mode and credentials.enable_password:
-                # Enter enable mode for Cisco devices
-                await self._enter_enable_mode(ssh_client, credentials.enable_password)
-            
-            # Execute command
-            stdin, stdout, stderr = ssh_client.exec_command(
-                command, timeout=self.command_timeout
-            )
-            
-            # Wait for command completion
-            exit_code = stdout.channel.recv_exit_status()
-            
-            # Read output
-            output = stdout.read().decode('utf-8', errors='ignore')
-            error = stderr.read().decode('utf-8', errors='ignore')
-            
-            execution_time = (time.time() - start_time) * 1000
-            
-            return SSHResult(
-                host=host,
-                command=command,
-                success=exit_code == 0,
-                output=output,
-                error=error,
-                exit_code=exit_code,
-                execution_time_ms=execution_time,
-                timestamp=timestamp
-            )
-            
+            async with self._connection(host, credentials) as ssh_connection:
+                
+                if enable_mode and credentials.enable_password:
+                    # Enter enable mode for Cisco devices
+                    await self._enter_enable_mode(ssh_connection, credentials.enable_password)
+                
+                # Execute command and wait for completion
+                output, error, exit_code = await self._run_command(ssh_connection, command, on_chunk)
+                
+                execution_time = (time.time() - start_time) * 1000
+                
+                return SSHResult(
+                    host=host,
+                    command=command,
+                    success=exit_code == 0,
+                    output=output,
+                    error=error,
+                    exit_code=exit_code,
+                    execution_time_ms=execution_time,
+                    timestamp=timestamp
+                )
+                
         except Exception as e:
             execution_time = (time.time() - start_time) * 1000
             logger.error(f"SSH execution error on {host}: {str(e)}")
@@ -95,28 +125,45 @@ class SSHExecutor:
             )
     
     async def execute_multiple_commands(self, host: str, credentials: DeviceCredentials, 
-                                     commands: List[str], enable_mode: bool = False) -> List[SSHResult]:
+                                     commands: List[str], enable_mode: bool = False,
+                                     concurrent: bool = False) -> List[SSHResult]:
         """
         Execute multiple commands on the same device
+        
+        With concurrent=True the commands run as parallel channels over the one
+        connection; only use it for independent commands such as show queries.
         """
         results = []
         
         try:
-            # Get SSH connection
-            ssh_client = await self._get_ssh_connection(host, credentials)
-            
-            if enable_mode and credentials.enable_password:
-                await self._enter_enable_mode(ssh_client, credentials.enable_password)
-            
-            # Execute each command
-            for command in commands:
-                result = await self._execute_single_command(ssh_client, host, command)
-                results.append(result)
+            async with self._connection(host, credentials) as ssh_connection:
+                
+                if enable_mode and credentials.enable_password:
+                    await self._enter_enable_mode(ssh_connection, credentials.enable_password)
+                
+                if concurrent:
+                    semaphore = asyncio.Semaphore(self.max_channels)
+                
+                    async def run_limited(command: str) -> SSHResult:
+                        async with semaphore:
+                            return await self._execute_single_command(ssh_connection, host, command)
+                
+                    results = list(await asyncio.gather(*(run_limited(c) for c in commands)))
+                    for result in results:
+                        if not result.success:
+                            logger.warning(f"Command failed on {host}: {result.command}")
+                    return results
+                
+                # Execute each command in order; sequences like shutdown / no shutdown
+                # must reach the device in the order given
+                for command in commands:
+                    result = await self._execute_single_command(ssh_connection, host, command)
+                    results.append(result)
+                
+                    # If a command fails, decide whether to continue
+                    if not result.success:
+                        logger.warning(f"Command failed on {host}: {command}")
                 
-                # If a command fails, decide whether to continue
-                if not result.success:
-                    logger.warning(f"Command failed on {host}: {command}")
-                    
         except Exception as e:
             logger.error(f"Error executing multiple commands on {host}: {str(e)}")
             # Add error results for remaining commands
@@ -134,18 +181,12 @@ class SSHExecutor:
         
         return results
     
-    async def _execute_single_command(self, ssh_client, host: str, command: str) -> SSHResult:
+    async def _execute_single_command(self, ssh_connection, host: str, command: str) -> SSHResult:
         """Execute a single command using existing SSH connection"""
         start_time = time.time()
         
         try:
-            stdin, stdout, stderr = ssh_client.exec_command(
-                command, timeout=self.command_timeout
-            )
-            
-            exit_code = stdout.channel.recv_exit_status()
-            output = stdout.read().decode('utf-8', errors='ignore')
-            error = stderr.read().decode('utf-8', errors='ignore')
+            output, error, exit_code = await self._run_command(ssh_connection, command)
             
             execution_time = (time.time() - start_time) * 1000
             
@@ -173,128 +214,222 @@ class SSHExecutor:
                 timestamp=start_time
             )
     
+    async def _run_command(self, ssh_connection, command: str,
+                           on_chunk: Optional[Callable[[str], None]] = None):
+        """Run command on its own channel, reading stdout in chunks; (stdout, stderr, exit status)"""
+        process = await ssh_connection.create_process(command, encoding='utf-8', errors='ignore')
+        
+        async def read_stdout() -> str:
+            chunks = []
+            while True:
+                data = await process.stdout.read(65536)
+                if not data:
+                    return "".join(chunks)
+                chunks.append(data)
+                if on_chunk is not None:
+                    on_chunk(data)
+        
+        async def communicate():
+            # stderr is drained alongside stdout so neither stream's window stalls the other
+            streams = await asyncio.gather(read_stdout(), process.stderr.read())
+            await process.wait()
+            return streams
+        
+        try:
+            output, error = await asyncio.wait_for(communicate(), self.command_timeout)
+        except asyncio.TimeoutError:
+            raise asyncio.TimeoutError(f"Command timed out after {self.command_timeout}s") from None
+        finally:
+            process.close()
+        return output, error, process.exit_status
+    
+    @asynccontextmanager
+    async def _connection(self, host: str, credentials: DeviceCredentials):
+        """Borrow a cached connection; it is not reaped while borrowed"""
+        connection_key = (host,) + credentials.connection_key
+        ssh_connection = await self._get_ssh_connection(host, credentials)
+        self._in_use[connection_key] = self._in_use.get(connection_key, 0) + 1
+        try:
+            yield ssh_connection
+        finally:
+            if connection_key in self._connections:
+                self._last_used[connection_key] = time.monotonic()
+            remaining = self._in_use[connection_key] - 1
+            if remaining:
+                self._in_use[connection_key] = remaining
+            else:
+                del self._in_use[connection_key]
+    
     async def _get_ssh_connection(self, host: str, credentials: DeviceCredentials):
         """Get or create SSH connection"""
-        connection_key = f"{host}:{credentials.port}:{credentials.username}"
+        connection_key = (host,) + credentials.connection_key
+        loop = asyncio.get_running_loop()
         
         # Check if we have a cached connection
         if connection_key in self._connections:
-            ssh_client = self._connections[connection_key]
-            try:
-                # Test if connection is still alive
-                transport = ssh_client.get_transport()
-                if transport and transport.is_alive():
-                    return ssh_client
-                else:
-                    # Connection is dead, remove from cache
-                    del self._connections[connection_key]
-            except:
-                # Connection is not usable, remove from cache
-                if connection_key in self._connections:
-                    del self._connections[connection_key]
-        
-        # Create new SSH connection
-        ssh_client = paramiko.SSHClient()
-        ssh_client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+            ssh_connection, client, connection_loop = self._connections[connection_key]
+            # Connections belong to the loop that opened them
+            if not client.closed and connection_loop is loop:
+                self._connections.move_to_end(connection_key)
+                self._last_used[connection_key] = time.monotonic()
+                return ssh_connection
+            # Connection is dead or unusable here, remove from cache
+            self._discard(connection_key)
         
+        # Create new SSH connection; like the old AutoAddPolicy, any host key is accepted
         try:
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                ssh_client.connect,
+            ssh_connection, client = await asyncssh.create_connection(
+                _TrackedSSHClient,
                 host,
-                credentials.port,
-                credentials.username,
-                credentials.password,
-                self.connect_timeout
+                port=credentials.port,
+                username=credentials.username,
+                password=credentials.password,
+                known_hosts=None,
+                connect_timeout=self.connect_timeout
             )
             
-            # Cache the connection for reuse
-            self._connections[connection_key] = ssh_client
-            return ssh_client
+            # Another call may have connected to the same device while this one waited;
+            # keep its connection and close the duplicate rather than orphaning either
+            if connection_key in self._connections:
+                cached_connection, cached_client, cached_loop = self._connections[connection_key]
+                if not cached_client.closed and cached_loop is loop:
+                    ssh_connection.close()
+                    self._connections.move_to_end(connection_key)
+                    self._last_used[connection_key] = time.monotonic()
+                    return cached_connection
+                self._discard(connection_key)
+            
+            # Cache the connection for reuse, evicting the least recently used idle ones;
+            # the new one is about to be borrowed, so it is never a candidate
+            self._connections[connection_key] = (ssh_connection, client, loop)
+            self._keys_by_host.setdefault(host, set()).add(connection_key)
+            self._last_used[connection_key] = time.monotonic()
+            excess = len(self._connections) - self.max_connections
+            if excess > 0:
+                idle_keys = [key for key in self._connections
+                             if key not in self._in_use and key != connection_key]
+                for key in idle_keys[:excess]:
+                    self._discard(key)
+            
+            if self._reaper is None or self._reaper.done() or self._reaper.get_loop() is not loop:
+                self._reaper = loop.create_task(self._reap_idle_connections())
+            return ssh_connection
             
         except Exception as e:
             logger.error(f"Failed to connect to {host}: {str(e)}")
             raise
     
-    async def _enter_enable_mode(self, ssh_client, enable_password: str):
+    async def _enter_enable_mode(self, ssh_connection, enable_password: str):
         """Enter enable mode on Cisco devices"""
         try:
             # Create interactive shell
-            shell = ssh_client.invoke_shell()
+            shell = await ssh_connection.create_process(term_type='vt100', encoding='utf-8', errors='ignore')
             
-            # Send enable command
-            shell.send("enable\n")
-            time.sleep(1)
+            await self._read_until_prompt(shell)
             
-            # Send enable password
-            shell.send(f"{enable_password}\n")
-            time.sleep(1)
+            # Send enable command; some devices need no secret and go straight to '#'
+            shell.stdin.write("enable\n")
+            reply = await self._read_until_prompt(shell, _ENABLE_REPLY_RE)
             
-            # Read response to clear buffer
-            if shell.recv_ready():
-                shell.recv(1024)
+            if _PASSWORD_PROMPT_RE.search(reply[-256:]):
+                # Send enable password and wait for the privileged prompt
+                shell.stdin.write(f"{enable_password}\n")
+                await self._read_until_prompt(shell)
+            shell.close()
                 
         except Exception as e:
             logger.error(f"Failed to enter enable mode: {str(e)}")
             raise
     
+    async def _read_until_prompt(self, shell, prompt_re: re.Pattern = _PROMPT_RE) -> str:
+        """Collect shell output until prompt_re matches its tail or command_timeout passes"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.command_timeout
+        # Chunks are joined once at the end; only the tail is rebuilt to look for the prompt
+        chunks = []
+        tail = ""
+        while not prompt_re.search(tail):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                data = await asyncio.wait_for(shell.stdout.read(65536), remaining)
+            except asyncio.TimeoutError:
+                break
+            if not data:
+                break
+            chunks.append(data)
+            tail = (tail + data)[-256:]
+        return "".join(chunks)
+    
     async def interactive_session(self, host: str, credentials: DeviceCredentials, 
                                 commands: List[str]) -> List[str]:
         """
         Run commands in an interactive SSH session (for devices that need it)
         """
         try:
-            ssh_client = await self._get_ssh_connection(host, credentials)
-            
-            # Create interactive shell
-            shell = ssh_client.invoke_shell()
-            time.sleep(2)  # Wait for shell to be ready
-            
-            outputs = []
-            
-            for command in commands:
-                # Clear any existing output
-                if shell.recv_ready():
-                    shell.recv(4096)
+            async with self._connection(host, credentials) as ssh_connection:
                 
-                # Send command
-                shell.send(f"{command}\n")
-                time.sleep(2)  # Wait for command execution
+                # Create interactive shell
+                shell = await ssh_connection.create_process(term_type='vt100', encoding='utf-8', errors='ignore')
+                await self._read_until_prompt(shell)  # Wait for shell to be ready
                 
-                # Collect output
-                output = ""
-                while shell.recv_ready():
-                    data = shell.recv(4096).decode('utf-8', errors='ignore')
-                    output += data
-                    time.sleep(0.1)
+                outputs = []
+                
+                for command in commands:
+                    # Send command and collect output up to the next prompt
+                    shell.stdin.write(f"{command}\n")
+                    outputs.append(await self._read_until_prompt(shell))
+                
+                shell.close()
+                return outputs
                 
-                outputs.append(output)
-            
-            shell.close()
-            return outputs
-            
         except Exception as e:
             logger.error(f"Interactive session error on {host}: {str(e)}")
             return [f"Error: {str(e)}"] * len(commands)
     
-    def close_connection(self, host: str, port: int = 22, username: str = ""):
-        """Close and remove cached SSH connection"""
-        connection_key = f"{host}:{port}:{username}"
+    async def _reap_idle_connections(self):
+        """Close connections left idle past idle_timeout; stops once the cache is empty"""
+        interval = min(self.idle_timeout, 30.0)
+        while self._connections:
+            await asyncio.sleep(interval)
+            cutoff = time.monotonic() - self.idle_timeout
+            for key in list(self._connections):
+                if key not in self._in_use and self._last_used.get(key, 0.0) <= cutoff:
+                    self._discard(key)
+    
+    def _discard(self, connection_key: tuple):
+        """Close a cached connection and forget it"""
+        ssh_connection = self._connections.pop(connection_key)[0]
+        self._last_used.pop(connection_key, None)
+        host_keys = self._keys_by_host.get(connection_key[0])
+        if host_keys is not None:
+            host_keys.discard(connection_key)
+            if not host_keys:
+                del self._keys_by_host[connection_key[0]]
+        try:
+            ssh_connection.close()
+        except (asyncssh.Error, OSError) as e:
+            logger.debug(f"Error closing SSH connection to {connection_key[0]}: {e}")
+    
+    def close_connection(self, host: str, credentials: DeviceCredentials):
+        """Close and remove the cached SSH connection opened with credentials"""
+        connection_key = (host,) + credentials.connection_key
         if connection_key in self._connections:
-            try:
-                self._connections[connection_key].close()
-            except:
-                pass
-            del self._connections[connection_key]
+            self._discard(connection_key)
+    
+    def close_all_for_host(self, host: str):
+        """Close every cached SSH connection to host, whichever login opened it"""
+        for connection_key in list(self._keys_by_host.get(host, ())):
+            self._discard(connection_key)
     
     def close_all_connections(self):
         """Close all cached SSH connections"""
-        for ssh_client in self._connections.values():
-            try:
-                ssh_client.close()
-            except:
-                pass
-        self._connections.clear()
+        for connection_key in list(self._connections):
+            self._discard(connection_key)
+        if self._reaper is not None:
+            self._reaper.cancel()
+            self._reaper = None
 
 class NetworkDeviceAutomation:
     """High-level automation for common network device operations"""
@@ -444,20 +579,9 @@ class NetworkDeviceAutomation:
         
         try:
             if vendor.lower() == "cisco" and "show ip interface brief" in output:
-                lines = output.split('\n')
-                for line in lines:
-                    # Parse Cisco interface brief format
-                    if 'YES' in line or 'NO' in line:
-                        parts = line.split()
-                        if len(parts) >= 6:
-                            interfaces.append({
-                                'interface': parts[0],
-                                'ip_address': parts[1],
-                                'ok': parts[2],
-                                'method': parts[3],
-                                'status': parts[4],
-                                'protocol': parts[5]
-                            })
+                # Parse Cisco interface brief format
+                interfaces = [dict(zip(_CISCO_BRIEF_FIELDS, match.groups()))
+                              for match in _CISCO_BRIEF_RE.finditer(output)]
         except Exception as e:
             logger.error(f"Error parsing interface output: {str(e)}")
         
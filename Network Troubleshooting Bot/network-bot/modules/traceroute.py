@@ -3,18 +3,183 @@ Traceroute Module for Network Troubleshooting Bot
 Performs traceroute to trace network path and identify routing issues
 """
 import asyncio
+import ipaddress
 import platform
 import subprocess
 import socket
+import struct
 import time
 import re
+from functools import lru_cache
 from typing import Dict, List, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 import logging
 
+import numpy as np
+
+from .ttl_cache import TTLCache
+
+try:
+    import aiodns
+    AIODNS_AVAILABLE = True
+    _LOOKUP_ERRORS = (socket.gaierror, aiodns.error.DNSError)
+except ImportError:
+    AIODNS_AVAILABLE = False
+    _LOOKUP_ERRORS = (socket.gaierror,)
+
 logger = logging.getLogger(__name__)
 
-@dataclass
+# One match per hop line; whitespace is [ \t] so a match never runs into the next line.
+# Windows: "  2     1 ms    <1 ms     *     10.0.0.1", "  3     *        *        *     Request timed out."
+_WINDOWS_HOP_RE = re.compile(
+    r'^[ \t]*(?P<hop>\d+)'
+    r'[ \t]+(?:<?(?P<l1>\d+)[ \t]*ms|\*)'
+    r'[ \t]+(?:<?(?P<l2>\d+)[ \t]*ms|\*)'
+    r'[ \t]+(?:<?(?P<l3>\d+)[ \t]*ms|\*)'
+    r'(?:[ \t]+(?:(?P<host>\S+)[ \t]+\[(?P<host_ip>\d+\.\d+\.\d+\.\d+)\]|(?P<ip>\d+\.\d+\.\d+\.\d+)))?',
+    re.M
+)
+# Unix: " 2  gw.example.net (10.0.0.1)  0.512 ms  0.498 ms", " 2  10.0.0.1  0.512 ms", " 3  * * *";
+# the probe count varies (-q), so latencies come from the rest of the line
+_UNIX_HOP_RE = re.compile(
+    r'^[ \t]*(?P<hop>\d+)[ \t]+(?:\*[ \t]+)*'
+    r'(?:(?P<host>[a-zA-Z0-9.-]+)[ \t]*\((?P<host_ip>[0-9.]+)\)|(?P<ip>\d+\.\d+\.\d+\.\d+))?'
+    r'(?P<rest>.*)$',
+    re.M
+)
+_UNIX_LATENCY_RE = re.compile(r'(\d+\.?\d*)\s*ms')
+
+# DNS answers shared by every tester; callers also build their own testers, and
+# the same gateway and backbone hops recur across traces. PTR misses are kept as ""
+_resolve_cache = TTLCache(maxsize=1024, ttl=300.0)
+_ptr_cache = TTLCache(maxsize=4096, ttl=900.0)
+
+# Completed traces, so repeated chat and dashboard requests for the same target
+# don't each wait out a full trace; only successful results are kept
+_result_cache = TTLCache(maxsize=512, ttl=60.0)
+
+# With aiodns, every lookup goes through one c-ares channel and its sockets instead
+# of a getaddrinfo thread per query. A channel is tied to its loop, so there is one
+# resolver per loop. The resolver holds its loop, which rules out a WeakKeyDictionary;
+# resolvers of closed loops are cancelled and dropped instead, releasing their sockets
+_resolvers: "Dict[asyncio.AbstractEventLoop, aiodns.DNSResolver]" = {}
+
+def _dns_resolver() -> "aiodns.DNSResolver":
+    """Shared aiodns resolver for the running loop"""
+    loop = asyncio.get_running_loop()
+    resolver = _resolvers.get(loop)
+    if resolver is None:
+        for closed_loop in [other for other in _resolvers if other.is_closed()]:
+            _resolvers.pop(closed_loop).cancel()
+        resolver = _resolvers[loop] = aiodns.DNSResolver(loop=loop, timeout=1.0, tries=2)
+    return resolver
+
+# Linux delivers ICMP errors for a UDP socket on its error queue when IP_RECVERR is set,
+# which lets traceroute run without raw sockets or root (the tracepath technique)
+IP_RECVERR = getattr(socket, "IP_RECVERR", 11)
+SO_EE_ORIGIN_ICMP = 2
+ICMP_DEST_UNREACH = 3
+ICMP_TIME_EXCEEDED = 11
+TRACEROUTE_BASE_PORT = 33434  # Classic traceroute destination port range
+
+# struct sock_extended_err followed by the offender's sockaddr_in
+_EXTENDED_ERR = struct.Struct("=IBBBBII")
+_PROBE_PAYLOAD = struct.Struct("!H")
+
+def udp_probe_available() -> bool:
+    """Check whether ICMP errors can be read from UDP error queues (Linux)"""
+    return hasattr(socket, "MSG_ERRQUEUE") and platform.system() == "Linux"
+
+class _HopProbe:
+    """UDP socket with a fixed TTL whose error queue reports the router that dropped it"""
+    
+    def __init__(self, loop: asyncio.AbstractEventLoop, address: str, ttl: int, probes: int):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            self.sock.setblocking(False)
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_TTL, ttl)
+            self.sock.setsockopt(socket.IPPROTO_IP, IP_RECVERR, 1)
+            self.sock.connect((address, TRACEROUTE_BASE_PORT + ttl))
+            self._loop = loop
+            self._sent_at = [0] * probes
+            # probe index -> (offender address, round trip in ms, ICMP type)
+            self.replies: Dict[int, tuple] = {}
+            # Resolved when the probe currently in flight is answered
+            self._current = 0
+            self._answered = loop.create_future()
+            loop.add_reader(self.sock.fileno(), self._on_error)
+        except BaseException:
+            self.sock.close()
+            raise
+    
+    async def run(self, timeout: float) -> Dict[int, tuple]:
+        """Send the probes one at a time and collect replies until timeout passes"""
+        # Routers rate-limit ICMP errors, so back-to-back probes to one hop lose all but
+        # the first reply. Like traceroute, each probe waits for the previous one's reply
+        # or its share of the remaining time
+        deadline = self._loop.time() + timeout
+        try:
+            for index in range(len(self._sent_at)):
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                self._current = index
+                self._answered = self._loop.create_future()
+                self._send(index)
+                await asyncio.wait((self._answered,), timeout=remaining / (len(self._sent_at) - index))
+        finally:
+            self.close()
+        return self.replies
+    
+    def close(self):
+        """Stop watching and close the socket; safe to call more than once"""
+        if self.sock.fileno() >= 0:
+            self._loop.remove_reader(self.sock.fileno())
+            self.sock.close()
+    
+    def _send(self, index: int):
+        """Send one probe; an ICMP error left by an earlier probe fails the first try"""
+        for _ in range(2):
+            self._sent_at[index] = time.monotonic_ns()
+            try:
+                self.sock.send(_PROBE_PAYLOAD.pack(index))
+                return
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                continue
+    
+    def _on_error(self):
+        """Drain the error queue, recording which hop answered each probe"""
+        while True:
+            try:
+                data, ancdata, _, _ = self.sock.recvmsg(64, 512, socket.MSG_ERRQUEUE)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            
+            received_at = time.monotonic_ns()
+            if len(data) < _PROBE_PAYLOAD.size:
+                continue
+            index = _PROBE_PAYLOAD.unpack_from(data)[0]
+            if index >= len(self._sent_at) or index in self.replies:
+                continue
+            
+            for level, kind, payload in ancdata:
+                if level != socket.IPPROTO_IP or kind != IP_RECVERR or len(payload) < _EXTENDED_ERR.size + 8:
+                    continue
+                _, origin, icmp_type, _, _, _, _ = _EXTENDED_ERR.unpack_from(payload)
+                if origin != SO_EE_ORIGIN_ICMP:
+                    continue
+                offender = socket.inet_ntoa(payload[_EXTENDED_ERR.size + 4:_EXTENDED_ERR.size + 8])
+                latency = (received_at - self._sent_at[index]) / 1_000_000
+                self.replies[index] = (offender, latency, icmp_type)
+            
+            if self._current in self.replies and not self._answered.done():
+                self._answered.set_result(None)
+
+@dataclass(slots=True)
 class TracerouteHop:
     hop_number: int
     ip_address: Optional[str]
@@ -22,8 +187,10 @@ class TracerouteHop:
     latency_ms: List[float]
     timeout: bool
     error_message: Optional[str]
+    # Mean of latency_ms, worked out once by the parser; None when no probe answered
+    avg_latency_ms: Optional[float] = None
 
-@dataclass
+@dataclass(slots=True)
 class TracerouteResult:
     target: str
     success: bool
@@ -33,23 +200,53 @@ class TracerouteResult:
     error_message: Optional[str]
     timestamp: float
     execution_time_ms: float
+    # True when traceroute() answered from the result cache instead of running a trace
+    from_cache: bool = False
 
 class TracerouteTester:
-    def __init__(self, max_hops: int = 30, timeout: int = 5):
+    def __init__(self, max_hops: int = 30, timeout: int = 5, probes_per_hop: int = 3,
+                 max_concurrency: int = 16, resolve_hostnames: bool = True):
         self.max_hops = max_hops
         self.timeout = timeout
+        self.probes_per_hop = probes_per_hop
+        # PTR lookups dominate a trace's wall time; callers that only need
+        # addresses and latencies can skip them
+        self.resolve_hostnames = resolve_hostnames
+        # Traces in flight in traceroute_multiple; each holds max_hops sockets or a subprocess
+        self.max_concurrency = max_concurrency
         self.system = platform.system().lower()
+        # The platform is fixed for the process, so pick its hop parser once
+        if self.system == "windows":
+            self._hop_re, self._hop_from_match = _WINDOWS_HOP_RE, self._windows_hop
+        else:
+            self._hop_re, self._hop_from_match = _UNIX_HOP_RE, self._unix_hop
+        self.udp_probe_available = udp_probe_available()
     
-    async def traceroute(self, target: str) -> TracerouteResult:
+    async def traceroute(self, target: str, use_cache: bool = True) -> TracerouteResult:
         """
-        Perform traceroute to target host
+        Perform traceroute to target host, reusing a trace with the same settings
+        from the last minute unless use_cache is False
         """
+        cache_key = (target, self.max_hops, self.timeout, self.resolve_hostnames)
+        if use_cache:
+            cached = _result_cache.get(cache_key)
+            if cached is not None:
+                return replace(cached, from_cache=True)
+        
+        result = await self._traceroute(target)
+        if result.success:
+            _result_cache.set(cache_key, result)
+        return result
+    
+    async def _traceroute(self, target: str) -> TracerouteResult:
+        """Run one uncached trace"""
         start_time = time.time()
         timestamp = start_time
         
         try:
-            # Validate target
-            if not self._is_valid_target(target):
+            # Validate target, resolving it once for every later step
+            address = await self._resolve_target(target)
+            if address is None:
                 return TracerouteResult(
                     target=target,
                     success=False,
@@ -61,41 +258,17 @@ class TracerouteTester:
                     execution_time_ms=0
                 )
             
-            # Build traceroute command
-            command = self._build_traceroute_command(target)
+            if self.udp_probe_available:
+                try:
+                    return await self._traceroute_with_sockets(target, address, start_time)
+                except OSError as e:
+                    logger.debug(f"Socket traceroute unavailable, falling back to command: {e}")
             
-            # Execute traceroute command
-            process = await asyncio.create_subprocess_exec(
-                *command,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE
-            )
-            
-            try:
-                stdout, stderr = await asyncio.wait_for(
-                    process.communicate(),
-                    timeout=self.timeout * self.max_hops  # Allow enough time
-                )
-            except asyncio.TimeoutError:
-                process.kill()
-                execution_time = (time.time() - start_time) * 1000
-                return TracerouteResult(
-                    target=target,
-                    success=False,
-                    hops=[],
-                    total_hops=0,
-                    target_reached=False,
-                    error_message="Traceroute timeout",
-                    timestamp=timestamp,
-                    execution_time_ms=execution_time
-                )
-            
-            execution_time = (time.time() - start_time) * 1000
-            
-            # Parse results
-            return self._parse_traceroute_output(
-                target, stdout.decode(), stderr.decode(), timestamp, execution_time
-            )
+            result = await self._traceroute_with_command(target, address, start_time)
+            if self.system == "windows" and self.resolve_hostnames:
+                # tracert runs with -d, so look up every hop's name here at once
+                await self._resolve_hop_names(result.hops)
+            return result
             
         except Exception as e:
             execution_time = (time.time() - start_time) * 1000
@@ -111,216 +284,294 @@ class TracerouteTester:
                 execution_time_ms=execution_time
             )
     
-    def _build_traceroute_command(self, target: str) -> List[str]:
-        """Build traceroute command based on operating system"""
-        if self.system == "windows":
-            return ["tracert", "-h", str(self.max_hops), "-w", str(self.timeout * 1000), target]
-        else:  # Linux/Mac
-            return ["traceroute", "-m", str(self.max_hops), "-w", str(self.timeout), target]
-    
-    def _is_valid_target(self, target: str) -> bool:
-        """Validate if target is a valid IP address or hostname"""
-        try:
-            socket.gethostbyname(target)
-            return True
-        except socket.gaierror:
+    async def _traceroute_with_command(self, target: str, address: str,
+                                       start_time: float) -> TracerouteResult:
+        """Run the system traceroute, parsing each hop line as it is printed"""
+        process = await asyncio.create_subprocess_exec(
+            *self._build_traceroute_command(address),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        # stderr only matters when no hop arrives; drain it alongside so the pipe never fills
+        stderr_task = asyncio.ensure_future(process.stderr.read())
+        hops = []
+        
+        async def read_hops():
+            async for line in process.stdout:
+                hop_match = self._hop_re.match(line.decode(errors="replace"))
+                if hop_match is None:
+                    continue
+                hops.append(self._hop_from_match(hop_match))
+                if hops[-1].ip_address == address:
+                    # The target's line is complete, so there is nothing left to wait for
+                    return True
             return False
-    
-    def _parse_traceroute_output(self, target: str, stdout: str, stderr: str, 
-                                timestamp: float, execution_time: float) -> TracerouteResult:
-        """Parse traceroute command output"""
-        if stderr and not stdout:
-            return TracerouteResult(
-                target=target,
-                success=False,
-                hops=[],
-                total_hops=0,
-                target_reached=False,
-                error_message=stderr.strip(),
-                timestamp=timestamp,
-                execution_time_ms=execution_time
-            )
         
+        error_message = None
+        finished = False
         try:
-            if self.system == "windows":
-                return self._parse_windows_tracert(target, stdout, timestamp, execution_time)
-            else:
-                return self._parse_unix_traceroute(target, stdout, timestamp, execution_time)
-        except Exception as e:
-            logger.error(f"Error parsing traceroute output: {str(e)}")
-            return TracerouteResult(
-                target=target,
-                success=False,
-                hops=[],
-                total_hops=0,
-                target_reached=False,
-                error_message=f"Failed to parse output: {str(e)}",
-                timestamp=timestamp,
-                execution_time_ms=execution_time
-            )
-    
-    def _parse_windows_tracert(self, target: str, output: str, 
-                              timestamp: float, execution_time: float) -> TracerouteResult:
-        """Parse Windows tracert output"""
-        lines = output.split('\n')
-        hops = []
-        target_reached = False
+            target_reached = await asyncio.wait_for(read_hops(), timeout=self.timeout * self.max_hops)
+            finished = not target_reached
+        except asyncio.TimeoutError:
+            target_reached = False
+            error_message = "Traceroute timeout"
+        finally:
+            if not finished:
+                # Stopped at the target or on timeout; don't wait out the remaining probes
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+                stderr_task.cancel()
+            await process.wait()
         
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith("Tracing route"):
-                continue
-            
-            # Look for hop lines (start with hop number)
-            hop_match = re.match(r'^\s*(\d+)', line)
-            if hop_match:
-                hop_number = int(hop_match.group(1))
-                
-                # Check for timeouts
-                if "Request timed out" in line or "*" in line:
-                    hops.append(TracerouteHop(
-                        hop_number=hop_number,
-                        ip_address=None,
-                        hostname=None,
-                        latency_ms=[],
-                        timeout=True,
-                        error_message="Request timed out"
-                    ))
-                else:
-                    # Parse IP address and latencies
-                    ip_pattern = r'(\d+\.\d+\.\d+\.\d+)'
-                    latency_pattern = r'(\d+)\s*ms'
-                    
-                    ip_matches = re.findall(ip_pattern, line)
-                    latency_matches = re.findall(latency_pattern, line)
-                    
-                    ip_address = ip_matches[0] if ip_matches else None
-                    latencies = [float(lat) for lat in latency_matches]
-                    
-                    # Try to resolve hostname
-                    hostname = None
-                    if ip_address:
-                        try:
-                            hostname = socket.gethostbyaddr(ip_address)[0]
-                        except socket.herror:
-                            pass
-                    
-                    hops.append(TracerouteHop(
-                        hop_number=hop_number,
-                        ip_address=ip_address,
-                        hostname=hostname,
-                        latency_ms=latencies,
-                        timeout=False,
-                        error_message=None
-                    ))
-                    
-                    # Check if target is reached
-                    if ip_address:
-                        try:
-                            target_ip = socket.gethostbyname(target)
-                            if ip_address == target_ip:
-                                target_reached = True
-                        except socket.gaierror:
-                            pass
-        
-        success = len(hops) > 0
+        if error_message is None and not hops:
+            error_message = (await stderr_task).decode(errors="replace").strip() or "No hops found"
         
         return TracerouteResult(
             target=target,
-            success=success,
+            success=error_message is None,
             hops=hops,
             total_hops=len(hops),
             target_reached=target_reached,
-            error_message=None if success else "No hops found",
-            timestamp=timestamp,
-            execution_time_ms=execution_time
+            error_message=error_message,
+            timestamp=start_time,
+            execution_time_ms=(time.time() - start_time) * 1000
         )
     
-    def _parse_unix_traceroute(self, target: str, output: str, 
-                              timestamp: float, execution_time: float) -> TracerouteResult:
-        """Parse Unix/Linux traceroute output"""
-        lines = output.split('\n')
-        hops = []
-        target_reached = False
+    async def _traceroute_with_sockets(self, target: str, address: str,
+                                       start_time: float) -> TracerouteResult:
+        """Probe every TTL at once; total time is about the slowest hop, not the sum of hops"""
+        loop = asyncio.get_running_loop()
+        
+        def is_last_hop(hop_replies: Dict[int, tuple]) -> bool:
+            # Like traceroute, stop at the target or at a hop reporting it unreachable
+            return any(offender == address or icmp_type == ICMP_DEST_UNREACH
+                       for offender, _, icmp_type in hop_replies.values())
+        
+        probes = []
+        try:
+            for ttl in range(1, self.max_hops + 1):
+                probes.append(_HopProbe(loop, address, ttl, self.probes_per_hop))
+        except BaseException:
+            for probe in probes:
+                probe.close()
+            raise
+        
+        tasks = [loop.create_task(probe.run(self.timeout)) for probe in probes]
+        try:
+            # Stop waiting once every hop up to the last one has finished
+            pending = set(tasks)
+            last_hop = len(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    hop = tasks.index(task) + 1
+                    if hop < last_hop and is_last_hop(task.result()):
+                        last_hop = hop
+                if all(task.done() for task in tasks[:last_hop]):
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+            # A task cancelled before it started never reaches run()'s cleanup
+            for probe in probes:
+                probe.close()
         
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith("traceroute to"):
+        replies = [task.result() for task in tasks[:last_hop]]
+        target_reached = any(offender == address for offender, _, _ in replies[-1].values())
+        
+        hops = []
+        for hop_number, hop_replies in enumerate(replies, start=1):
+            if not hop_replies:
+                hops.append(TracerouteHop(
+                    hop_number=hop_number,
+                    ip_address=None,
+                    hostname=None,
+                    latency_ms=[],
+                    timeout=True,
+                    error_message="Request timed out"
+                ))
                 continue
-            
-            # Look for hop lines
-            hop_match = re.match(r'^\s*(\d+)', line)
-            if hop_match:
-                hop_number = int(hop_match.group(1))
-                
-                # Check for timeouts
-                if "*" in line:
-                    hops.append(TracerouteHop(
-                        hop_number=hop_number,
-                        ip_address=None,
-                        hostname=None,
-                        latency_ms=[],
-                        timeout=True,
-                        error_message="Request timed out"
-                    ))
-                else:
-                    # Parse hostname/IP and latencies
-                    # Pattern to match hostname (hostname) or IP
-                    host_pattern = r'([a-zA-Z0-9.-]+)\s*\(([0-9.]+)\)|([0-9.]+)'
-                    latency_pattern = r'(\d+\.?\d*)\s*ms'
-                    
-                    host_matches = re.findall(host_pattern, line)
-                    latency_matches = re.findall(latency_pattern, line)
-                    
-                    hostname = None
-                    ip_address = None
-                    
-                    if host_matches:
-                        match = host_matches[0]
-                        if match[0] and match[1]:  # hostname (ip) format
-                            hostname = match[0]
-                            ip_address = match[1]
-                        elif match[2]:  # ip only format
-                            ip_address = match[2]
-                    
-                    latencies = [float(lat) for lat in latency_matches]
-                    
-                    hops.append(TracerouteHop(
-                        hop_number=hop_number,
-                        ip_address=ip_address,
-                        hostname=hostname,
-                        latency_ms=latencies,
-                        timeout=False,
-                        error_message=None
-                    ))
-                    
-                    # Check if target is reached
-                    if ip_address:
-                        try:
-                            target_ip = socket.gethostbyname(target)
-                            if ip_address == target_ip:
-                                target_reached = True
-                        except socket.gaierror:
-                            pass
-        
-        success = len(hops) > 0
+            ip_address = next(iter(hop_replies.values()))[0]
+            latencies = [hop_replies[i][1] for i in sorted(hop_replies)]
+            hops.append(TracerouteHop(
+                hop_number=hop_number,
+                ip_address=ip_address,
+                hostname=None,
+                latency_ms=latencies,
+                timeout=False,
+                error_message=None,
+                avg_latency_ms=sum(latencies) / len(latencies)
+            ))
+        
+        if self.resolve_hostnames:
+            await self._resolve_hop_names(hops)
         
         return TracerouteResult(
             target=target,
-            success=success,
+            success=True,
             hops=hops,
             total_hops=len(hops),
             target_reached=target_reached,
-            error_message=None if success else "No hops found",
-            timestamp=timestamp,
-            execution_time_ms=execution_time
+            error_message=None,
+            timestamp=start_time,
+            execution_time_ms=(time.time() - start_time) * 1000
+        )
+    
+    async def _resolve_hop_names(self, hops: List[TracerouteHop]):
+        """Fill in hostnames for hops that only have an address, every PTR lookup at once"""
+        addresses = list({hop.ip_address for hop in hops if hop.ip_address and not hop.hostname})
+        names = await asyncio.gather(*(self._reverse_lookup(address) for address in addresses))
+        hostnames = dict(zip(addresses, names))
+        for hop in hops:
+            if hop.ip_address in hostnames and not hop.hostname:
+                hop.hostname = hostnames[hop.ip_address]
+    
+    async def _reverse_lookup(self, ip_address: str) -> Optional[str]:
+        """PTR name for a hop, or None if it has none or the lookup is slow"""
+        cached = _ptr_cache.get(ip_address)
+        if cached is not None:
+            return cached or None
+        
+        try:
+            host = await asyncio.wait_for(self._query_ptr(ip_address), self.timeout)
+        except socket.gaierror:
+            # No PTR record; remember that too. Timeouts are not cached
+            _ptr_cache.set(ip_address, "")
+            return None
+        except (asyncio.TimeoutError, OSError):
+            return None
+        
+        _ptr_cache.set(ip_address, host)
+        return host
+    
+    async def _query_ptr(self, ip_address: str) -> str:
+        """Uncached PTR lookup; raises socket.gaierror when the address has no name"""
+        if not AIODNS_AVAILABLE:
+            host, _ = await asyncio.get_running_loop().getnameinfo((ip_address, 0), socket.NI_NAMEREQD)
+            return host
+        
+        try:
+            return (await _dns_resolver().gethostbyaddr(ip_address)).name
+        except aiodns.error.DNSError as e:
+            if e.args and e.args[0] == aiodns.error.ARES_ETIMEOUT:
+                raise asyncio.TimeoutError() from e
+            raise socket.gaierror(*e.args) from e
+    
+    def _build_traceroute_command(self, address: str) -> List[str]:
+        """Build traceroute command based on operating system; address is already resolved"""
+        if self.system == "windows":
+            return ["tracert", "-d", "-h", str(self.max_hops), "-w", str(self.timeout * 1000), address]
+        else:  # Linux/Mac
+            command = ["traceroute", "-m", str(self.max_hops), "-w", str(self.timeout), address]
+            if not self.resolve_hostnames:
+                command.insert(1, "-n")
+            return command
+    
+    async def _resolve_target(self, target: str) -> Optional[str]:
+        """Resolve target to an IPv4 address, or None if it does not resolve"""
+        try:
+            if ipaddress.ip_address(target).version == 4:
+                return target
+        except ValueError:
+            pass
+        
+        cached = _resolve_cache.get(target)
+        if cached is not None:
+            return cached
+        
+        try:
+            if AIODNS_AVAILABLE:
+                addresses = (await _dns_resolver().gethostbyname(target, socket.AF_INET)).addresses
+            else:
+                address_info = await asyncio.get_running_loop().getaddrinfo(
+                    target, None, family=socket.AF_INET, type=socket.SOCK_DGRAM
+                )
+                addresses = [info[4][0] for info in address_info]
+        except _LOOKUP_ERRORS:
+            return None
+        if not addresses:
+            return None
+        
+        address = addresses[0]
+        _resolve_cache.set(target, address)
+        return address
+    
+    async def _is_valid_target(self, target: str) -> bool:
+        """Validate if target is a valid IP address or hostname"""
+        return await self._resolve_target(target) is not None
+    
+    def _windows_hop(self, hop_match: re.Match) -> TracerouteHop:
+        """Build a hop from one _WINDOWS_HOP_RE match"""
+        # Hop number, three probes and the responder in one match
+        hop_number = int(hop_match.group('hop'))
+        ip_address = hop_match.group('host_ip') or hop_match.group('ip')
+        
+        # Check for timeouts; a hop that answered some probes is not one
+        if ip_address is None:
+            return TracerouteHop(
+                hop_number=hop_number,
+                ip_address=None,
+                hostname=None,
+                latency_ms=[],
+                timeout=True,
+                error_message="Request timed out"
+            )
+        
+        latencies = [float(lat) for lat in hop_match.group('l1', 'l2', 'l3') if lat]
+        
+        # Hostnames are resolved for all hops together after parsing
+        return TracerouteHop(
+            hop_number=hop_number,
+            ip_address=ip_address,
+            hostname=None,
+            latency_ms=latencies,
+            timeout=False,
+            error_message=None,
+            avg_latency_ms=sum(latencies) / len(latencies) if latencies else None
+        )
+    
+    def _unix_hop(self, hop_match: re.Match) -> TracerouteHop:
+        """Build a hop from one _UNIX_HOP_RE match"""
+        # Hop number and first responder in one match; latencies follow it
+        hop_number = int(hop_match.group('hop'))
+        ip_address = hop_match.group('host_ip') or hop_match.group('ip')
+        
+        # Check for timeouts; a hop that answered some probes is not one
+        if ip_address is None:
+            return TracerouteHop(
+                hop_number=hop_number,
+                ip_address=None,
+                hostname=None,
+                latency_ms=[],
+                timeout=True,
+                error_message="Request timed out"
+            )
+        
+        latencies = [float(lat) for lat in _UNIX_LATENCY_RE.findall(hop_match.group('rest'))]
+        
+        return TracerouteHop(
+            hop_number=hop_number,
+            ip_address=ip_address,
+            hostname=hop_match.group('host'),
+            latency_ms=latencies,
+            timeout=False,
+            error_message=None,
+            avg_latency_ms=sum(latencies) / len(latencies) if latencies else None
         )
     
     async def traceroute_multiple(self, targets: List[str]) -> Dict[str, TracerouteResult]:
         """
         Run traceroute to multiple targets concurrently
         """
-        tasks = [self.traceroute(target) for target in targets]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def trace(target: str) -> TracerouteResult:
+            async with semaphore:
+                return await self.traceroute(target)
+        
+        tasks = [trace(target) for target in targets]
         results = await asyncio.gather(*tasks, return_exceptions=True)
         
         output = {}
@@ -354,47 +605,75 @@ class TracerouteTester:
             "avg_latency_per_hop": []
         }
         
-        prev_latency = 0
-        for hop in result.hops:
-            if hop.timeout:
-                analysis["timeouts"].append(hop.hop_number)
-            elif hop.latency_ms:
-                avg_latency = sum(hop.latency_ms) / len(hop.latency_ms)
-                analysis["avg_latency_per_hop"].append({
-                    "hop": hop.hop_number,
-                    "latency": avg_latency,
-                    "ip": hop.ip_address
-                })
-                
-                # High latency detection (>100ms)
-                if avg_latency > 100:
-                    analysis["high_latency_hops"].append({
-                        "hop": hop.hop_number,
-                        "latency": avg_latency,
-                        "ip": hop.ip_address
-                    })
-                
-                # Latency spike detection (>50ms increase from previous hop)
-                if prev_latency > 0 and avg_latency - prev_latency > 50:
-                    analysis["latency_spikes"].append({
-                        "hop": hop.hop_number,
-                        "current_latency": avg_latency,
-                        "previous_latency": prev_latency,
-                        "spike": avg_latency - prev_latency,
-                        "ip": hop.ip_address
-                    })
-                
-                prev_latency = avg_latency
+        analysis["timeouts"] = [hop.hop_number for hop in result.hops if hop.timeout]
+        answered = [hop for hop in result.hops if not hop.timeout and hop.avg_latency_ms is not None]
+        if not answered:
+            return analysis
+        
+        # Every check runs column-wise over the per-hop averages the parser stored
+        avg_latency = np.fromiter((hop.avg_latency_ms for hop in answered), float, len(answered))
+        # Spikes compare against the previous hop that answered, none before the first
+        prev_latency = np.concatenate(([0.0], avg_latency[:-1]))
+        spike = avg_latency - prev_latency
+        
+        avg_list = avg_latency.tolist()
+        analysis["avg_latency_per_hop"] = [
+            {"hop": hop.hop_number, "latency": latency, "ip": hop.ip_address}
+            for hop, latency in zip(answered, avg_list)
+        ]
+        
+        # High latency detection (>100ms)
+        analysis["high_latency_hops"] = [
+            {"hop": answered[i].hop_number, "latency": avg_list[i], "ip": answered[i].ip_address}
+            for i in np.flatnonzero(avg_latency > 100).tolist()
+        ]
         
+        # Latency spike detection (>50ms increase from previous hop)
+        analysis["latency_spikes"] = [
+            {
+                "hop": answered[i].hop_number,
+                "current_latency": avg_list[i],
+                "previous_latency": prev_latency[i].item(),
+                "spike": spike[i].item(),
+                "ip": answered[i].ip_address
+            }
+            for i in np.flatnonzero((prev_latency > 0) & (spike > 50)).tolist()
+        ]
+        
+        return analysis
+    
+    async def analyze_path_async(self, result: TracerouteResult) -> Dict[str, any]:
+        """
+        Analyze traceroute results, naming only the hops flagged as problems
+        """
+        analysis = self.analyze_path(result)
+        flagged = analysis["high_latency_hops"] + analysis["latency_spikes"]
+        
+        # Hops that already carry a name (resolve_hostnames, Unix output) need no lookup
+        known = {hop.ip_address: hop.hostname for hop in result.hops if hop.hostname}
+        addresses = list({entry["ip"] for entry in flagged if entry["ip"] not in known})
+        names = await asyncio.gather(*(self._reverse_lookup(address) for address in addresses))
+        known.update(zip(addresses, names))
+        
+        for entry in flagged:
+            entry["hostname"] = known.get(entry["ip"])
         return analysis
 
 # Convenience functions
-async def traceroute_host(target: str, max_hops: int = 30, timeout: int = 5) -> TracerouteResult:
+@lru_cache(maxsize=32)
+def _shared_tester(max_hops: int, timeout: int, resolve_hostnames: bool = True,
+                   max_concurrency: int = 16) -> TracerouteTester:
+    """One tester per settings combination; testers keep no per-trace state"""
+    return TracerouteTester(max_hops=max_hops, timeout=timeout,
+                            resolve_hostnames=resolve_hostnames, max_concurrency=max_concurrency)
+
+async def traceroute_host(target: str, max_hops: int = 30, timeout: int = 5,
+                          resolve_hostnames: bool = True, use_cache: bool = True) -> TracerouteResult:
     """Simple traceroute function"""
-    tester = TracerouteTester(max_hops=max_hops, timeout=timeout)
-    return await tester.traceroute(target)
+    return await _shared_tester(max_hops, timeout, resolve_hostnames).traceroute(target, use_cache)
 
-async def traceroute_multiple(targets: List[str], max_hops: int = 30, timeout: int = 5) -> Dict[str, TracerouteResult]:
+async def traceroute_multiple(targets: List[str], max_hops: int = 30, timeout: int = 5,
+                              max_concurrency: int = 16) -> Dict[str, TracerouteResult]:
     """Traceroute multiple hosts"""
-    tester = TracerouteTester(max_hops=max_hops, timeout=timeout)
+    tester = _shared_tester(max_hops, timeout, max_concurrency=max_concurrency)
     return await tester.traceroute_multiple(targets)
\ No newline at end of file
@@ -5,8 +5,10 @@ FastAPI server with core network diagnostic capabilities
 """
 
 import asyncio
+import importlib.util
 import sys
 import os
+import re
 from typing import Optional, Dict, Any, List
 
 # Add current directory to Python path
@@ -15,7 +17,7 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 try:
     from fastapi import FastAPI, HTTPException
     from fastapi.responses import JSONResponse
-    from pydantic import BaseModel
+    from pydantic import BaseModel, ConfigDict
     import uvicorn
     FASTAPI_AVAILABLE = True
 except ImportError:
@@ -24,6 +26,15 @@ except ImportError:
     # Define dummy BaseModel to prevent errors
     class BaseModel:
         pass
+    ConfigDict = dict
+
+# orjson encodes the hop arrays far faster than the stdlib json module;
+# ORJSONResponse only imports it when rendering, so check it is installed here
+if FASTAPI_AVAILABLE:
+    if importlib.util.find_spec("orjson") is not None:
+        from fastapi.responses import ORJSONResponse as DefaultResponse
+    else:
+        DefaultResponse = JSONResponse
 
 # Core network modules (should work without external dependencies)
 try:
@@ -47,6 +58,9 @@ except ImportError as e:
     print(f"Warning: Log parser not available: {e}")
     LOG_PARSER_AVAILABLE = False
 
+# Chat commands: a command word and, optionally, the target after it
+_CHAT_COMMAND_RE = re.compile(r'(?<!\S)(ping|traceroute|trace)(?!\S)(?:\s+(\S+))?', re.IGNORECASE)
+
 # Request/Response Models
 class PingRequest(BaseModel):
     target: str
@@ -57,6 +71,43 @@ class TracerouteRequest(BaseModel):
     target: str
     max_hops: Optional[int] = 30
     timeout: Optional[int] = 5
+    resolve_hostnames: Optional[bool] = False
+    fresh: Optional[bool] = False
+
+class PingResponse(BaseModel):
+    # Built straight from the PingResult dataclass
+    model_config = ConfigDict(from_attributes=True)
+    
+    success: bool
+    target: str
+    packets_sent: int
+    packets_received: int
+    packet_loss_percent: float
+    avg_latency_ms: Optional[float] = None
+    min_latency_ms: Optional[float] = None
+    max_latency_ms: Optional[float] = None
+    error_message: Optional[str] = None
+
+class HopModel(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
+    hop_number: int
+    ip_address: Optional[str] = None
+    hostname: Optional[str] = None
+    latency_ms: List[float]
+    timeout: bool
+
+class TracerouteResponse(BaseModel):
+    # Built straight from the TracerouteResult dataclass, hops included
+    model_config = ConfigDict(from_attributes=True)
+    
+    success: bool
+    target: str
+    total_hops: int
+    target_reached: bool
+    execution_time_ms: float
+    hops: List[HopModel]
+    error_message: Optional[str] = None
 
 class ChatRequest(BaseModel):
     message: str
@@ -71,7 +122,8 @@ if FASTAPI_AVAILABLE:
     app = FastAPI(
         title="Network Troubleshooting Bot API",
         description="AI-powered network diagnostics and troubleshooting",
-        version="1.0.0"
+        version="1.0.0",
+        default_response_class=DefaultResponse
     )
     
     @app.get("/")
@@ -97,66 +149,35 @@ if FASTAPI_AVAILABLE:
         )
     
     if PING_AVAILABLE:
-        @app.post("/api/ping")
+        @app.post("/api/ping", response_model=PingResponse)
         async def ping_endpoint(request: PingRequest):
             """Execute ping test to specified target"""
             try:
                 result = await ping_host(request.target, request.timeout, request.count)
-                return {
-                    "success": result.success,
-                    "target": request.target,
-                    "packets_sent": result.packets_sent,
-                    "packets_received": result.packets_received,
-                    "packet_loss_percent": result.packet_loss_percent,
-                    "avg_latency_ms": result.avg_latency_ms,
-                    "min_latency_ms": result.min_latency_ms,
-                    "max_latency_ms": result.max_latency_ms,
-                    "error_message": result.error_message
-                }
+                return PingResponse.model_validate(result)
             except Exception as e:
                 raise HTTPException(status_code=500, detail=f"Ping failed: {str(e)}")
     
     if TRACEROUTE_AVAILABLE:
-        @app.post("/api/traceroute")
+        @app.post("/api/traceroute", response_model=TracerouteResponse)
         async def traceroute_endpoint(request: TracerouteRequest):
             """Execute traceroute to specified target"""
             try:
-                result = await traceroute_host(request.target, request.max_hops, request.timeout)
-                return {
-                    "success": result.success,
-                    "target": request.target,
-                    "total_hops": result.total_hops,
-                    "target_reached": result.target_reached,
-                    "execution_time_ms": result.execution_time_ms,
-                    "hops": [
-                        {
-                            "hop_number": hop.hop_number,
-                            "ip_address": hop.ip_address,
-                            "hostname": hop.hostname,
-                            "latency_ms": hop.latency_ms,
-                            "timeout": hop.timeout
-                        }
-                        for hop in result.hops
-                    ],
-                    "error_message": result.error_message
-                }
+                result = await traceroute_host(request.target, request.max_hops, request.timeout,
+                                               request.resolve_hostnames, use_cache=not request.fresh)
+                return TracerouteResponse.model_validate(result)
             except Exception as e:
                 raise HTTPException(status_code=500, detail=f"Traceroute failed: {str(e)}")
     
     @app.post("/api/chat")
     async def chat_endpoint(request: ChatRequest):
         """Simple chat interface for network troubleshooting"""
-        message = request.message.lower()
+        # One search finds the command and its target
+        command_match = _CHAT_COMMAND_RE.search(request.message)
+        command = command_match.group(1).lower() if command_match else None
         
-        # Simple pattern matching for basic commands
-        if "ping" in message:
-            # Extract target from message
-            words = message.split()
-            target = None
-            for i, word in enumerate(words):
-                if word == "ping" and i + 1 < len(words):
-                    target = words[i + 1]
-                    break
+        if command == "ping":
+            target = command_match.group(2)
             
             if target and PING_AVAILABLE:
                 try:
@@ -186,18 +207,13 @@ if FASTAPI_AVAILABLE:
                     "result": "help"
                 }
         
-        elif "traceroute" in message or "trace" in message:
-            # Extract target from message
-            words = message.split()
-            target = None
-            for i, word in enumerate(words):
-                if word in ["traceroute", "trace"] and i + 1 < len(words):
-                    target = words[i + 1]
-                    break
+        elif command is not None:
+            target = command_match.group(2)
             
             if target and TRACEROUTE_AVAILABLE:
                 try:
-                    result = await traceroute_host(target, max_hops=15, timeout=3)
+                    result = await traceroute_host(target, max_hops=15, timeout=3,
+                                                   resolve_hostnames=False)
                     if result.success:
                         return {
                             "response": f"Traceroute to {target} completed! {result.total_hops} hops, target {'reached' if result.target_reached else 'not reached'}",
@@ -223,7 +239,7 @@ if FASTAPI_AVAILABLE:
                     "result": "help"
                 }
         
-        elif "help" in message:
+        elif "help" in request.message.lower():
             available_commands = []
             if PING_AVAILABLE:
                 available_commands.append("ping <target>")
@@ -0,0 +1,8 @@
+"""
+Shared pytest setup for the Network Troubleshooting Bot tests
+"""
+import os
+import sys
+
+# Make the project modules importable however pytest is started
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,89 @@
+"""
+Tests for the log line formats and error pattern matching in the log parser
+"""
+import pytest
+
+from modules.log_parser import LogSeverity, NetworkLogParser, _harden_pattern
+
+@pytest.fixture
+def parser():
+    return NetworkLogParser()
+
+def test_syslog_line_with_cisco_tag(parser):
+    entries = parser.parse_log_file(
+        "Jan  5 10:22:01 core-r1 123: %LINK-3-UPDOWN: Interface Gi0/1, changed state to down"
+    )
+
+    assert len(entries) == 1
+    entry = entries[0]
+    assert (entry.timestamp.month, entry.timestamp.day) == (1, 5)
+    assert entry.timestamp.strftime('%H:%M:%S') == '10:22:01'
+    assert entry.hostname == 'core-r1'
+    assert entry.facility == 'LINK'
+    assert entry.severity == LogSeverity.ERROR
+    assert entry.message == 'Interface Gi0/1, changed state to down'
+    assert entry.parsed_data == {'mnemonic': 'UPDOWN', 'facility': 'LINK'}
+
+def test_syslog_line_without_cisco_tag(parser):
+    entry = parser.parse_log_file("Jan 15 08:00:00 fw1 sshd[311]: Failed password for admin")[0]
+
+    assert entry.hostname == 'fw1'
+    assert entry.process == 'sshd[311]'
+    assert entry.severity == LogSeverity.INFO
+    assert entry.message == 'Failed password for admin'
+
+def test_syslog_lines_in_one_buffer(parser):
+    # Lines that don't fit the format are skipped, and no match runs into the next line
+    entries = parser.parse_log_file(
+        "Jan  5 10:22:01 r1 sshd: first\n"
+        "garbage line\n"
+        "\n"
+        "Jan  5 10:22:02 r2 sshd: second\n"
+    )
+
+    assert [(entry.hostname, entry.message) for entry in entries] == [('r1', 'first'), ('r2', 'second')]
+
+def test_cisco_line(parser):
+    entry = parser.parse_log_file(
+        "*Mar  1 00:01:02.123: %SYS-5-CONFIG_I: Configured from console by vty0", 'cisco'
+    )[0]
+
+    assert (entry.timestamp.month, entry.timestamp.day) == (3, 1)
+    assert entry.facility == 'SYS'
+    assert entry.severity == LogSeverity.NOTICE
+    assert entry.message == 'Configured from console by vty0'
+    assert entry.parsed_data == {'mnemonic': 'CONFIG_I', 'facility': 'SYS'}
+
+def test_juniper_line(parser):
+    entry = parser.parse_log_file("Jan  5 10:22:01 srx1 rpd[1234]: bgp_neighbor down", 'juniper')[0]
+
+    assert entry.hostname == 'srx1'
+    assert entry.process == 'rpd'
+    assert entry.message == 'bgp_neighbor down'
+    assert entry.parsed_data == {'pid': '1234'}
+
+def test_long_line_that_does_not_fit_is_skipped(parser):
+    assert parser.parse_log_file("Jan  5 10:22:01 " + "x" * 50_000) == []
+
+def test_error_patterns_match_interface_down(parser):
+    entry = parser.parse_log_file(
+        "Jan  5 10:22:01 r1 123: %LINK-3-UPDOWN: Interface Gi0/1, changed state to down"
+    )[0]
+
+    matched = [parser._error_pattern_bank[index] for index in parser._match_error_patterns(entry)]
+    assert matched
+    assert {category for category, _ in matched} == {'interface_down'}
+
+def test_error_patterns_ignore_unrelated_message(parser):
+    entry = parser.parse_log_file("Jan  5 10:22:01 r1 123: %SYS-5-CONFIG_I: Configured from console")[0]
+
+    assert parser._match_error_patterns(entry) == []
+
+@pytest.mark.parametrize('pattern, hardened', [
+    (r'(\S+)\s+changed state to down', r'(?<!\S)(\S+)\s+changed state to down'),
+    (r'(\d+)% packet loss', r'(?<!\d)(\d+)% packet loss'),
+    (r'Interface\s+(\S+).*down.*now', r'Interface\s+(\S+)(?:.*?down).*now'),
+    (r'%LINK-\d+-UPDOWN:.*Interface\s+(\S+).*down', r'%LINK-\d+-UPDOWN:.*Interface\s+(\S+).*down'),
+])
+def test_harden_pattern(pattern, hardened):
+    assert _harden_pattern(pattern) == hardened
@@ -0,0 +1,83 @@
+"""
+Tests for parsing the output of the system ping command
+"""
+from modules.ping_test import PingTester, _RECEIVED_RE, _TIME_RE
+
+UNIX_OUTPUT = b"""PING 10.0.0.1 (10.0.0.1) 56(84) bytes of data.
+64 bytes from 10.0.0.1: icmp_seq=1 ttl=64 time=0.045 ms
+64 bytes from 10.0.0.1: icmp_seq=2 ttl=64 time=12.3 ms
+64 bytes from 10.0.0.1: icmp_seq=4 ttl=64 time=7 ms
+
+--- 10.0.0.1 ping statistics ---
+4 packets transmitted, 3 received, 25% packet loss, time 3004ms
+rtt min/avg/max/mdev = 0.045/6.448/12.300/5.029 ms
+"""
+
+WINDOWS_OUTPUT = b"""Pinging 10.0.0.1 with 32 bytes of data:
+Reply from 10.0.0.1: bytes=32 time<1ms TTL=128
+Reply from 10.0.0.1: bytes=32 time=12ms TTL=128
+Request timed out.
+Reply from 10.0.0.1: bytes=32 time=3ms TTL=128
+
+Ping statistics for 10.0.0.1:
+    Packets: Sent = 4, Received = 3, Lost = 1 (25% loss),
+Approximate round trip times in milli-seconds:
+    Minimum = 0ms, Maximum = 12ms, Average = 5ms
+"""
+
+def test_time_re_reads_unix_replies():
+    # The "time 3004ms" total and the rtt summary line are not replies
+    assert _TIME_RE.findall(UNIX_OUTPUT) == [b'0.045', b'12.3', b'7']
+
+def test_time_re_reads_windows_replies():
+    assert _TIME_RE.findall(WINDOWS_OUTPUT) == [b'1', b'12', b'3']
+
+def test_received_re_reads_unix_summary():
+    assert _RECEIVED_RE.search(UNIX_OUTPUT).group(1) == b'3'
+
+def test_received_re_reads_bsd_summary():
+    output = b"4 packets transmitted, 2 packets received, 50.0% packet loss"
+    assert _RECEIVED_RE.search(output).group(1) == b'2'
+
+def test_received_re_reads_windows_summary():
+    assert _RECEIVED_RE.search(WINDOWS_OUTPUT).group(2) == b'3'
+
+def test_parse_unix_output():
+    result = PingTester(count=4)._parse_ping_output('10.0.0.1', UNIX_OUTPUT, '')
+
+    assert result.success
+    assert result.packets_received == 3
+    assert result.packet_loss_percent == 25.0
+    assert result.min_latency_ms == 0.045
+    assert result.max_latency_ms == 12.3
+
+def test_windows_unreachable_is_total_loss():
+    # Windows counts "Destination host unreachable" answers as received
+    output = b"""Pinging 10.0.0.9 with 32 bytes of data:
+Reply from 10.0.0.1: Destination host unreachable.
+Reply from 10.0.0.1: Destination host unreachable.
+Reply from 10.0.0.1: Destination host unreachable.
+Reply from 10.0.0.1: Destination host unreachable.
+
+Ping statistics for 10.0.0.9:
+    Packets: Sent = 4, Received = 4, Lost = 0 (0% loss),
+"""
+    result = PingTester(count=4)._parse_ping_output('10.0.0.9', output, '')
+
+    assert not result.success
+    assert result.packets_received == 0
+    assert result.packet_loss_percent == 100.0
+
+def test_duplicate_reply_is_not_counted():
+    output = b"""PING 10.0.0.1 (10.0.0.1) 56(84) bytes of data.
+64 bytes from 10.0.0.1: icmp_seq=1 ttl=64 time=0.512 ms
+64 bytes from 10.0.0.1: icmp_seq=1 ttl=64 time=0.530 ms (DUP!)
+
+--- 10.0.0.1 ping statistics ---
+2 packets transmitted, 1 received, +1 duplicates, 50% packet loss, time 1001ms
+"""
+    result = PingTester(count=2)._parse_ping_output('10.0.0.1', output, '')
+
+    assert result.success
+    assert result.packets_received == 1
+    assert result.packet_loss_percent == 50.0
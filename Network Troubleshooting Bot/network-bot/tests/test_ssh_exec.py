@@ -0,0 +1,84 @@
+"""
+Tests for the SSH connection cache
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("asyncssh")
+
+from modules import ssh_exec
+from modules.ssh_exec import DeviceCredentials, SSHExecutor
+
+class FakeConnection:
+    """Stands in for an asyncssh connection and records whether it was closed"""
+
+    def __init__(self, host: str):
+        self.host = host
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def opened(monkeypatch):
+    """Every connection the executor opens, in order"""
+    connections = []
+
+    async def create_connection(client_factory, host, **kwargs):
+        await asyncio.sleep(0.01)
+        connection = FakeConnection(host)
+        connections.append(connection)
+        return connection, client_factory()
+
+    monkeypatch.setattr(ssh_exec.asyncssh, 'create_connection', create_connection)
+    return connections
+
+CREDENTIALS = DeviceCredentials(username='admin', password='secret')
+
+def test_idle_connections_kept_under_cap(opened):
+    executor = SSHExecutor(max_connections=32)
+
+    async def connect_all():
+        for index in range(20):
+            await executor._get_ssh_connection(f'10.0.0.{index}', CREDENTIALS)
+        cached = len(executor._connections)
+        executor.close_all_connections()
+        return cached
+
+    # Every connection stays cached while the cache is under its cap
+    assert asyncio.run(connect_all()) == 20
+    assert len(opened) == 20
+
+def test_least_recently_used_idle_connection_evicted_over_cap(opened):
+    executor = SSHExecutor(max_connections=2)
+
+    async def connect_all():
+        for index in range(3):
+            await executor._get_ssh_connection(f'10.0.0.{index}', CREDENTIALS)
+        hosts = [key[0] for key in executor._connections]
+        evicted = opened[0].closed
+        executor.close_all_connections()
+        return hosts, evicted
+
+    assert asyncio.run(connect_all()) == (['10.0.0.1', '10.0.0.2'], True)
+
+def test_concurrent_connects_share_one_connection(opened):
+    executor = SSHExecutor()
+
+    async def connect_twice():
+        connections = await asyncio.gather(
+            executor._get_ssh_connection('10.0.0.1', CREDENTIALS),
+            executor._get_ssh_connection('10.0.0.1', CREDENTIALS)
+        )
+        cached = len(executor._connections)
+        executor.close_all_connections()
+        return connections, cached
+
+    (first, second), cached = asyncio.run(connect_twice())
+
+    # Both calls missed the cache and connected; the later one closed its duplicate
+    assert len(opened) == 2
+    assert first is second is opened[0]
+    assert opened[1].closed
+    assert cached == 1
@@ -0,0 +1,76 @@
+"""
+Tests for parsing hop lines from the system traceroute / tracert commands
+"""
+import pytest
+
+from modules.traceroute import TracerouteTester, _UNIX_HOP_RE, _WINDOWS_HOP_RE
+
+WINDOWS_OUTPUT = """
+Tracing route to example.com [93.184.216.34]
+over a maximum of 30 hops:
+
+  1    <1 ms    <1 ms    <1 ms  192.168.1.1
+  2    12 ms    11 ms    14 ms  isp-gw.example.net [10.20.0.1]
+  3     *        *        *     Request timed out.
+  4     *       21 ms    20 ms  10.30.0.1
+
+Trace complete.
+"""
+
+UNIX_OUTPUT = """traceroute to example.com (93.184.216.34), 30 hops max, 60 byte packets
+ 1  gw.example.net (192.168.1.1)  0.512 ms  0.498 ms  0.470 ms
+ 2  10.20.0.1  11.2 ms  11.9 ms
+ 3  * * *
+ 4  * 10.30.0.1  20.5 ms
+"""
+
+@pytest.fixture
+def tester():
+    return TracerouteTester()
+
+def test_windows_hop_re_matches_only_hop_lines():
+    hops = [int(match.group('hop')) for match in _WINDOWS_HOP_RE.finditer(WINDOWS_OUTPUT)]
+    assert hops == [1, 2, 3, 4]
+
+def test_windows_hops(tester):
+    hops = [tester._windows_hop(match) for match in _WINDOWS_HOP_RE.finditer(WINDOWS_OUTPUT)]
+
+    assert hops[0].ip_address == '192.168.1.1'
+    assert hops[0].latency_ms == [1.0, 1.0, 1.0]
+    assert not hops[0].timeout
+
+    assert hops[1].ip_address == '10.20.0.1'
+    assert hops[1].latency_ms == [12.0, 11.0, 14.0]
+
+    assert hops[2].timeout
+    assert hops[2].ip_address is None
+    assert hops[2].latency_ms == []
+
+    # A hop that answered some of its probes is not a timeout
+    assert hops[3].ip_address == '10.30.0.1'
+    assert hops[3].latency_ms == [21.0, 20.0]
+    assert not hops[3].timeout
+
+def test_unix_hop_re_matches_only_hop_lines():
+    hops = [int(match.group('hop')) for match in _UNIX_HOP_RE.finditer(UNIX_OUTPUT)]
+    assert hops == [1, 2, 3, 4]
+
+def test_unix_hops(tester):
+    hops = [tester._unix_hop(match) for match in _UNIX_HOP_RE.finditer(UNIX_OUTPUT)]
+
+    assert hops[0].ip_address == '192.168.1.1'
+    assert hops[0].hostname == 'gw.example.net'
+    assert hops[0].latency_ms == [0.512, 0.498, 0.470]
+    assert hops[0].avg_latency_ms == pytest.approx(0.4933, abs=1e-3)
+
+    # The probe count varies with -q
+    assert hops[1].ip_address == '10.20.0.1'
+    assert hops[1].hostname is None
+    assert hops[1].latency_ms == [11.2, 11.9]
+
+    assert hops[2].timeout
+    assert hops[2].ip_address is None
+
+    assert hops[3].ip_address == '10.30.0.1'
+    assert hops[3].latency_ms == [20.5]
+    assert not hops[3].timeout
@@ -0,0 +1,61 @@
+"""
+Tests for the TTL cache shared by the ping and traceroute modules
+"""
+from modules import ttl_cache
+from modules.ttl_cache import TTLCache
+
+class FakeClock:
+    """Stands in for time.monotonic so expiry can be stepped through"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def test_get_returns_stored_value_or_default():
+    cache = TTLCache(maxsize=4, ttl=60.0)
+    cache.set('gw', '10.0.0.1')
+    assert cache.get('gw') == '10.0.0.1'
+    assert cache.get('missing') is None
+    assert cache.get('missing', '') == ''
+
+def test_entries_expire_after_ttl(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(ttl_cache.time, 'monotonic', clock)
+    cache = TTLCache(maxsize=4, ttl=10.0)
+    cache.set('a', 1)
+    cache.set('b', 2, ttl=30.0)
+
+    clock.now += 9.9
+    assert cache.get('a') == 1
+
+    clock.now += 0.1
+    assert cache.get('a') is None
+    assert cache.get('b') == 2
+    # Expired entries are dropped when they are looked up
+    assert len(cache) == 1
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(maxsize=2, ttl=60.0)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    # Reading 'a' makes 'b' the oldest entry
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+
+def test_set_replaces_value_and_clear_empties():
+    cache = TTLCache(maxsize=2, ttl=60.0)
+    cache.set('a', 1)
+    cache.set('a', 2)
+    assert cache.get('a') == 2
+    assert len(cache) == 1
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.get('a') is None